@@ -1,141 +1,916 @@
 import sqlite3
 import os
+import re
 import time
-from datetime import datetime, timedelta
+import queue
+import calendar
+import threading
+from pathlib import Path
+from collections import OrderedDict, namedtuple
+from contextlib import contextmanager
+from operator import attrgetter, itemgetter
+
+DEFAULT_DB_PATH = os.path.join(os.path.dirname(__file__), "power_data.db")
+
+# Bumped via PRAGMA user_version whenever create_tables() migrates
+SCHEMA_VERSION = 5
+
+# Raw readings live in one file per UTC month, <db>.partitions/readings-YYYY-MM.db
+PARTITION_FILE = re.compile(r"readings-(\d{4}-\d{2})\.db$")
+# Partition connections the readers keep open at once
+MAX_OPEN_PARTITIONS = 8
+PARTITION_SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS {schema}.power_readings (
+        id INTEGER PRIMARY KEY,
+        timestamp DATETIME,
+        power_watts REAL,
+        cpu_temp REAL,
+        gpu_temp REAL,
+        ts INTEGER,
+        seconds REAL,
+        energy_j REAL
+    );
+    -- Covering index: range scans on ts never touch the table itself
+    CREATE INDEX IF NOT EXISTS {schema}.idx_power_readings_ts
+    ON power_readings (ts, power_watts, cpu_temp, gpu_temp, seconds, energy_j);
+'''
+
+# Nominal seconds between logged readings (see SystemMonitor)
+LOG_INTERVAL = 60
+# Longer gaps (app closed, suspend) count as one LOG_INTERVAL
+MAX_GAP = 2 * LOG_INTERVAL
+
+# Query result cache: window starts are rounded down to CACHE_BUCKET
+# seconds so repeated calls within a bucket share an entry
+CACHE_SIZE = 32
+CACHE_BUCKET = 60
+
+# Rollup table -> bucket size in seconds, aligned to local time
+ROLLUPS = {"power_hourly": 3600, "power_daily": 86400}
+ROLLUP_COLUMNS = (
+    "bucket", "count", "seconds", "energy_j",
+    "power_sum", "power_min", "power_max",
+    "cpu_temp_sum", "cpu_temp_min", "cpu_temp_max",
+    "gpu_temp_sum", "gpu_temp_min", "gpu_temp_max",
+)
+# Merges a bucket into an existing one (buckets can span batches and partitions)
+ROLLUP_UPSERT = '''
+    ON CONFLICT(bucket) DO UPDATE SET
+        count = count + excluded.count,
+        seconds = seconds + excluded.seconds,
+        energy_j = energy_j + excluded.energy_j,
+        power_sum = power_sum + excluded.power_sum,
+        power_min = MIN(power_min, excluded.power_min),
+        power_max = MAX(power_max, excluded.power_max),
+        cpu_temp_sum = cpu_temp_sum + excluded.cpu_temp_sum,
+        cpu_temp_min = MIN(cpu_temp_min, excluded.cpu_temp_min),
+        cpu_temp_max = MAX(cpu_temp_max, excluded.cpu_temp_max),
+        gpu_temp_sum = gpu_temp_sum + excluded.gpu_temp_sum,
+        gpu_temp_min = MIN(gpu_temp_min, excluded.gpu_temp_min),
+        gpu_temp_max = MAX(gpu_temp_max, excluded.gpu_temp_max)
+'''
+
+# A row of the partitions catalogue; energy_j is the counter after its newest reading
+Partition = namedtuple("Partition", "name min_ts max_ts min_id max_id energy_j sealed")
+
+
+def local_offset(ts):
+    """Local UTC offset in seconds in force at ts"""
+    return time.localtime(ts).tm_gmtoff
+
+
+def bucket_start(ts, size):
+    """UTC epoch of the start of the local-time bucket containing ts
+
+    Every ts is bucketed with the offset in force at that ts, so a DST
+    change never moves buckets that were already written. A boundary
+    on the other side of a change (midnight before a 2 am shift) is
+    placed with the offset in force there; such days are 23 or 25 hours.
+    """
+    offset = local_offset(ts)
+    local = (ts + offset) // size * size
+    start = local - offset
+    there = local_offset(start)
+    if there != offset and local - there <= ts:
+        start = local - there
+    return start
+
+
+def bucket_ceil(ts, size):
+    """First local-time bucket boundary at or after ts"""
+    start = bucket_start(ts, size)
+    if start == ts:
+        return start
+    # Local days are 23 to 25 hours: 1.5 buckets on is always the next one
+    return bucket_start(start + size * 3 // 2, size)
+
+
+# Per-reading dt in SQL, matching reading_seconds(); used to backfill
+# readings logged before the monitor measured seconds/energy itself
+READING_DT_SQL = '''
+    CASE WHEN ts - LAG(ts) OVER w BETWEEN 0 AND :max_gap
+        THEN ts - LAG(ts) OVER w ELSE :interval END
+'''
+
+
+def month_of(ts):
+    """Partition name of the UTC month holding ts, e.g. 2026-10"""
+    return time.strftime("%Y-%m", time.gmtime(ts))
+
+
+def month_bounds(name):
+    """UTC epochs [start, end) of a partition's month"""
+    year, month = map(int, name.split("-"))
+    start = calendar.timegm((year, month, 1, 0, 0, 0))
+    end = calendar.timegm((year + month // 12, month % 12 + 1, 1, 0, 0, 0))
+    return start, end
+
+
+def reading_seconds(ts, last_ts):
+    """Seconds of wall time a reading stands for"""
+    if last_ts is None:
+        return LOG_INTERVAL
+    dt = ts - last_ts
+    if dt < 0 or dt > MAX_GAP:
+        return LOG_INTERVAL
+    return dt
+
 
 class PowerAnalytics:
-    """Stores and retrieves power consumption data"""
+    """Stores and retrieves power consumption data
+
+    Readings are queued by log_reading() and written by a background
+    writer thread in batches, one transaction per batch, so the monitor
+    thread never waits on a commit/fsync. The database runs in WAL mode
+    so the analytics window can read while the writer commits.
+
+    Raw readings are partitioned by UTC month into their own SQLite
+    files in partition_dir; the main file keeps the rollup tables,
+    analytics_meta and the partitions catalogue with each partition's
+    ts and id range, so a query over readings only opens the partitions
+    it overlaps. Only the newest partition is written to (a reading
+    from an earlier month, after the clock went back, lands there too).
+    When the writer moves on to a new month, the previous partition is
+    compacted and sealed; sealed partitions are opened read-only, and
+    retention (cleanup_old_data) deletes them as whole files.
+
+    Each row carries the seconds it covers and energy_j, a cumulative
+    joule counter, so the energy over any window is the difference of
+    two counter lookups.
+
+    Query results are kept in a small LRU cache tagged with the highest
+    row id they saw. A call with no new rows is a hit; for get_stats,
+    rows added since are folded into the cached aggregate instead of
+    recomputing it.
+    """
     
-    def __init__(self):
-        db_path = os.path.join(os.path.dirname(__file__), "power_data.db")
-        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+    def __init__(self, db_path=None, batch_size=100, flush_interval=1.0, queue_size=10000):
+        self.db_path = db_path or DEFAULT_DB_PATH
+        self.partition_dir = os.path.splitext(self.db_path)[0] + ".partitions"
+        os.makedirs(self.partition_dir, exist_ok=True)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        # Rollup rebuilds bucket in SQL the same way the writer does
+        self.conn.create_function("bucket_start", 2, bucket_start)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.lock = threading.RLock()
+        # Partition name -> (connection, sealed) for queries, LRU order
+        self.readers = OrderedDict()
         self.create_tables()
+        
+        self.cache = OrderedDict()
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.cache_patches = 0
+        
+        self.dropped = 0
+        # Written by the writer thread only
+        self.current_partition = None
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.writer = threading.Thread(target=self._writer_loop, name="PowerAnalyticsWriter", daemon=True)
+        self.writer.start()
     
     def create_tables(self):
         cursor = self.conn.cursor()
         cursor.execute('''
-            CREATE TABLE IF NOT EXISTS power_readings (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-                power_watts REAL,
-                cpu_temp REAL,
-                gpu_temp REAL
+            CREATE TABLE IF NOT EXISTS analytics_meta (
+                key TEXT PRIMARY KEY,
+                value REAL
+            )
+        ''')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS partitions (
+                name TEXT PRIMARY KEY,  -- UTC month, "YYYY-MM"
+                min_ts INTEGER,
+                max_ts INTEGER,
+                min_id INTEGER,
+                max_id INTEGER,
+                energy_j REAL,
+                sealed INTEGER NOT NULL DEFAULT 0
             )
         ''')
         self.conn.commit()
+        
+        version = cursor.execute("PRAGMA user_version").fetchone()[0]
+        legacy = cursor.execute('''
+            SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'power_readings'
+        ''').fetchone()
+        if legacy:
+            # Readings from before partitioning, still in the main file
+            if version < 1:
+                self._migrate_epoch_column(cursor)
+            if version < 3:
+                self._migrate_energy_columns(cursor)
+            self._migrate_partitions(cursor)
+        
+        for table in ROLLUPS:
+            cursor.execute(f'''
+                CREATE TABLE IF NOT EXISTS {table} (
+                    bucket INTEGER PRIMARY KEY,  -- UTC epoch of local bucket start
+                    count INTEGER,
+                    seconds REAL,
+                    energy_j REAL,
+                    power_sum REAL, power_min REAL, power_max REAL,
+                    cpu_temp_sum REAL, cpu_temp_min REAL, cpu_temp_max REAL,
+                    gpu_temp_sum REAL, gpu_temp_min REAL, gpu_temp_max REAL
+                )
+            ''')
+        self.conn.commit()
+        if version < 5:
+            # Before version 5 buckets used the offset of when they were
+            # written, not of their readings
+            self.rebuild_rollups()
+        
+        cursor.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        self.conn.commit()
     
-    def log_reading(self, power_watts, cpu_temp=0, gpu_temp=0):
-        """Log a power reading"""
-        cursor = self.conn.cursor()
+    def _migrate_epoch_column(self, cursor):
+        """Add the integer ts column (UTC epoch seconds) and backfill it"""
+        columns = [row[1] for row in cursor.execute("PRAGMA table_info(power_readings)")]
+        if "ts" not in columns:
+            cursor.execute("ALTER TABLE power_readings ADD COLUMN ts INTEGER")
+        # timestamp holds CURRENT_TIMESTAMP, i.e. UTC text
         cursor.execute('''
-            INSERT INTO power_readings (power_watts, cpu_temp, gpu_temp)
-            VALUES (?, ?, ?)
-        ''', (power_watts, cpu_temp, gpu_temp))
+            UPDATE power_readings
+            SET ts = CAST(strftime('%s', timestamp) AS INTEGER)
+            WHERE ts IS NULL
+        ''')
         self.conn.commit()
     
+    def _migrate_energy_columns(self, cursor):
+        """Add per-row seconds and the cumulative energy_j counter"""
+        columns = [row[1] for row in cursor.execute("PRAGMA table_info(power_readings)")]
+        for column in ("seconds", "energy_j"):
+            if column not in columns:
+                cursor.execute(f"ALTER TABLE power_readings ADD COLUMN {column} REAL")
+        # Older readings only have the one-per-minute estimate to go on
+        cursor.execute(f'''
+            UPDATE power_readings
+            SET seconds = r.dt, energy_j = r.total
+            FROM (
+                SELECT id, dt, SUM(power_watts * dt) OVER (ORDER BY ts, id) AS total
+                FROM (
+                    SELECT id, ts, power_watts, {READING_DT_SQL} AS dt
+                    FROM power_readings
+                    WINDOW w AS (ORDER BY ts, id)
+                )
+            ) AS r
+            WHERE power_readings.id = r.id
+        ''', {"max_gap": MAX_GAP, "interval": LOG_INTERVAL})
+        cursor.execute("DROP INDEX IF EXISTS idx_power_readings_ts")
+        self.conn.commit()
+    
+    def _migrate_partitions(self, cursor):
+        """Move power_readings out of the main file into monthly partitions
+
+        The writer seals all but the newest when it starts.
+        """
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_power_readings_ts ON power_readings (ts)")
+        first = cursor.execute("SELECT MIN(ts) FROM power_readings").fetchone()[0]
+        last = cursor.execute("SELECT MAX(ts) FROM power_readings").fetchone()[0]
+        self.conn.commit()
+        name = month_of(first) if first is not None else None
+        while name is not None and name <= month_of(last):
+            start, end = month_bounds(name)
+            self._attach(self.conn, name, "migrating")
+            with self.conn:
+                cursor.execute('''
+                    INSERT INTO migrating.power_readings
+                    SELECT id, timestamp, power_watts, cpu_temp, gpu_temp, ts, seconds, energy_j
+                    FROM main.power_readings
+                    WHERE ts >= ? AND ts < ?
+                ''', (start, end))
+                moved = cursor.rowcount
+                if moved:
+                    self._catalogue_partition(cursor, name, "migrating")
+            self.conn.execute("DETACH DATABASE migrating")
+            if not moved:
+                os.remove(self.partition_path(name))
+            name = month_of(end)
+        # Rows without a ts can't be placed (or queried) and are dropped
+        cursor.execute("DROP TABLE power_readings")
+        self.conn.commit()
+        # Give the space back now that the readings live in the partitions
+        self.conn.execute("VACUUM")
+        self.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    
+    def partition_path(self, name):
+        return os.path.join(self.partition_dir, f"readings-{name}.db")
+    
+    def _attach(self, conn, name, schema, create=True):
+        """Attach a partition's file to conn; create sets it up for writing"""
+        conn.execute(f"ATTACH DATABASE ? AS {schema}", (self.partition_path(name),))
+        if create:
+            conn.execute(f"PRAGMA {schema}.journal_mode=WAL")
+            conn.execute(f"PRAGMA {schema}.synchronous=NORMAL")
+            conn.executescript(PARTITION_SCHEMA.format(schema=schema))
+    
+    @staticmethod
+    def _catalogue_partition(cursor, name, schema):
+        """Refresh the catalogue row of the (unsealed) partition attached as schema"""
+        # Separate subqueries, so each is a single index/rowid lookup
+        cursor.execute(f'''
+            INSERT OR REPLACE INTO main.partitions (name, min_ts, max_ts, min_id, max_id, energy_j)
+            SELECT ?,
+                (SELECT MIN(ts) FROM {schema}.power_readings),
+                (SELECT MAX(ts) FROM {schema}.power_readings),
+                (SELECT MIN(id) FROM {schema}.power_readings),
+                (SELECT MAX(id) FROM {schema}.power_readings),
+                (SELECT energy_j FROM {schema}.power_readings ORDER BY id DESC LIMIT 1)
+        ''', (name,))
+    
+    def _partitions(self, cursor=None):
+        """The catalogue, oldest partition first"""
+        cursor = cursor or self.conn.cursor()
+        return [Partition(*row) for row in cursor.execute('''
+            SELECT name, min_ts, max_ts, min_id, max_id, energy_j, sealed
+            FROM partitions ORDER BY max_id
+        ''')]
+    
+    def _reader(self, partition):
+        """Query connection to a partition (with self.lock held)"""
+        entry = self.readers.get(partition.name)
+        if entry is not None and entry[1] == partition.sealed:
+            self.readers.move_to_end(partition.name)
+            return entry[0]
+        self._close_reader(partition.name)
+        path = self.partition_path(partition.name)
+        if partition.sealed:
+            conn = sqlite3.connect(Path(path).absolute().as_uri() + "?mode=ro", uri=True, check_same_thread=False)
+        else:
+            conn = sqlite3.connect(path, check_same_thread=False)
+        self.readers[partition.name] = (conn, partition.sealed)
+        if len(self.readers) > MAX_OPEN_PARTITIONS:
+            self.readers.popitem(last=False)[1][0].close()
+        return conn
+    
+    def _close_reader(self, name):
+        entry = self.readers.pop(name, None)
+        if entry is not None:
+            entry[0].close()
+    
+    def _energy_base(self, cursor):
+        """Counter value before the oldest retained reading"""
+        row = cursor.execute("SELECT value FROM analytics_meta WHERE key = 'energy_base_j'").fetchone()
+        return row[0] if row else 0.0
+    
+    def energy_counter(self, ts):
+        """Cumulative joules logged up to and including ts"""
+        with self.lock:
+            cursor = self.conn.cursor()
+            # The newest reading at or before ts; partitions only overlap
+            # in time after the clock went back
+            best_ts = energy = None
+            candidates = sorted((p for p in self._partitions(cursor) if p.min_ts <= ts),
+                                key=attrgetter("max_ts"), reverse=True)
+            for partition in candidates:
+                if best_ts is not None and partition.max_ts < best_ts:
+                    break
+                row = self._reader(partition).execute('''
+                    SELECT ts, MAX(energy_j) FROM power_readings
+                    WHERE ts = (SELECT MAX(ts) FROM power_readings WHERE ts <= ?)
+                ''', (ts,)).fetchone()
+                if row[0] is not None and (best_ts is None or row[0] > best_ts):
+                    best_ts, energy = row
+            return self._energy_base(cursor) if energy is None else energy
+    
+    def get_energy(self, since, until=None):
+        """Joules logged in (since, until]"""
+        if until is None:
+            until = int(time.time())
+        return max(0.0, self.energy_counter(until) - self.energy_counter(since))
+    
+    def rebuild_rollups(self):
+        """Recompute the hourly/daily rollup tables from the partitions"""
+        with self.lock:
+            cursor = self.conn.cursor()
+            base = self._energy_base(cursor)
+            tables = sorted(ROLLUPS, key=ROLLUPS.get)
+            finest = tables[0]
+            for table in tables:
+                cursor.execute(f"DELETE FROM {table}")
+            self.conn.commit()
+            
+            for partition in self._partitions(cursor):
+                self._attach(self.conn, partition.name, "rebuilding", create=False)
+                try:
+                    cursor.execute(f'''
+                        INSERT INTO {finest} ({", ".join(ROLLUP_COLUMNS)})
+                        SELECT
+                            bucket_start(ts, :size) AS bucket,
+                            COUNT(*), SUM(seconds), SUM(joules),
+                            SUM(power_watts), MIN(power_watts), MAX(power_watts),
+                            SUM(cpu_temp), MIN(cpu_temp), MAX(cpu_temp),
+                            SUM(gpu_temp), MIN(gpu_temp), MAX(gpu_temp)
+                        FROM (
+                            SELECT ts, power_watts, cpu_temp, gpu_temp, seconds,
+                                energy_j - COALESCE(LAG(energy_j) OVER (ORDER BY ts, id), :base) AS joules
+                            FROM rebuilding.power_readings
+                            WHERE ts IS NOT NULL
+                        )
+                        WHERE true  -- keeps ON CONFLICT from parsing as a join
+                        GROUP BY bucket
+                        {ROLLUP_UPSERT}
+                    ''', {"base": base, "size": ROLLUPS[finest]})
+                    self.conn.commit()
+                finally:
+                    self.conn.execute("DETACH DATABASE rebuilding")
+                # The counter carries on from the previous partition
+                base = partition.energy_j
+            
+            # Coarser buckets are unions of the finest ones
+            for table in tables[1:]:
+                cursor.execute(f'''
+                    INSERT INTO {table} ({", ".join(ROLLUP_COLUMNS)})
+                    SELECT
+                        bucket_start(bucket, :size) AS coarse_bucket,
+                        SUM(count), SUM(seconds), SUM(energy_j),
+                        SUM(power_sum), MIN(power_min), MAX(power_max),
+                        SUM(cpu_temp_sum), MIN(cpu_temp_min), MAX(cpu_temp_max),
+                        SUM(gpu_temp_sum), MIN(gpu_temp_min), MAX(gpu_temp_max)
+                    FROM {finest}
+                    GROUP BY coarse_bucket
+                ''', {"size": ROLLUPS[table]})
+            self.conn.commit()
+    
+    def log_reading(self, power_watts, cpu_temp=0, gpu_temp=0, joules=None, seconds=None):
+        """Queue a power reading for the writer thread
+
+        joules and seconds are the energy and time measured since the
+        previous reading. Without them the reading is assumed to stand
+        for the time since the last logged row at power_watts.
+
+        Returns False if the queue was full and the reading was dropped;
+        the caller keeps its energy and hands it over with the next one.
+        """
+        try:
+            self.queue.put_nowait((int(time.time()), power_watts, cpu_temp, gpu_temp, joules, seconds))
+        except queue.Full:
+            self.dropped += 1
+            return False
+        return True
+    
+    def flush(self, timeout=None):
+        """Block until everything queued so far has been written"""
+        done = threading.Event()
+        self.queue.put(done)
+        return done.wait(timeout)
+    
+    def _writer_loop(self):
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("PRAGMA synchronous=NORMAL")
+        last_id, last_ts, energy_total = self._resume(conn)
+        batch = []
+        waiters = []
+        stop = False
+        
+        while not stop:
+            # Block for the first item, then collect more until the batch
+            # is full or flush_interval has passed since that first item
+            deadline = None
+            while len(batch) < self.batch_size:
+                if deadline is None:
+                    item = self.queue.get()
+                    deadline = time.monotonic() + self.flush_interval
+                else:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    try:
+                        item = self.queue.get(timeout=remaining)
+                    except queue.Empty:
+                        break
+                if item is None:
+                    stop = True
+                    break
+                if isinstance(item, threading.Event):
+                    waiters.append(item)
+                    break
+                batch.append(item)
+            
+            if batch:
+                rows = []
+                for ts, power, cpu_temp, gpu_temp, joules, seconds in batch:
+                    if seconds is None:
+                        seconds = reading_seconds(ts, last_ts)
+                    if joules is None:
+                        joules = power * seconds
+                    energy_total += joules
+                    last_ts = ts
+                    # Ids run on across partitions; they're the cache watermark
+                    last_id += 1
+                    rows.append((last_id, ts, power, cpu_temp, gpu_temp, seconds, joules, energy_total))
+                try:
+                    self._write_rows(conn, rows)
+                except Exception as e:
+                    print(f"Analytics write error: {e}")
+                batch = []
+            
+            for waiter in waiters:
+                waiter.set()
+            waiters = []
+        
+        conn.close()
+    
+    def _resume(self, conn):
+        """Writer start: (last id, last ts, energy counter)
+
+        Attaches the newest partition as "current", seals older ones a
+        previous run didn't get to, and folds in rows a crash left out
+        of the rollups and catalogue.
+        """
+        cursor = conn.cursor()
+        catalogue = self._partitions(cursor)
+        names = sorted(m.group(1) for m in map(PARTITION_FILE.match, os.listdir(self.partition_dir)) if m)
+        current = names[-1] if names else None
+        for partition in catalogue:
+            if not partition.sealed and partition.name != current:
+                self._seal(conn, partition.name)
+        last_id = max((p.max_id for p in catalogue), default=0)
+        energy = catalogue[-1].energy_j if catalogue else self._energy_base(cursor)
+        if current is None:
+            return last_id, None, energy
+        
+        self._attach(conn, current, "current")
+        self.current_partition = current
+        missed = cursor.execute('''
+            SELECT id, ts, power_watts, cpu_temp, gpu_temp, seconds, energy_j
+            FROM current.power_readings WHERE id > ? ORDER BY id
+        ''', (last_id,)).fetchall()
+        if missed:
+            rows = []
+            for row_id, ts, power, cpu_temp, gpu_temp, seconds, total in missed:
+                rows.append((row_id, ts, power, cpu_temp, gpu_temp, seconds, total - energy, total))
+                energy = total
+            with conn:
+                self._update_rollups(conn, rows)
+                self._catalogue_partition(cursor, current, "current")
+        row = cursor.execute('''
+            SELECT id, ts, energy_j FROM current.power_readings ORDER BY id DESC LIMIT 1
+        ''').fetchone()
+        if row is None:
+            return last_id, None, energy
+        return max(last_id, row[0]), row[1], row[2]
+    
+    def _write_rows(self, conn, rows):
+        """Write readings to the current partition, moving on when a month starts"""
+        pending = []
+        for row in rows:
+            name = month_of(row[1])
+            current = self.current_partition
+            # Never back into an earlier month: it is (or will be) sealed
+            if current is None or name > current:
+                if pending:
+                    self._insert(conn, current, pending)
+                    pending = []
+                if current is not None:
+                    conn.execute("DETACH DATABASE current")
+                    self.current_partition = None
+                    self._seal(conn, current)
+                self._attach(conn, name, "current")
+                self.current_partition = name
+            pending.append(row)
+        if pending:
+            self._insert(conn, self.current_partition, pending)
+    
+    def _insert(self, conn, name, rows):
+        with conn:
+            conn.executemany('''
+                INSERT INTO current.power_readings
+                    (id, ts, timestamp, power_watts, cpu_temp, gpu_temp, seconds, energy_j)
+                VALUES (?1, ?2, datetime(?2, 'unixepoch'), ?3, ?4, ?5, ?6, ?8)
+            ''', rows)
+        # Committed after the rows, so the rollups and the catalogue's
+        # max_id never count rows readers can't see yet
+        with conn:
+            self._update_rollups(conn, rows)
+            self._catalogue_partition(conn.cursor(), name, "current")
+    
+    def _seal(self, conn, name):
+        """Compact a finished partition and mark it read-only"""
+        with self.lock:
+            # Readers must let go of it for it to leave WAL mode; queries
+            # wait for the VACUUM, about once a month
+            self._close_reader(name)
+            part = sqlite3.connect(self.partition_path(name))
+            try:
+                mode = part.execute("PRAGMA journal_mode=DELETE").fetchone()[0]
+                part.execute("VACUUM")
+            finally:
+                part.close()
+        if mode != "delete":
+            # Still open elsewhere; retried on the next start
+            return
+        with conn:
+            conn.execute("UPDATE partitions SET sealed = 1 WHERE name = ?", (name,))
+    
+    def _update_rollups(self, conn, rows):
+        """Fold a batch of written readings into the rollup tables"""
+        for table, size in ROLLUPS.items():
+            buckets = {}
+            # The bucket of the previous row, [key, end); rows come in ts
+            # order, so most don't need the local time looked up again
+            key = end = None
+            for _, ts, power, cpu_temp, gpu_temp, dt, joules, _ in rows:
+                if key is None or not key <= ts < end:
+                    key = bucket_start(ts, size)
+                    end = bucket_ceil(key + 1, size)
+                row = buckets.get(key)
+                if row is None:
+                    buckets[key] = [key, 1, dt, joules,
+                                    power, power, power,
+                                    cpu_temp, cpu_temp, cpu_temp,
+                                    gpu_temp, gpu_temp, gpu_temp]
+                    continue
+                row[1] += 1
+                row[2] += dt
+                row[3] += joules
+                for i, val in ((4, power), (7, cpu_temp), (10, gpu_temp)):
+                    row[i] += val
+                    row[i + 1] = min(row[i + 1], val)
+                    row[i + 2] = max(row[i + 2], val)
+            
+            conn.executemany(f'''
+                INSERT INTO {table} ({", ".join(ROLLUP_COLUMNS)})
+                VALUES ({", ".join("?" * len(ROLLUP_COLUMNS))})
+                {ROLLUP_UPSERT}
+            ''', list(buckets.values()))
+    
     def get_readings(self, hours=24):
         """Get readings for the last N hours"""
-        cursor = self.conn.cursor()
-        since = datetime.now() - timedelta(hours=hours)
-        cursor.execute('''
-            SELECT timestamp, power_watts, cpu_temp, gpu_temp
-            FROM power_readings
-            WHERE timestamp > ?
-            ORDER BY timestamp
-        ''', (since.strftime('%Y-%m-%d %H:%M:%S'),))
-        return cursor.fetchall()
+        since = int(time.time()) - hours * 3600
+        rows = []
+        with self.lock:
+            partitions = [p for p in self._partitions() if p.max_ts > since]
+            for partition in partitions:
+                rows += self._reader(partition).execute('''
+                    SELECT datetime(ts, 'unixepoch') as timestamp, power_watts, cpu_temp, gpu_temp
+                    FROM power_readings
+                    WHERE ts > ?
+                    ORDER BY ts
+                ''', (since,)).fetchall()
+        if len(partitions) > 1:
+            # The timestamp text sorts like ts
+            rows.sort(key=itemgetter(0))
+        return rows
     
-    def get_stats(self, hours=24):
-        """Get statistics for the last N hours"""
+    def _window_totals(self, since, watermark):
+        """(count, seconds, power_sum, power_min, power_max) for ts > since
+
+        Whole days come from power_daily, whole hours before the first
+        day boundary from power_hourly, and only the leading partial hour
+        from the readings (ids up to watermark, in the partitions that
+        overlap it), so the cost does not grow with history.
+        """
         cursor = self.conn.cursor()
-        since = datetime.now() - timedelta(hours=hours)
+        hour0 = bucket_ceil(since + 1, 3600)
+        day0 = bucket_ceil(hour0, 86400)
+        params = {"since": since, "hour0": hour0, "day0": day0, "watermark": watermark}
         
-        cursor.execute('''
-            SELECT 
-                COUNT(*) as count,
-                AVG(power_watts) as avg_power,
-                MAX(power_watts) as max_power,
-                MIN(power_watts) as min_power,
-                SUM(power_watts) as total_power
-            FROM power_readings
-            WHERE timestamp > ?
-        ''', (since.strftime('%Y-%m-%d %H:%M:%S'),))
+        parts = []
+        for partition in self._partitions(cursor):
+            if partition.max_ts > since and partition.min_ts < hour0 and partition.min_id <= watermark:
+                parts.append(self._reader(partition).execute('''
+                    SELECT COUNT(*), SUM(seconds),
+                        SUM(power_watts), MIN(power_watts), MAX(power_watts)
+                    FROM power_readings
+                    WHERE ts > :since AND ts < :hour0 AND id <= :watermark
+                ''', params).fetchone())
+        for table, where in (("power_hourly", "bucket >= :hour0 AND bucket < :day0"),
+                             ("power_daily", "bucket >= :day0")):
+            parts.append(cursor.execute(f'''
+                SELECT SUM(count), SUM(seconds),
+                    SUM(power_sum), MIN(power_min), MAX(power_max)
+                FROM {table}
+                WHERE {where}
+            ''', params).fetchone())
         
-        row = cursor.fetchone()
-        if row and row[0] > 0:
-            count, avg_power, max_power, min_power, total_power = row
-            # Calculate kWh: (sum of watts) * (interval in hours) / count
-            # Assuming 1 reading per minute, each reading represents ~1 minute
-            hours_of_data = count / 60  # readings per minute -> hours
-            kwh = (avg_power * hours_of_data) / 1000 if hours_of_data > 0 else 0
+        count = seconds = power_sum = 0
+        power_min = power_max = None
+        for p_count, p_seconds, p_sum, p_min, p_max in parts:
+            if not p_count:
+                continue
+            count += p_count
+            seconds += p_seconds or 0
+            power_sum += p_sum or 0
+            power_min = p_min if power_min is None else min(power_min, p_min)
+            power_max = p_max if power_max is None else max(power_max, p_max)
+        return count, seconds, power_sum, power_min, power_max
+    
+    @contextmanager
+    def _snapshot(self):
+        """Read transaction: every query inside sees the same rollups and catalogue"""
+        with self.lock:
+            self.conn.execute("BEGIN")
+            try:
+                yield self.conn.cursor()
+            finally:
+                self.conn.commit()
+    
+    def _watermark(self, cursor):
+        return cursor.execute("SELECT MAX(max_id) FROM partitions").fetchone()[0] or 0
+    
+    def _cached(self, key, compute, patch=None):
+        """Return compute(watermark) through the cache, keyed by key
+
+        patch(value, old, new) returns value brought up to date with the
+        rows in (old, new]; without it a stale entry is recomputed.
+        """
+        with self._snapshot() as cursor:
+            watermark = self._watermark(cursor)
+            entry = self.cache.get(key)
+            if entry is not None:
+                self.cache.move_to_end(key)
+                if entry[0] == watermark:
+                    self.cache_hits += 1
+                    return entry[1]
+                if patch is not None:
+                    self.cache_patches += 1
+                    value = patch(entry[1], entry[0], watermark)
+                    self.cache[key] = (watermark, value)
+                    return value
             
+            self.cache_misses += 1
+            value = compute(watermark)
+            self.cache[key] = (watermark, value)
+            if len(self.cache) > CACHE_SIZE:
+                self.cache.popitem(last=False)
+            return value
+    
+    def clear_cache(self):
+        with self.lock:
+            self.cache.clear()
+    
+    def cache_stats(self):
+        return {
+            "hits": self.cache_hits,
+            "misses": self.cache_misses,
+            "patches": self.cache_patches,
+            "entries": len(self.cache),
+        }
+    
+    def _window_start(self, seconds):
+        return (int(time.time()) - seconds) // CACHE_BUCKET * CACHE_BUCKET
+    
+    def _stats_aggregate(self, since, watermark):
+        count, seconds, power_sum, power_min, power_max = self._window_totals(since, watermark)
+        return (count, seconds, power_sum, power_min, power_max,
+                self.energy_counter(since), self.energy_counter(int(time.time())))
+    
+    def _patch_stats_aggregate(self, value, old, new):
+        """Fold rows with ids in (old, new] into a _stats_aggregate() value"""
+        count, seconds, power_sum, power_min, power_max, start_j, end_j = value
+        for partition in self._partitions():
+            if partition.max_id <= old or partition.min_id > new:
+                continue
+            row = self._reader(partition).execute('''
+                SELECT COUNT(*), SUM(seconds), SUM(power_watts),
+                    MIN(power_watts), MAX(power_watts), MAX(energy_j)
+                FROM power_readings
+                WHERE id > ? AND id <= ?
+            ''', (old, new)).fetchone()
+            if not row[0]:
+                continue
+            new_count, new_seconds, new_sum, new_min, new_max, new_end = row
+            count += new_count
+            seconds += new_seconds or 0
+            power_sum += new_sum or 0
+            power_min = new_min if power_min is None else min(power_min, new_min)
+            power_max = new_max if power_max is None else max(power_max, new_max)
+            end_j = max(end_j, new_end or 0)
+        return count, seconds, power_sum, power_min, power_max, start_j, end_j
+    
+    def get_stats(self, hours=24):
+        """Get statistics for the last N hours"""
+        since = self._window_start(hours * 3600)
+        count, seconds, power_sum, power_min, power_max, start_j, end_j = self._cached(
+            ("stats", since), lambda watermark: self._stats_aggregate(since, watermark),
+            self._patch_stats_aggregate)
+        
+        if count > 0:
             return {
                 "count": count,
-                "avg_power": avg_power or 0,
-                "max_power": max_power or 0,
-                "min_power": min_power or 0,
-                "kwh": kwh,
-                "hours": hours_of_data
+                "avg_power": power_sum / count,
+                "max_power": power_max or 0,
+                "min_power": power_min or 0,
+                "kwh": max(0.0, end_j - start_j) / 3.6e6,
+                "hours": seconds / 3600
             }
         return {
-            "count": 0, "avg_power": 0, "max_power": 0, 
+            "count": 0, "avg_power": 0, "max_power": 0,
             "min_power": 0, "kwh": 0, "hours": 0
         }
     
     def get_hourly_average(self, hours=24):
         """Get hourly average power for charting"""
+        since = self._window_start(hours * 3600)
+        return self._cached(("hourly", since), lambda watermark: self._query_hourly_average(since))
+    
+    def _query_hourly_average(self, since):
         cursor = self.conn.cursor()
-        since = datetime.now() - timedelta(hours=hours)
-        
         cursor.execute('''
-            SELECT 
-                strftime('%Y-%m-%d %H:00', timestamp) as hour,
-                AVG(power_watts) as avg_power
-            FROM power_readings
-            WHERE timestamp > ?
-            GROUP BY hour
-            ORDER BY hour
-        ''', (since.strftime('%Y-%m-%d %H:%M:%S'),))
+            SELECT
+                strftime('%Y-%m-%d %H:00', bucket, 'unixepoch', 'localtime') as hour,
+                power_sum / count as avg_power
+            FROM power_hourly
+            WHERE bucket > :since - 3600
+            ORDER BY bucket
+        ''', {"since": since})
         
         return cursor.fetchall()
     
     def get_daily_average(self, days=30):
-        """Get daily average power for charting"""
+        """Get daily average power and kWh for charting"""
+        since = self._window_start(days * 86400)
+        return self._cached(("daily", since), lambda watermark: self._query_daily_average(since))
+    
+    def _query_daily_average(self, since):
         cursor = self.conn.cursor()
-        since = datetime.now() - timedelta(days=days)
-        
         cursor.execute('''
-            SELECT 
-                DATE(timestamp) as day,
-                AVG(power_watts) as avg_power,
-                SUM(power_watts) / 60 / 1000 as kwh  -- assuming 1 reading/min
-            FROM power_readings
-            WHERE timestamp > ?
-            GROUP BY day
-            ORDER BY day
-        ''', (since.strftime('%Y-%m-%d %H:%M:%S'),))
+            SELECT
+                DATE(bucket, 'unixepoch', 'localtime') as day,
+                power_sum / count as avg_power,
+                energy_j / 3600000.0 as kwh
+            FROM power_daily
+            WHERE bucket > :since - 86400
+            ORDER BY bucket
+        ''', {"since": since})
         
         return cursor.fetchall()
     
     def cleanup_old_data(self, days=90):
-        """Delete data older than N days"""
-        cursor = self.conn.cursor()
-        cutoff = datetime.now() - timedelta(days=days)
-        cursor.execute('''
-            DELETE FROM power_readings
-            WHERE timestamp < ?
-        ''', (cutoff.strftime('%Y-%m-%d %H:%M:%S'),))
-        self.conn.commit()
+        """Delete the partitions holding only data older than N days
+
+        Whole months go at once: the partition the cutoff falls in is
+        kept until all of it is older. Returns the number deleted.
+        """
+        with self.lock:
+            cursor = self.conn.cursor()
+            cutoff = int(time.time()) - days * 86400
+            partitions = self._partitions(cursor)
+            expired = [p for p in partitions if p.sealed and p.max_ts < cutoff]
+            if not expired:
+                return 0
+            kept = [p for p in partitions if p not in expired]
+            # Keep the energy counter continuous across the deleted rows
+            base = max(self._energy_base(cursor), max(p.energy_j for p in expired))
+            cursor.execute('''
+                INSERT OR REPLACE INTO analytics_meta (key, value) VALUES ('energy_base_j', ?)
+            ''', (base,))
+            cursor.executemany("DELETE FROM partitions WHERE name = ?", [(p.name,) for p in expired])
+            # Only buckets that lie entirely before the oldest kept reading
+            keep_from = min((p.min_ts for p in kept), default=cutoff)
+            for table, size in ROLLUPS.items():
+                cursor.execute(f"DELETE FROM {table} WHERE bucket + ? <= ?", (size, keep_from))
+            self.conn.commit()
+            for partition in expired:
+                self._close_reader(partition.name)
+                try:
+                    os.remove(self.partition_path(partition.name))
+                except OSError as e:
+                    print(f"Analytics cleanup error: {e}")
+            self.cache.clear()
+            return len(expired)
     
     def close(self):
+        if self.writer.is_alive():
+            self.queue.put(None)
+            self.writer.join()
+        with self.lock:
+            for name in list(self.readers):
+                self._close_reader(name)
         self.conn.close()
 
 
 # Global instance
 _analytics = None
+_analytics_lock = threading.Lock()
 
 def get_analytics():
     global _analytics
-    if _analytics is None:
-        _analytics = PowerAnalytics()
+    with _analytics_lock:
+        if _analytics is None:
+            _analytics = PowerAnalytics()
     return _analytics
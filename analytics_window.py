@@ -1,8 +1,8 @@
 from PyQt6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLabel, 
                              QPushButton, QComboBox, QGroupBox, QGridLayout,
                              QFrame, QScrollArea, QWidget, QDoubleSpinBox)
-from PyQt6.QtCore import Qt, QSettings
-from PyQt6.QtGui import QPainter, QColor, QPen, QFont
+from PyQt6.QtCore import Qt, QSettings, QObject, QRunnable, QThreadPool, QPointF, QRectF, pyqtSignal
+from PyQt6.QtGui import QPainter, QColor, QPen, QFont, QPainterPath, QPolygonF
 from analytics import get_analytics
 
 # World currencies with symbols
@@ -77,14 +77,170 @@ CURRENCIES = [
 ]
 
 
+PERIOD_HOURS = {"24h": 24, "7d": 7 * 24, "30d": 30 * 24, "all": 365 * 24}
+
+
+def fetch_period(task, period):
+    """Run the stats and chart queries for a period (worker thread)"""
+    # May open/migrate the database on first use, so not on the GUI thread
+    analytics = get_analytics()
+    hours = PERIOD_HOURS.get(period, 365 * 24)
+    stats = analytics.get_stats(hours)
+    if task.cancelled:
+        return None
+    
+    if period in ["24h"]:
+        chart_data = analytics.get_hourly_average(hours)
+        chart = ([(d[0][-5:-3] + "h", d[1] or 0) for d in chart_data], "line", "#3498db")
+    else:
+        chart_data = analytics.get_daily_average(hours // 24 if hours < 365 * 24 else 90)
+        chart = ([(d[0][-5:], d[1] or 0) for d in chart_data], "bar", "#2ecc71")
+    return {"period": period, "stats": stats, "chart": chart}
+
+
+class QuerySignals(QObject):
+    finished = pyqtSignal(int, object)
+    failed = pyqtSignal(int, str)
+
+
+class QueryTask(QRunnable):
+    """One analytics query job; func(task, *args) may check task.cancelled"""
+    
+    def __init__(self, request_id, func, args):
+        super().__init__()
+        self.request_id = request_id
+        self.func = func
+        self.args = args
+        self.cancelled = False
+        self.signals = QuerySignals()
+    
+    def run(self):
+        if self.cancelled:
+            return
+        try:
+            result = self.func(self, *self.args)
+        except Exception as e:
+            if not self.cancelled:
+                self.signals.failed.emit(self.request_id, str(e))
+            return
+        if not self.cancelled:
+            self.signals.finished.emit(self.request_id, result)
+
+
+class QueryExecutor(QObject):
+    """Runs analytics queries on a worker thread, latest request wins
+
+    Submitting a new query cancels the previous one: it is pulled from
+    the pool if it hasn't started, otherwise its result is discarded.
+    """
+    
+    finished = pyqtSignal(int, object)
+    failed = pyqtSignal(int, str)
+    
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(1)
+        self.current = None
+        self.next_id = 0
+    
+    def submit(self, func, *args):
+        self.cancel()
+        self.next_id += 1
+        task = QueryTask(self.next_id, func, args)
+        task.signals.finished.connect(self._on_finished)
+        task.signals.failed.connect(self._on_failed)
+        self.current = task
+        self.pool.start(task)
+        return task.request_id
+    
+    def cancel(self):
+        if self.current:
+            self.current.cancelled = True
+            self.pool.tryTake(self.current)
+            self.current = None
+    
+    def busy(self):
+        return self.current is not None
+    
+    def _on_finished(self, request_id, result):
+        if self.current and self.current.request_id == request_id:
+            self.current = None
+            self.finished.emit(request_id, result)
+    
+    def _on_failed(self, request_id, error):
+        if self.current and self.current.request_id == request_id:
+            self.current = None
+            self.failed.emit(request_id, error)
+
+
+def lttb(values, threshold):
+    """Largest-Triangle-Three-Buckets: pick `threshold` (index, value) points
+
+    Keeps the first and last point and, from each bucket in between,
+    the point forming the largest triangle with its neighbours, which
+    preserves peaks and troughs far better than striding.
+    """
+    n = len(values)
+    if threshold >= n or threshold < 3:
+        return list(enumerate(values))
+    
+    sampled = [(0, values[0])]
+    every = (n - 2) / (threshold - 2)
+    a = 0
+    for i in range(threshold - 2):
+        # Average of the next bucket is the third triangle vertex
+        next_start = int((i + 1) * every) + 1
+        next_end = min(int((i + 2) * every) + 1, n)
+        avg_x = (next_start + next_end - 1) / 2
+        avg_y = sum(values[next_start:next_end]) / max(1, next_end - next_start)
+        
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+        ax, ay = a, values[a]
+        best = start
+        best_area = -1.0
+        for j in range(start, end):
+            area = abs((ax - avg_x) * (values[j] - ay) - (ax - j) * (avg_y - ay))
+            if area > best_area:
+                best_area = area
+                best = j
+        sampled.append((best, values[best]))
+        a = best
+    
+    sampled.append((n - 1, values[-1]))
+    return sampled
+
+
+def minmax_columns(values, columns):
+    """Per-column (column, min, max) envelope of values over `columns` columns"""
+    n = len(values)
+    envelope = []
+    for col in range(columns):
+        start = col * n // columns
+        end = max(start + 1, (col + 1) * n // columns)
+        chunk = values[start:end]
+        envelope.append((col, min(chunk), max(chunk)))
+    return envelope
+
+
 class ChartWidget(QWidget):
-    """Simple bar/line chart widget"""
+    """Simple bar/line chart widget
+
+    Series longer than the plot area are reduced before drawing: LTTB
+    down to ~2 points per pixel for lines, a per-pixel-column min/max
+    envelope for bars. The reduced geometry is cached until the data or
+    the widget size changes, and each series is drawn in one call.
+    """
     
     def __init__(self):
         super().__init__()
         self.data = []
         self.chart_type = "bar"
         self.color = QColor("#3498db")
+        self.max_val = 100
+        self.geometry_cache = None
+        self.geometry_key = None
         self.setMinimumHeight(150)
         self.setMinimumWidth(400)
     
@@ -92,8 +248,42 @@ class ChartWidget(QWidget):
         self.data = data
         self.chart_type = chart_type
         self.color = QColor(color)
+        values = [d[1] for d in data]
+        self.max_val = max(values) if values and max(values) > 0 else 100
+        self.geometry_cache = None
         self.update()
     
+    def build_geometry(self, x_offset, y_offset, w, h):
+        """Reduced series in widget coordinates: a QPolygonF or QPainterPaths"""
+        values = [d[1] for d in self.data]
+        n = len(values)
+        max_val = self.max_val
+        base = y_offset + h
+        
+        def y_of(val):
+            return base - (val / max_val) * h
+        
+        if self.chart_type != "bar":
+            points = lttb(values, max(3, 2 * w))
+            span = max(1, n - 1)
+            return QPolygonF([QPointF(x_offset + i * w / span, y_of(v)) for i, v in points])
+        
+        solid = QPainterPath()
+        band = QPainterPath()
+        if n * 4 <= w:
+            bar_width = max(2, w // n - 2)
+            for i, val in enumerate(values):
+                bar_height = int((val / max_val) * h)
+                solid.addRect(QRectF(x_offset + i * (bar_width + 2), base - bar_height, bar_width, bar_height))
+        else:
+            # One column per pixel: solid up to the min, lighter band to the max
+            for col, lo, hi in minmax_columns(values, min(n, w)):
+                x = x_offset + col * w / min(n, w)
+                solid.addRect(QRectF(x, y_of(lo), 1, base - y_of(lo)))
+                if hi > lo:
+                    band.addRect(QRectF(x, y_of(hi), 1, y_of(lo) - y_of(hi)))
+        return solid, band
+    
     def paintEvent(self, event):
         if not self.data:
             return
@@ -107,34 +297,26 @@ class ChartWidget(QWidget):
         h = self.height() - 40
         x_offset = 50
         y_offset = 10
-        
-        if not self.data:
+        max_val = self.max_val
+        if w <= 0 or h <= 0:
             return
         
-        values = [d[1] for d in self.data]
-        max_val = max(values) if values and max(values) > 0 else 100
+        key = (w, h)
+        if self.geometry_cache is None or self.geometry_key != key:
+            self.geometry_cache = self.build_geometry(x_offset, y_offset, w, h)
+            self.geometry_key = key
         
         if self.chart_type == "bar":
-            bar_width = max(2, w // len(self.data) - 2)
-            
-            for i, (label, val) in enumerate(self.data):
-                bar_height = int((val / max_val) * h) if max_val > 0 else 0
-                x = x_offset + i * (bar_width + 2)
-                y = y_offset + h - bar_height
-                
-                painter.fillRect(x, y, bar_width, bar_height, self.color)
-                
+            solid, band = self.geometry_cache
+            painter.fillPath(solid, self.color)
+            if not band.isEmpty():
+                light = QColor(self.color)
+                light.setAlpha(110)
+                painter.fillPath(band, light)
         else:
             pen = QPen(self.color, 2)
             painter.setPen(pen)
-            
-            for i in range(len(self.data) - 1):
-                x1 = x_offset + int(i * w / (len(self.data) - 1))
-                y1 = y_offset + h - int((self.data[i][1] / max_val) * h) if max_val > 0 else y_offset + h
-                x2 = x_offset + int((i + 1) * w / (len(self.data) - 1))
-                y2 = y_offset + h - int((self.data[i + 1][1] / max_val) * h) if max_val > 0 else y_offset + h
-                
-                painter.drawLine(x1, y1, x2, y2)
+            painter.drawPolyline(self.geometry_cache)
         
         painter.setPen(QPen(QColor("#666"), 1))
         painter.drawLine(x_offset, y_offset, x_offset, y_offset + h)
@@ -154,8 +336,10 @@ class AnalyticsWindow(QDialog):
         super().__init__(parent)
         self.setWindowTitle("Power Analytics")
         self.setMinimumSize(520, 520)
-        self.analytics = get_analytics()
         self.settings = QSettings("MyCompany", "SysMonBar")
+        self.executor = QueryExecutor(self)
+        self.executor.finished.connect(self.on_data_loaded)
+        self.executor.failed.connect(self.on_data_failed)
         self.init_ui()
         self.load_data("24h")
     
@@ -169,6 +353,8 @@ class AnalyticsWindow(QDialog):
         self.period_combo.addItems(["24 Hours", "7 Days", "30 Days", "All Time"])
         self.period_combo.currentTextChanged.connect(self.on_period_changed)
         period_layout.addWidget(self.period_combo)
+        self.status_label = QLabel("")
+        period_layout.addWidget(self.status_label)
         period_layout.addStretch()
         
         refresh_btn = QPushButton("🔄 Refresh")
@@ -335,17 +521,16 @@ class AnalyticsWindow(QDialog):
         self.cost_label.setText(f"{symbol}{cost:.2f}")
     
     def load_data(self, period):
-        """Load and display data for the selected period"""
-        if period == "24h":
-            hours = 24
-        elif period == "7d":
-            hours = 7 * 24
-        elif period == "30d":
-            hours = 30 * 24
-        else:
-            hours = 365 * 24
-        
-        stats = self.analytics.get_stats(hours)
+        """Start loading data for the selected period in the background"""
+        self.status_label.setText("⏳ Loading...")
+        self.executor.submit(fetch_period, period)
+    
+    def on_data_loaded(self, request_id, result):
+        """Display query results for the selected period"""
+        if result is None:
+            return
+        self.status_label.setText("")
+        stats = result["stats"]
         
         self.stat_labels["total_kwh"].setText(f"{stats['kwh']:.2f} kWh")
         self.stat_labels["avg_power"].setText(f"{stats['avg_power']:.1f} W")
@@ -357,10 +542,12 @@ class AnalyticsWindow(QDialog):
         # Update cost
         self.update_cost()
         
-        # Get chart data
-        if period in ["24h"]:
-            chart_data = self.analytics.get_hourly_average(hours)
-            self.chart.set_data([(d[0][-5:-3] + "h", d[1] or 0) for d in chart_data], "line", "#3498db")
-        else:
-            chart_data = self.analytics.get_daily_average(hours // 24 if hours < 365 * 24 else 90)
-            self.chart.set_data([(d[0][-5:], d[1] or 0) for d in chart_data], "bar", "#2ecc71")
+        self.chart.set_data(*result["chart"])
+    
+    def on_data_failed(self, request_id, error):
+        self.status_label.setText("⚠ Load failed")
+        print(f"Analytics query error: {error}")
+    
+    def done(self, result):
+        self.executor.cancel()
+        super().done(result)
@@ -0,0 +1,917 @@
+"""SysMonBar benchmarks
+
+Usage:
+    python benchmark.py writes [--rows N]
+    python benchmark.py queries [--rows N ...] [--interval S]
+    python benchmark.py retention [--rows N] [--days N]
+    python benchmark.py startup [--runs N]
+    python benchmark.py collect [--sensors N ...] [--ticks N]
+    python benchmark.py ui [--ticks N]
+    python benchmark.py processes [--fake N ...] [--scans N]
+    python benchmark.py idle
+    python benchmark.py all
+
+Every command takes --json FILE (before the command) to also write its
+results as JSON, so runs can be compared. collect and ui use the fake
+psutil and LibreHardwareMonitor providers below, so they run on any
+machine, with or without real sensors.
+"""
+import os
+import sys
+import json
+import time
+import statistics
+import subprocess
+import sqlite3
+import shutil
+import argparse
+import tempfile
+import platform
+from collections import namedtuple
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+import collector
+import counters
+import idle
+import processes
+import sensors
+from analytics import PowerAnalytics
+from collector import Collector, DEFAULT_INTERVALS
+from scheduler import Scheduler, SampleGroup
+
+
+def bench_writes_baseline(db_path, rows):
+    """One INSERT + commit per reading (the pre-batching writer)"""
+    conn = sqlite3.connect(db_path)
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS power_readings (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+            power_watts REAL,
+            cpu_temp REAL,
+            gpu_temp REAL
+        )
+    ''')
+    conn.commit()
+    
+    start = time.perf_counter()
+    for i in range(rows):
+        conn.execute('''
+            INSERT INTO power_readings (power_watts, cpu_temp, gpu_temp)
+            VALUES (?, ?, ?)
+        ''', (50.0 + i % 30, 45.0, 50.0))
+        conn.commit()
+    elapsed = time.perf_counter() - start
+    conn.close()
+    return elapsed
+
+
+def stored_readings(analytics):
+    """Rows actually written, over every partition"""
+    total = 0
+    for (name,) in analytics.conn.execute("SELECT name FROM partitions").fetchall():
+        conn = sqlite3.connect(analytics.partition_path(name))
+        total += conn.execute("SELECT COUNT(*) FROM power_readings").fetchone()[0]
+        conn.close()
+    return total
+
+
+def bench_writes_batched(db_path, rows):
+    """PowerAnalytics.log_reading through the writer thread
+
+    The queue holds every reading, so nothing is dropped and the time
+    is the writer's. Returns (enqueue time, total time, rows stored,
+    readings dropped).
+    """
+    analytics = PowerAnalytics(db_path, queue_size=rows + 1)
+    
+    start = time.perf_counter()
+    for i in range(rows):
+        analytics.log_reading(50.0 + i % 30, 45.0, 50.0)
+    enqueue = time.perf_counter() - start
+    analytics.flush()
+    elapsed = time.perf_counter() - start
+    stored = stored_readings(analytics)
+    dropped = analytics.dropped
+    analytics.close()
+    return enqueue, elapsed, stored, dropped
+
+
+def run_writes(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        baseline = bench_writes_baseline(os.path.join(tmp, "baseline.db"), args.rows)
+        enqueue, batched, stored, dropped = bench_writes_batched(os.path.join(tmp, "batched.db"), args.rows)
+    
+    print(f"log_reading x {args.rows}")
+    print(f"  commit per row : {args.rows / baseline:12.0f} inserts/s")
+    print(f"  batched writer : {stored / batched:12.0f} inserts/s ({stored} rows stored)")
+    print(f"  caller cost    : {enqueue / args.rows * 1e6:12.2f} us/reading")
+    if dropped or stored != args.rows:
+        raise SystemExit(f"batched writer: {dropped} readings dropped, {stored} of {args.rows} stored")
+    return {
+        "rows": args.rows,
+        "commit_per_row_per_s": args.rows / baseline,
+        "batched_per_s": stored / batched,
+        "caller_us": enqueue / args.rows * 1e6,
+        "stored": stored,
+        "dropped": dropped,
+    }
+
+
+# The text-timestamp queries used before the ts column existed
+LEGACY_QUERIES = {
+    "get_stats": '''
+        SELECT COUNT(*), AVG(power_watts), MAX(power_watts), MIN(power_watts), SUM(power_watts)
+        FROM power_readings WHERE timestamp > ?
+    ''',
+    "get_hourly_average": '''
+        SELECT strftime('%Y-%m-%d %H:00', timestamp) as hour, AVG(power_watts)
+        FROM power_readings WHERE timestamp > ? GROUP BY hour ORDER BY hour
+    ''',
+    "get_daily_average": '''
+        SELECT DATE(timestamp) as day, AVG(power_watts), SUM(power_watts) / 60 / 1000
+        FROM power_readings WHERE timestamp > ? GROUP BY day ORDER BY day
+    ''',
+}
+QUERY_WINDOWS = {"get_stats": 24, "get_hourly_average": 24, "get_daily_average": 30 * 24}
+
+
+def build_legacy_db(db_path, rows, interval):
+    """Pre-migration schema with rows spaced interval seconds, ending now"""
+    conn = sqlite3.connect(db_path)
+    conn.execute('''
+        CREATE TABLE power_readings (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+            power_watts REAL,
+            cpu_temp REAL,
+            gpu_temp REAL
+        )
+    ''')
+    start = int(time.time()) - rows * interval
+    conn.executemany('''
+        INSERT INTO power_readings (timestamp, power_watts, cpu_temp, gpu_temp)
+        VALUES (datetime(?, 'unixepoch'), ?, ?, ?)
+    ''', ((start + i * interval, 40.0 + i % 50, 45.0 + i % 20, 50.0 + i % 25) for i in range(rows)))
+    conn.commit()
+    conn.close()
+
+
+def time_call(func, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def run_queries(args):
+    results = []
+    for rows in args.rows:
+        with tempfile.TemporaryDirectory() as tmp:
+            legacy_path = os.path.join(tmp, "legacy.db")
+            build_legacy_db(legacy_path, rows, args.interval)
+            
+            migrated_path = os.path.join(tmp, "migrated.db")
+            shutil.copy(legacy_path, migrated_path)
+            start = time.perf_counter()
+            analytics = PowerAnalytics(migrated_path)
+            migrate = time.perf_counter() - start
+            
+            conn = sqlite3.connect(legacy_path)
+            print(f"{rows} rows, one every {args.interval}s (migration {migrate:.2f}s)")
+            print(f"  {'query':<20} {'legacy':>10} {'current':>10} {'cached':>10}")
+            queries = {}
+            for name, sql in LEGACY_QUERIES.items():
+                hours = QUERY_WINDOWS[name]
+                since = (datetime.utcnow() - timedelta(hours=hours)).strftime('%Y-%m-%d %H:%M:%S')
+                legacy = time_call(lambda: conn.execute(sql, (since,)).fetchall())
+                method = getattr(analytics, name)
+                arg = hours // 24 if name == "get_daily_average" else hours
+                
+                def uncached():
+                    analytics.clear_cache()
+                    method(arg)
+                indexed = time_call(uncached)
+                cached = time_call(lambda: method(arg))
+                print(f"  {name:<20} {legacy * 1000:8.1f}ms {indexed * 1000:8.1f}ms {cached * 1000:8.3f}ms")
+                queries[name] = {"legacy_ms": legacy * 1000, "current_ms": indexed * 1000,
+                                 "cached_ms": cached * 1000}
+            conn.close()
+            analytics.close()
+            results.append({"rows": rows, "interval": args.interval,
+                            "migration_s": migrate, "queries": queries})
+    return results
+
+
+def file_size(path):
+    """Bytes on disk of a database file and its WAL"""
+    return sum(os.path.getsize(p) for p in (path, path + "-wal") if os.path.exists(p))
+
+
+def run_retention(args):
+    """cleanup_old_data: one DELETE over a single table vs dropping partitions"""
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy_path = os.path.join(tmp, "legacy.db")
+        build_legacy_db(legacy_path, args.rows, args.interval)
+        partitioned_path = os.path.join(tmp, "partitioned.db")
+        shutil.copy(legacy_path, partitioned_path)
+        cutoff = (datetime.utcnow() - timedelta(days=args.days)).strftime('%Y-%m-%d %H:%M:%S')
+        
+        conn = sqlite3.connect(legacy_path)
+        before = file_size(legacy_path)
+        start = time.perf_counter()
+        deleted = conn.execute("DELETE FROM power_readings WHERE timestamp < ?", (cutoff,)).rowcount
+        conn.commit()
+        single = time.perf_counter() - start
+        conn.close()
+        single_sizes = (before, file_size(legacy_path))
+        
+        analytics = PowerAnalytics(partitioned_path)
+        analytics.flush()
+        partition_files = lambda: sum(file_size(os.path.join(analytics.partition_dir, f))
+                                      for f in os.listdir(analytics.partition_dir) if f.endswith(".db"))
+        before = file_size(partitioned_path) + partition_files()
+        start = time.perf_counter()
+        dropped = analytics.cleanup_old_data(args.days)
+        partitioned = time.perf_counter() - start
+        partitioned_sizes = (before, file_size(partitioned_path) + partition_files())
+        analytics.close()
+    
+    print(f"cleanup_old_data({args.days}) on {args.rows} rows, one every {args.interval}s")
+    print(f"  single table DELETE : {single * 1000:9.1f}ms, {deleted} rows, "
+          f"{single_sizes[0] / 1e6:.1f} -> {single_sizes[1] / 1e6:.1f} MB")
+    print(f"  drop partitions     : {partitioned * 1000:9.1f}ms, {dropped} partitions, "
+          f"{partitioned_sizes[0] / 1e6:.1f} -> {partitioned_sizes[1] / 1e6:.1f} MB")
+    return {
+        "rows": args.rows, "days": args.days,
+        "delete_ms": single * 1000, "delete_bytes": single_sizes,
+        "partitions_ms": partitioned * 1000, "partitions_dropped": dropped, "partitions_bytes": partitioned_sizes,
+    }
+
+
+VirtualMemory = namedtuple("VirtualMemory", "total available percent used free")
+NetIO = namedtuple("NetIO", "bytes_sent bytes_recv packets_sent packets_recv")
+
+
+DiskIO = namedtuple("DiskIO", "read_count write_count read_bytes write_bytes")
+
+# Interface names as on a Windows laptop with Hyper-V and a VPN
+FAKE_NICS = ("Ethernet", "Wi-Fi", "vEthernet (WSL)", "Loopback Pseudo-Interface 1", "VPN")
+
+
+class FakePsutil:
+    """The psutil calls the collector makes, with cheap synthetic values"""
+    
+    def __init__(self, cores=8):
+        self.ticks = 0
+        self.cores = cores
+        self.memory = VirtualMemory(16 << 30, 8 << 30, 50.0, 8 << 30, 8 << 30)
+        self.processes = []
+    
+    def cpu_percent(self, interval=None, percpu=False):
+        if percpu:
+            return [float((self.ticks + i) * 13 % 100) for i in range(self.cores)]
+        self.ticks += 1
+        return float(self.ticks * 7 % 100)
+    
+    def cpu_count(self):
+        return self.cores
+    
+    def virtual_memory(self):
+        return self.memory
+    
+    def net_io_counters(self, pernic=False):
+        t = self.ticks
+        if pernic:
+            return {name: NetIO(t * 150000 * i, t * 900000 * i, t * 100, t * 600)
+                    for i, name in enumerate(FAKE_NICS, 1)}
+        return NetIO(t * 150000, t * 900000, t * 100, t * 600)
+    
+    def disk_io_counters(self, perdisk=False):
+        t = self.ticks
+        return {name: DiskIO(t * 10, t * 20, t * 4096 * i, t * 8192 * i)
+                for i, name in enumerate(("PhysicalDrive0", "PhysicalDrive1"), 1)}
+    
+    def process_iter(self, attrs=None, ad_value=None):
+        return iter(self.processes)
+
+
+CpuTimes = namedtuple("CpuTimes", "user system")
+MemoryInfo = namedtuple("MemoryInfo", "rss vms")
+
+
+class FakeProcess:
+    def __init__(self, pid):
+        self.pid = pid
+        self.info = {"cpu_times": CpuTimes(pid * 0.01, pid * 0.002),
+                     "memory_info": MemoryInfo(pid * 4096, pid * 8192)}
+    
+    def name(self):
+        return f"proc{self.pid}.exe"
+
+
+@contextmanager
+def fake_psutil(process_count=0):
+    fake = FakePsutil()
+    fake.processes = [FakeProcess(pid) for pid in range(1, process_count + 1)]
+    saved = collector.psutil, counters.psutil, sensors.psutil, processes.psutil
+    collector.psutil = counters.psutil = sensors.psutil = processes.psutil = fake
+    try:
+        yield fake
+    finally:
+        collector.psutil, counters.psutil, sensors.psutil, processes.psutil = saved
+
+
+class FakeSensor:
+    def __init__(self, sensor_type, name, base):
+        self.SensorType = sensor_type
+        self.Name = name
+        self.base = base
+        self.Value = base
+
+
+class FakeHardware:
+    def __init__(self, hardware_type, name, sensors, stall=0.0):
+        self.HardwareType = hardware_type
+        self.Name = name
+        self.Identifier = f"/{hardware_type.lower()}/0"
+        self.Sensors = sensors
+        # Seconds every Update() hangs, like a driver mid-reset
+        self.stall = stall
+        self.updates = 0
+    
+    def Update(self):
+        if self.stall:
+            time.sleep(self.stall)
+        self.updates += 1
+        wobble = self.updates % 10
+        for sensor in self.Sensors:
+            sensor.Value = sensor.base + wobble
+
+
+class FakeComputer:
+    """LibreHardwareMonitor Computer with sensor_count sensors
+
+    A CPU, a GPU and memory, each with the sensors SensorPlan looks for
+    plus filler (clocks, voltages) up to its share of sensor_count, like
+    a real machine where most sensors are never displayed.
+    """
+    
+    def __init__(self, sensor_count, gpu_stall=0.0):
+        cpu = [FakeSensor("Power", "CPU Package", 45.0), FakeSensor("Temperature", "Core (Tctl/Tdie)", 55.0)]
+        gpu = [FakeSensor("Load", "D3D 3D", 20.0), FakeSensor("Load", "GPU Core", 25.0),
+               FakeSensor("Temperature", "GPU Core", 60.0)]
+        memory = [FakeSensor("Load", "Memory", 50.0)]
+        parts = (cpu, gpu, memory)
+        for i in range(max(0, sensor_count - sum(len(p) for p in parts))):
+            sensor_type = ("Clock", "Voltage", "Temperature", "Power")[i % 4]
+            parts[i % 3].append(FakeSensor(sensor_type, f"Sensor #{i}", 10.0 + i % 50))
+        self.all_hardware = [FakeHardware("Cpu", "Fake CPU", cpu), FakeHardware("GpuNvidia", "Fake GPU", gpu, gpu_stall),
+                             FakeHardware("Memory", "Generic Memory", memory)]
+        self.IsCpuEnabled = True
+        self.IsGpuEnabled = True
+        self.IsMemoryEnabled = True
+    
+    @property
+    def Hardware(self):
+        enabled = {"Cpu": self.IsCpuEnabled, "GpuNvidia": self.IsGpuEnabled, "Memory": self.IsMemoryEnabled}
+        return [hw for hw in self.all_hardware if enabled[hw.HardwareType]]
+    
+    def Close(self):
+        pass
+
+
+class FakeLHMBackend(sensors.LHMBackend):
+    """LHMBackend reading a FakeComputer instead of loading the DLL"""
+    
+    name = "fake-lhm"
+    
+    def __init__(self, sensor_count, gpu_stall=0.0):
+        self.computer = None
+        self.sensor_plan = None
+        self.com_thread = None
+        self.com_owned = False
+        self.enabled = None
+        self.sensor_count = sensor_count
+        self.gpu_stall = gpu_stall
+    
+    def start(self):
+        self.computer = FakeComputer(self.sensor_count, self.gpu_stall)
+        self.computer.IsCpuEnabled, self.computer.IsGpuEnabled = self.enabled = self.wanted_hardware()
+        self.computer.IsMemoryEnabled = False
+
+
+def summarize(samples):
+    """Latency distribution of samples (seconds) in microseconds"""
+    ordered = sorted(samples)
+    return {
+        "n": len(ordered),
+        "mean_us": statistics.fmean(ordered) * 1e6,
+        "p50_us": ordered[len(ordered) // 2] * 1e6,
+        "p99_us": ordered[min(len(ordered) - 1, len(ordered) * 99 // 100)] * 1e6,
+        "max_us": ordered[-1] * 1e6,
+    }
+
+
+def print_latency(label, summary):
+    print(f"  {label:<24} {summary['mean_us']:9.1f}us mean {summary['p50_us']:9.1f}us p50 "
+          f"{summary['p99_us']:9.1f}us p99")
+
+
+def time_ticks(func, ticks, warmup=10):
+    for _ in range(warmup):
+        func()
+    samples = []
+    for _ in range(ticks):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def run_collect(args):
+    """Collector.sample() latency against the fake providers"""
+    results = []
+    stall = args.gpu_stall / 1000
+    print(f"Collector.sample x {args.ticks}" + (f", GPU Update() stalling {args.gpu_stall:.0f} ms" if stall else ""))
+    with fake_psutil():
+        for count in args.sensors:
+            for trace in (False, True):
+                backend = FakeLHMBackend(count, stall)
+                col = Collector(backend=backend, log_analytics=False, trace=trace)
+                stale_ticks = []
+                col.add_listener(lambda stats: stale_ticks.append(bool(stats.stale)))
+                backend.start()
+                col.reset()
+                summary = summarize(time_ticks(col.sample, args.ticks))
+                backend.close()
+                summary["stale_share"] = sum(stale_ticks[-args.ticks:]) / args.ticks
+                label = f"{count} sensors{', traced' if trace else ''}"
+                if stall:
+                    label += f", {summary['stale_share']:.0%} stale"
+                print_latency(label, summary)
+                results.append({"sensors": count, "trace": trace, "gpu_stall_ms": args.gpu_stall, **summary})
+    return results
+
+
+@contextmanager
+def isolated_bar(**settings):
+    """Settings and analytics database of a throwaway bar, in a temp dir
+
+    SysMonBar's QSettings become an INI file there, seeded with
+    settings, and analytics a database there, so a benchmark neither
+    reads nor changes the user's.
+    """
+    from PyQt6.QtCore import QSettings
+    import analytics
+    import main as gui
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        ini_path = os.path.join(tmp, "SysMonBar.ini")
+        store = QSettings(ini_path, QSettings.Format.IniFormat)
+        for key, value in settings.items():
+            store.setValue(key, value)
+        store.sync()
+        saved = gui.QSettings, analytics.DEFAULT_DB_PATH
+        # The bar opens QSettings("MyCompany", "SysMonBar"), always in the native store
+        gui.QSettings = lambda organization, application: QSettings(ini_path, QSettings.Format.IniFormat)
+        analytics.DEFAULT_DB_PATH = os.path.join(tmp, "analytics.db")
+        try:
+            yield tmp
+        finally:
+            gui.QSettings, analytics.DEFAULT_DB_PATH = saved
+
+
+def run_ui(args):
+    """update_ui and paint cost of the bar, on the offscreen Qt platform"""
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PyQt6.QtWidgets import QApplication
+    import monitor
+    import main as gui
+    
+    app = QApplication.instance() or QApplication([])
+    results = {}
+    # Nothing that outlives the run or runs beside it: no logging,
+    # exporter, shared ring or process scans
+    with fake_psutil(), isolated_bar(log_analytics=False, exporter_enabled=False, shm_enabled=False,
+                                     show_processes=False):
+        saved = monitor.Collector
+        monitor.Collector = lambda: Collector(backend=FakeLHMBackend(args.sensors), log_analytics=False)
+        try:
+            window = gui.SysMonBar()
+        finally:
+            monitor.Collector = saved
+        thread = window.monitor_thread
+        thread.stop()
+        thread.wait()
+        col = thread.collector
+        # Drive samples by hand, without the stats_ready round trip
+        col.listeners = []
+        col.backend.start()
+        col.reset()
+        window.show()
+        app.processEvents()
+        
+        print(f"update_ui + paint x {args.ticks}")
+        for mode in ("bar", "graph"):
+            for key in ("display_cpu", "display_ram", "display_gpu", "display_net"):
+                window.settings[key] = mode
+            window.update_display_types()
+            app.processEvents()
+            
+            update, paint = [], []
+            def tick():
+                col.sample()
+                start = time.perf_counter()
+                window.update_ui()
+                mid = time.perf_counter()
+                app.processEvents()
+                update.append(mid - start)
+                paint.append(time.perf_counter() - mid)
+            for _ in range(10):
+                tick()
+            update.clear()
+            paint.clear()
+            for _ in range(args.ticks):
+                tick()
+            
+            results[mode] = {"update_ui": summarize(update), "paint": summarize(paint)}
+            print_latency(f"{mode} update_ui", results[mode]["update_ui"])
+            print_latency(f"{mode} paint", results[mode]["paint"])
+        window.close()
+    return results
+
+
+def scan_naive():
+    """What a per-pid loop without caching costs: a fresh Process each time"""
+    import psutil
+    usage = []
+    for pid in psutil.pids():
+        try:
+            proc = psutil.Process(pid)
+            usage.append((pid, proc.name(), proc.cpu_times(), proc.memory_info()))
+        except psutil.Error:
+            pass
+    return usage
+
+
+def run_processes(args):
+    """ProcessTracker.scan() cost, on this machine and with fake process tables"""
+    results = []
+    children = []
+    # Idle children to get a realistic 1000+ process table
+    command = ["sleep", "600"] if shutil.which("sleep") else [sys.executable, "-c", "import time; time.sleep(600)"]
+    for _ in range(args.spawn):
+        children.append(subprocess.Popen(command))
+    print(f"ProcessTracker.scan x {args.scans}")
+    try:
+        tracker = processes.ProcessTracker()
+        tracker.scan()
+        scans = summarize(time_ticks(tracker.scan, args.scans, warmup=1))
+        naive = summarize(time_ticks(scan_naive, args.scans, warmup=1))
+    finally:
+        for child in children:
+            child.kill()
+            child.wait()
+    print_latency(f"this machine ({tracker.process_count})", scans)
+    print_latency("  uncached per-pid loop", naive)
+    results.append({"processes": tracker.process_count, "source": "psutil", **scans,
+                    "naive": naive})
+    
+    for count in args.fake:
+        with fake_psutil(count):
+            tracker = processes.ProcessTracker()
+            scans = summarize(time_ticks(tracker.scan, args.scans, warmup=1))
+        print_latency(f"fake, {count} processes", scans)
+        results.append({"processes": count, "source": "fake", **scans})
+    return results
+
+
+# A simulated afternoon on a laptop: (seconds, event, argument). "input"
+# is keyboard/mouse use the policy only learns of from poll(); "expect"
+# checks (watched, low_power) after everything before it has happened.
+IDLE_SCRIPT = (
+    (0, "battery", False),
+    (0, "expect", (True, False)),
+    (1800, "screen", False),
+    (1800, "expect", (False, True)),
+    (2400, "screen", True),
+    (2400, "expect", (True, False)),
+    (3000, "battery", True),
+    # Idle since 2400: low power until poll() sees the input
+    (3000, "expect", (True, True)),
+    (3000, "input", None),
+    (3002, "expect", (True, False)),
+    *((3000 + t, "input", None) for t in range(10, 300, 10)),
+    # Full rate until the hold runs out after the last input, at the next poll
+    (3348, "expect", (True, False)),
+    (3350, "expect", (True, True)),
+    (4200, "activity", None),
+    (4200, "expect", (True, False)),
+    (4258, "expect", (True, False)),
+    (4260, "expect", (True, True)),
+    (4500, "locked", True),
+    (4500, "expect", (False, True)),
+    (5400, "locked", False),
+    (5400, "expect", (True, False)),
+    (5458, "expect", (True, False)),
+    (5460, "expect", (True, True)),
+    (6000, "visible", False),
+    (6000, "expect", (False, True)),
+    (6600, "battery", False),
+    (6600, "expect", (False, False)),
+    (6600, "visible", True),
+    (6600, "expect", (True, False)),
+    (7200, "end", None),
+)
+
+
+def run_idle(args):
+    """Samples, repaints and raises under the idle policy, on a simulated clock
+
+    Replays IDLE_SCRIPT against an IdlePolicy and a Scheduler sharing a
+    fake clock, with the battery and input idle time injected, changing
+    the intervals the way SysMonBar.apply_idle does, and compares the
+    work done with the bar running flat out. At every "expect" it checks
+    the policy's flags, the sampling intervals and that nothing was
+    painted while unwatched; any mismatch fails the run.
+    """
+    now = [0.0]
+    clock = lambda: now[0]
+    battery = [False]
+    last_input = [None]
+    input_idle = lambda: None if last_input[0] is None else now[0] - last_input[0]
+    # IDLE_SCRIPT's expectations are for a 60 s activity hold
+    policy = idle.IdlePolicy(clock=clock, battery=lambda: battery[0], input_idle=input_idle, hold=60.0)
+    counts = {"system": 0, "sensors": 0, "paints": 0}
+    failures = []
+
+    def sampled(name):
+        def run():
+            counts[name] += 1
+        return run
+
+    scheduler = Scheduler([SampleGroup("system", sampled("system"), args.interval),
+                           SampleGroup("sensors", sampled("sensors"), args.interval),
+                           SampleGroup("analytics", lambda: None, DEFAULT_INTERVALS["analytics"])], clock=clock)
+    low_interval = max(args.interval, DEFAULT_INTERVALS["analytics"])
+    raise_seconds = [0.0, 0.0]  # watched time so far, when watching started
+    paused_paints = [None]  # paint count when painting stopped
+
+    def apply(policy):
+        interval = low_interval if policy.low_power else args.interval
+        scheduler["system"].set_interval(interval)
+        scheduler["sensors"].set_interval(interval)
+        if policy.watched:
+            raise_seconds[1] = now[0]
+            paused_paints[0] = None
+        else:
+            raise_seconds[0] += now[0] - raise_seconds[1]
+            paused_paints[0] = counts["paints"]
+        print(f"  {now[0]:6.0f}s  {policy.describe()}")
+
+    def check(expected):
+        watched, low_power = expected
+        got = (policy.watched, policy.low_power)
+        if got != expected:
+            failures.append(f"{now[0]:.0f}s: watched, low_power {got}, expected {expected}")
+        interval = low_interval if low_power else args.interval
+        for name in ("system", "sensors"):
+            if scheduler[name].interval != interval:
+                failures.append(f"{now[0]:.0f}s: {name} every {scheduler[name].interval:g} s, expected {interval:g} s")
+        if not watched and paused_paints[0] != counts["paints"]:
+            failures.append(f"{now[0]:.0f}s: painted while not watched")
+
+    policy.add_listener(apply)
+    scheduler.start()
+    print(f"Idle policy over {IDLE_SCRIPT[-1][0] / 3600:.1f} simulated hours, sampling every {args.interval:g} s")
+    print(f"  {0:6.0f}s  {policy.describe()}")
+    next_poll = idle.POLL_INTERVAL
+    for at, event, value in IDLE_SCRIPT:
+        # Run the scheduler and poll() up to the event
+        while True:
+            due = min(next_poll, min(g.next_due for g in scheduler.groups.values()))
+            if due > at:
+                break
+            now[0] = due
+            ran = scheduler.run_due()
+            # A published sample is one update_ui, if the bar is painting
+            if ran and policy.watched and any(g.name != "analytics" for g in ran):
+                counts["paints"] += 1
+            if due >= next_poll:
+                policy.poll()
+                next_poll += idle.POLL_INTERVAL
+        now[0] = at
+        if event == "battery":
+            battery[0] = value
+            policy.set_battery(value)
+        elif event == "screen":
+            policy.set_screen(value)
+        elif event == "locked":
+            policy.set_locked(value)
+        elif event == "visible":
+            policy.set_visible(value)
+        elif event == "activity":
+            policy.activity()
+        elif event == "input":
+            last_input[0] = at
+        elif event == "expect":
+            check(value)
+
+    end = IDLE_SCRIPT[-1][0]
+    if policy.watched:
+        raise_seconds[0] += end - raise_seconds[1]
+    counts["raises"] = int(raise_seconds[0] * 2)
+    baseline = {"system": int(end / args.interval), "sensors": int(end / args.interval),
+                "paints": int(end / args.interval), "raises": end * 2}
+    for name in ("system", "sensors", "paints", "raises"):
+        print(f"  {name:<10} {counts[name]:7d} vs {baseline[name]:7d} always on ({counts[name] / baseline[name]:.0%})")
+    checks = sum(1 for _, event, _ in IDLE_SCRIPT if event == "expect")
+    if failures:
+        for failure in failures:
+            print(f"  ✗ {failure}")
+        raise SystemExit(f"idle policy: {len(failures)} check(s) failed")
+    print(f"  ✓ {checks} checks passed")
+    return {"counts": counts, "baseline": baseline, "checks": checks}
+
+
+def run_all(args):
+    results = {}
+    for name, func, defaults in (
+            ("collect", run_collect, {"sensors": [50, 500], "ticks": 2000, "gpu_stall": 0.0}),
+            ("ui", run_ui, {"sensors": 50, "ticks": 500}),
+            ("processes", run_processes, {"fake": [1000, 5000], "scans": 20, "spawn": 0}),
+            ("writes", run_writes, {"rows": 20000}),
+            ("queries", run_queries, {"rows": args.rows, "interval": 1})):
+        try:
+            results[name] = func(argparse.Namespace(**defaults))
+        except ImportError as e:
+            print(f"{name}: skipped ({e})")
+            results[name] = {"skipped": str(e)}
+    return results
+
+
+STARTUP_MARKS = ("imports", "first_frame", "first_values", "sensors_ready")
+
+
+def startup_child(t0, timeout):
+    """Start the GUI offscreen and print when each startup mark was hit
+
+    Times are seconds since t0, the parent's time.time() just before it
+    spawned this process, so interpreter startup is included.
+    first_frame is the first paint of the (empty) bar, first_values the
+    first paint after a sample arrived, sensors_ready the first sample
+    after the sensor backend finished loading.
+    """
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    marks = {}
+    
+    def mark(name):
+        marks.setdefault(name, time.time() - t0)
+    
+    from PyQt6.QtWidgets import QApplication
+    from PyQt6.QtCore import QTimer
+    import analytics
+    import main
+    mark("imports")
+    
+    tmp = tempfile.TemporaryDirectory()
+    analytics.DEFAULT_DB_PATH = os.path.join(tmp.name, "startup.db")
+    app = QApplication([])
+    
+    paint_event = main.MetricWidget.paintEvent
+    def timed_paint_event(widget, event):
+        mark("first_frame")
+        if "first_sample" in marks:
+            mark("first_values")
+        paint_event(widget, event)
+    main.MetricWidget.paintEvent = timed_paint_event
+    
+    window = main.SysMonBar()
+    backend = window.monitor_thread.collector.backend
+    ready = getattr(backend, "ready", None)
+    
+    def on_stats():
+        mark("first_sample")
+        if ready is None or ready.is_set():
+            mark("sensors_ready")
+        if all(name in marks for name in STARTUP_MARKS):
+            window.close_app()
+    window.monitor_thread.stats_ready.connect(on_stats)
+    QTimer.singleShot(int(timeout * 1000), window.close_app)
+    
+    window.show()
+    app.exec()
+    marks["backend"] = backend.name
+    marks["deferred"] = [m for m in ("settings", "analytics_window", "clr")
+                         if m not in sys.modules]
+    print(json.dumps(marks))
+
+
+def run_startup(args):
+    if args.child is not None:
+        startup_child(args.child, args.timeout)
+        return
+    
+    runs = []
+    for _ in range(args.runs):
+        t0 = time.time()
+        out = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "startup", "--child", repr(t0),
+             "--timeout", str(args.timeout)],
+            capture_output=True, text=True, check=True)
+        runs.append(json.loads(out.stdout.strip().splitlines()[-1]))
+    
+    print(f"startup over {args.runs} runs, backend {runs[0]['backend']}, "
+          f"not imported: {', '.join(runs[0]['deferred']) or 'none'}")
+    results = {"runs": runs}
+    for name in STARTUP_MARKS:
+        times = [run[name] for run in runs if name in run]
+        if times:
+            results[name] = {"median_ms": statistics.median(times) * 1000, "max_ms": max(times) * 1000}
+            print(f"  {name:<14} {statistics.median(times) * 1000:8.1f}ms median  "
+                  f"{max(times) * 1000:8.1f}ms max")
+        else:
+            print(f"  {name:<14} not reached within {args.timeout}s")
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="SysMonBar benchmarks")
+    parser.add_argument("--json", metavar="FILE", help="also write the results as JSON ('-' for stdout)")
+    sub = parser.add_subparsers(dest="command", required=True)
+    
+    writes = sub.add_parser("writes", help="log_reading throughput")
+    writes.add_argument("--rows", type=int, default=20000)
+    writes.set_defaults(func=run_writes)
+    
+    queries = sub.add_parser("queries", help="analytics query latency")
+    queries.add_argument("--rows", type=int, nargs="+", default=[10000, 1000000, 10000000])
+    queries.add_argument("--interval", type=int, default=1, help="seconds between rows")
+    queries.set_defaults(func=run_queries)
+    
+    retention = sub.add_parser("retention", help="cleanup_old_data: DELETE vs dropping partitions")
+    retention.add_argument("--rows", type=int, default=1000000)
+    retention.add_argument("--interval", type=int, default=15, help="seconds between rows")
+    retention.add_argument("--days", type=int, default=90, help="keep this many days")
+    retention.set_defaults(func=run_retention)
+    
+    startup = sub.add_parser("startup", help="time to first frame and first sensor value")
+    startup.add_argument("--runs", type=int, default=5)
+    startup.add_argument("--timeout", type=float, default=30.0, help="give up on a run after S seconds")
+    startup.add_argument("--child", type=float, help=argparse.SUPPRESS)
+    startup.set_defaults(func=run_startup)
+    
+    collect = sub.add_parser("collect", help="per-tick collection latency (fake sensors)")
+    collect.add_argument("--sensors", type=int, nargs="+", default=[50, 500], help="LHM sensor counts")
+    collect.add_argument("--ticks", type=int, default=2000)
+    collect.add_argument("--gpu-stall", type=float, default=0.0, metavar="MS",
+                         help="make every fake GPU Update() hang this long (use with fewer --ticks)")
+    collect.set_defaults(func=run_collect)
+    
+    ui = sub.add_parser("ui", help="update_ui and paint cost (offscreen Qt, fake sensors)")
+    ui.add_argument("--sensors", type=int, default=50)
+    ui.add_argument("--ticks", type=int, default=500)
+    ui.set_defaults(func=run_ui)
+    
+    procs = sub.add_parser("processes", help="top-N process scan cost")
+    procs.add_argument("--fake", type=int, nargs="*", default=[1000, 5000],
+                       help="also time the bookkeeping against fake process tables of these sizes")
+    procs.add_argument("--scans", type=int, default=20)
+    procs.add_argument("--spawn", type=int, default=0, metavar="N",
+                       help="start N idle child processes first (e.g. 1000)")
+    procs.set_defaults(func=run_processes)
+    
+    idling = sub.add_parser("idle", help="idle policy on a simulated clock: checks, samples, paints, raises")
+    idling.add_argument("--interval", type=float, default=1.0, help="full-rate sampling interval, seconds")
+    idling.set_defaults(func=run_idle)
+    
+    everything = sub.add_parser("all", help="collect, ui, writes and queries")
+    everything.add_argument("--rows", type=int, nargs="+", default=[10000, 1000000, 10000000],
+                            help="analytics table sizes for the query benchmark")
+    everything.set_defaults(func=run_all)
+    
+    args = parser.parse_args(argv)
+    results = args.func(args)
+    if args.json and getattr(args, "child", None) is None:
+        report = {
+            "benchmark": args.command,
+            "time": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "args": {k: v for k, v in vars(args).items() if k not in ("func", "json", "child")},
+            "results": results,
+        }
+        if args.json == "-":
+            print(json.dumps(report, indent=2))
+        else:
+            with open(args.json, "w") as f:
+                json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
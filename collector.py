@@ -0,0 +1,333 @@
+import time
+import threading
+import psutil
+from sensors import create_backend
+from history import MetricHistory
+from snapshot import SnapshotBuffer, StatsSnapshot
+from diagnostics import Diagnostics
+from counters import CoreCollector, NetCollector, DiskCollector
+from scheduler import Scheduler, SampleGroup
+
+# Samples further apart than this (suspend, stalls) are not integrated
+MAX_ENERGY_GAP = 5.0
+
+# Sampling groups: default interval (s) and cost budget (share of it)
+DEFAULT_INTERVALS = {"system": 1.0, "sensors": 1.0, "analytics": 60.0}
+BUDGETS = {"system": 0.05, "sensors": 0.2, "analytics": None}
+
+# What can be sampled; the last four come from the sensor backend
+SOURCES = frozenset(("cpu", "ram", "cores", "net", "disk", "power", "gpu", "cpu_temp", "gpu_temp"))
+SENSOR_SOURCES = frozenset(("power", "gpu", "cpu_temp", "gpu_temp"))
+# Needed for the analytics readings (power falls back to a CPU estimate)
+LOGGED_SOURCES = frozenset(("cpu", "power", "cpu_temp", "gpu_temp"))
+
+
+class Collector:
+    """The sampling and logging pipeline, with no Qt dependency
+
+    run() samples the metrics into self.snapshots and self.history,
+    integrates energy and logs readings to PowerAnalytics, until stop()
+    is called. Metrics are sampled in groups on a Scheduler, each at its
+    own interval (DEFAULT_INTERVALS, overridden by intervals): "system"
+    (psutil CPU, memory, network, disk), "sensors" (the sensor backend:
+    power, GPU, temperatures) and "analytics" (database logging). A
+    snapshot is published after every tick that sampled something,
+    carrying the newest values of every group.
+
+    Only the sources (SOURCES) someone asked for are sampled: each
+    consumer states its needs with set_demand(owner, sources), the
+    constructor's sources under "base", and logging adds LOGGED_SOURCES.
+    Fields of sources nobody wants stay 0.
+
+    It runs on whatever thread calls it: the GUI wraps it in
+    SystemMonitor (a QThread), the headless collector (python -m
+    sysmonbar collect) runs it directly.
+    """
+
+    def __init__(self, backend=None, log_analytics=True, trace=False, net_include=None, net_exclude=None,
+                 intervals=None, sources=SOURCES):
+        self.running = True
+        self.stop_event = threading.Event()
+        # Set by stop() and set_interval() to cut the wait for the next deadline short
+        self.wakeup = threading.Event()
+        self.diagnostics = Diagnostics(enabled=trace)
+        self.backend = backend or create_backend()
+        self.backend.diagnostics = self.diagnostics
+        self.log_analytics = log_analytics
+        self.analytics = None
+        self.analytics_failed = False
+        self.demands = {"base": frozenset(sources)}
+        self.update_demand()
+        self.cores = CoreCollector()
+        self.net = NetCollector(net_include, net_exclude)
+        self.disk = DiskCollector()
+        self.history = MetricHistory()
+        self.snapshots = SnapshotBuffer()
+        # Newest value of every field, whichever group sampled it
+        self.current = StatsSnapshot()
+        self.dirty = False
+        intervals = {**DEFAULT_INTERVALS, **(intervals or {})}
+        self.scheduler = Scheduler([
+            SampleGroup("system", self.sample_system, intervals["system"], BUDGETS["system"]),
+            SampleGroup("sensors", self.sample_sensors, intervals["sensors"], BUDGETS["sensors"]),
+            SampleGroup("analytics", self.log_due, intervals["analytics"], BUDGETS["analytics"]),
+        ], self.diagnostics)
+        # Called with the published StatsSnapshot after every sample, on
+        # the collector thread; replaced rather than mutated (see
+        # add_listener) so it can change while a sample is running
+        self.listeners = []
+        # Energy integrated from every sample; the pending part is handed
+        # to analytics with the next logged reading
+        self.energy_total_j = 0.0
+        self.pending_joules = 0.0
+        self.pending_seconds = 0.0
+        self.last_reading = (0, 0, 0)
+
+    def run(self):
+        self.backend.start()
+        self.reset()
+        scheduler = self.scheduler
+        scheduler.start()
+
+        while self.running:
+            try:
+                wait = scheduler.wait()
+                if wait > 0 and self.wakeup.wait(wait):
+                    self.wakeup.clear()
+                    # Stopping, or the deadlines moved
+                    continue
+                diag = self.diagnostics
+                trace = diag.enabled
+                if trace:
+                    t_start = time.perf_counter()
+                ran = scheduler.run_due()
+                if self.dirty:
+                    self.publish()
+                if trace and ran:
+                    diag.record("sample", time.perf_counter() - t_start)
+            except Exception as e:
+                print(f"Monitor error: {e}")
+                self.diagnostics.error("sample", e)
+                self.stop_event.wait(1)
+
+        self.backend.close()
+        if self.analytics:
+            # Don't lose the energy since the last logged reading
+            if self.log_analytics and self.pending_seconds > 0:
+                self.log_reading(*self.last_reading)
+            self.analytics.flush(timeout=5)
+
+    def reset(self):
+        """Start rate and energy calculations afresh (backend started)"""
+        # Baselines for the per-core load and the byte counter rates
+        self.cores.update()
+        self.net.update()
+        self.disk.update()
+        self.last_sample = None
+        self.last_power = 0
+        self.last_gap_limit = MAX_ENERGY_GAP
+        self.dirty = False
+
+    def set_demand(self, owner, sources=SOURCES):
+        """Declare what owner needs sampled (default everything); empty withdraws it"""
+        if sources:
+            self.demands[owner] = frozenset(sources)
+        else:
+            self.demands.pop(owner, None)
+        self.update_demand()
+
+    def set_logging(self, enabled):
+        """Turn analytics logging on or off while running"""
+        self.log_analytics = enabled
+        self.update_demand()
+
+    def update_demand(self):
+        demand = frozenset().union(*self.demands.values())
+        if self.log_analytics:
+            demand |= LOGGED_SOURCES
+        # Replaced as a whole; the sampling groups read it once per run
+        self.demand = demand
+        self.backend.configure(demand & SENSOR_SOURCES)
+
+    def set_interval(self, group, seconds):
+        """Change a sampling group's interval; a shorter one takes effect right away"""
+        self.scheduler[group].set_interval(seconds)
+        self.wakeup.set()
+
+    def sample(self):
+        """Sample every group now and publish; returns the snapshot
+
+        run() goes through the scheduler instead, where each group keeps
+        its own interval.
+        """
+        diag = self.diagnostics
+        trace = diag.enabled
+        if trace:
+            t_start = time.perf_counter()
+        self.sample_system()
+        self.sample_sensors()
+        stats = self.publish()
+        if trace:
+            diag.record("sample", time.perf_counter() - t_start)
+        return stats
+
+    def sample_system(self):
+        """CPU, memory, per-core load, network and disk"""
+        diag = self.diagnostics
+        trace = diag.enabled
+        if trace:
+            clock = time.perf_counter
+            t_start = clock()
+
+        current = self.current
+        demand = self.demand
+        # Turned-off sources drop to 0 rather than freeze; the power
+        # estimate falls back on CPU load
+        if "cpu" in demand or "power" in demand:
+            current.cpu = self.backend.cpu_percent()
+        else:
+            current.cpu = 0.0
+        if "ram" in demand:
+            ram = psutil.virtual_memory()
+            current.ram_percent = ram.percent
+            current.ram_used_gb = ram.used / (1024**3)
+            current.ram_total_gb = ram.total / (1024**3)
+        else:
+            current.ram_percent = current.ram_used_gb = current.ram_total_gb = 0.0
+        if trace:
+            t_psutil = clock()
+            diag.record("psutil", t_psutil - t_start)
+
+        current.cores = self.cores.update() if "cores" in demand else ()
+        current.net_up, current.net_down = self.net.update() if "net" in demand else (0.0, 0.0)
+        current.disk_read, current.disk_write = self.disk.update() if "disk" in demand else (0.0, 0.0)
+        if trace:
+            diag.record("counters", clock() - t_psutil)
+        self.dirty = True
+
+    def sample_sensors(self):
+        """Power, GPU load and temperatures from the sensor backend"""
+        diag = self.diagnostics
+        trace = diag.enabled
+        if trace:
+            t_start = time.perf_counter()
+        if self.demand.isdisjoint(SENSOR_SOURCES):
+            power_watts, cpu_temp, gpu_usage, gpu_temp = 0, 0, 0, 0
+            stale = ()
+        else:
+            power_watts, cpu_temp, gpu_usage, gpu_temp = self.backend.read()
+            stale = self.backend.stale
+        if trace:
+            diag.record("sensors", time.perf_counter() - t_start)
+
+        if power_watts == 0:
+            power_watts = 15 + (self.current.cpu / 100) * 50
+
+        # Trapezoidal integration over the real elapsed time
+        sample_time = time.monotonic()
+        gap_limit = max(MAX_ENERGY_GAP, 2 * self.scheduler["sensors"].period)
+        if self.last_sample is not None:
+            dt = sample_time - self.last_sample
+            # A backed-off or idle-throttled sensors group legitimately
+            # samples further apart, up to the interval it was on before
+            if 0 < dt <= max(gap_limit, self.last_gap_limit):
+                joules = (self.last_power + power_watts) / 2 * dt
+                self.energy_total_j += joules
+                self.pending_joules += joules
+                self.pending_seconds += dt
+        self.last_sample = sample_time
+        self.last_gap_limit = gap_limit
+        self.last_power = power_watts
+        self.last_reading = (power_watts, cpu_temp, gpu_temp)
+
+        if cpu_temp > 0 and gpu_temp > 0:
+            combined_temp = max(cpu_temp, gpu_temp)
+        elif cpu_temp > 0:
+            combined_temp = cpu_temp
+        elif gpu_temp > 0:
+            combined_temp = gpu_temp
+        else:
+            combined_temp = 0
+        if "cpu_temp" in stale or "gpu_temp" in stale:
+            stale += ("temp",)
+
+        current = self.current
+        current.gpu = gpu_usage
+        current.power = power_watts
+        current.cpu_temp = cpu_temp
+        current.gpu_temp = gpu_temp
+        current.temp = combined_temp
+        current.stale = stale
+        self.dirty = True
+
+    def log_due(self):
+        """Analytics group: hand the latest reading and energy to the database"""
+        if not self.log_analytics:
+            # Energy while logging is off isn't recorded later either
+            self.pending_joules = 0.0
+            self.pending_seconds = 0.0
+            return
+        if not self.analytics:
+            return
+        diag = self.diagnostics
+        trace = diag.enabled
+        if trace:
+            t_log = time.perf_counter()
+        self.log_reading(*self.last_reading)
+        if trace:
+            diag.record("analytics", time.perf_counter() - t_log)
+
+    def publish(self):
+        """Publish the newest values of every group as one snapshot"""
+        diag = self.diagnostics
+        trace = diag.enabled
+        self.dirty = False
+        stats = self.snapshots.back()
+        self.current.copy_to(stats)
+        self.snapshots.publish()
+
+        self.history.append(stats)
+        if trace:
+            t_emit = time.perf_counter()
+        for listener in self.listeners:
+            listener(stats)
+        if trace:
+            diag.record("emit", time.perf_counter() - t_emit)
+
+        # Opening (and maybe migrating) the database can take a
+        # while, so do it only once the first sample is out
+        if self.log_analytics and self.analytics is None and not self.analytics_failed:
+            self.open_analytics()
+        return stats
+
+    def open_analytics(self):
+        try:
+            from analytics import get_analytics
+            self.analytics = get_analytics()
+        except Exception as e:
+            print(f"Analytics init error: {e}")
+            self.diagnostics.error("analytics", e)
+            self.analytics = None
+            self.analytics_failed = True
+
+    def log_reading(self, power_watts, cpu_temp, gpu_temp):
+        try:
+            # A dropped reading's energy stays pending for the next one,
+            # so the energy counter never loses any
+            if self.analytics.log_reading(power_watts, cpu_temp, gpu_temp,
+                                          joules=self.pending_joules, seconds=self.pending_seconds):
+                self.pending_joules = 0.0
+                self.pending_seconds = 0.0
+        except Exception as e:
+            self.diagnostics.error("analytics", e)
+
+    def add_listener(self, listener):
+        self.listeners = self.listeners + [listener]
+
+    def remove_listener(self, listener):
+        self.listeners = [l for l in self.listeners if l != listener]
+
+    def stop(self):
+        self.running = False
+        self.stop_event.set()
+        self.wakeup.set()
@@ -0,0 +1,195 @@
+"""Per-core CPU, per-interface network and per-disk I/O collectors
+
+psutil reports network and disk traffic as cumulative byte counters.
+RateCounter turns a whole set of them into per-second rates in one pass
+over preallocated arrays, handling the ways counters misbehave: 32-bit
+counters wrapping, counters going backwards when a driver or interface
+is reset, and devices appearing or disappearing between samples.
+"""
+import os
+import sys
+import time
+from array import array
+from fnmatch import fnmatch
+import psutil
+
+WRAP_32 = 1 << 32
+
+# Loopback and virtual adapters whose traffic is also counted on (or
+# never leaves) a physical interface
+DEFAULT_NIC_EXCLUDE = (
+    "lo", "lo*", "Loopback*", "veth*", "docker*", "br-*", "virbr*", "vEthernet*",
+    "VMware*", "VirtualBox*", "isatap*", "Teredo*", "ifb*",
+)
+# Pseudo block devices; partitions are dropped separately on Linux
+DEFAULT_DISK_EXCLUDE = ("loop*", "ram*", "zram*", "sr*", "fd*")
+
+
+def parse_patterns(text):
+    """"a, b*" -> ("a", "b*"); None or blank -> None"""
+    if not text:
+        return None
+    return tuple(p.strip() for p in text.split(",") if p.strip()) or None
+
+
+def matches(name, patterns):
+    return any(fnmatch(name, p) for p in patterns)
+
+
+class RateCounter:
+    """Per-second rates of a fixed-order set of cumulative counters
+
+    update() takes the new values of every counter (in self.names
+    order) and fills self.rates. When the set of names changes the
+    arrays are rebuilt and every counter starts again from zero rate.
+    """
+
+    def __init__(self):
+        self.names = ()
+        self.previous = array("d")
+        self.rates = array("d")
+        self.last_time = None
+
+    def reset(self, names):
+        self.names = tuple(names)
+        self.previous = array("d", bytes(8 * len(self.names)))
+        self.rates = array("d", bytes(8 * len(self.names)))
+        self.last_time = None
+
+    def update(self, names, values, now=None):
+        now = time.monotonic() if now is None else now
+        if names != self.names:
+            self.reset(names)
+        previous = self.previous
+        rates = self.rates
+        elapsed = now - self.last_time if self.last_time is not None else 0.0
+        if elapsed > 0:
+            scale = 1.0 / elapsed
+            for i, value in enumerate(values):
+                delta = value - previous[i]
+                if delta < 0:
+                    # A 32-bit counter wrapping, else a reset: skip one sample
+                    wrapped = delta + WRAP_32
+                    delta = wrapped if previous[i] < WRAP_32 and wrapped < WRAP_32 // 2 else 0.0
+                rates[i] = delta * scale
+                previous[i] = value
+        else:
+            for i, value in enumerate(values):
+                rates[i] = 0.0
+                previous[i] = value
+        self.last_time = now
+        return rates
+
+
+class CoreCollector:
+    """Load of every logical CPU, in percent"""
+
+    def __init__(self):
+        self.loads = ()
+
+    def update(self):
+        self.loads = tuple(psutil.cpu_percent(percpu=True))
+        return self.loads
+
+
+class NetCollector:
+    """Upload/download rates summed over the selected interfaces
+
+    include/exclude are fnmatch patterns; an interface counts if it
+    matches include (or include is None) and doesn't match exclude.
+    """
+
+    def __init__(self, include=None, exclude=DEFAULT_NIC_EXCLUDE):
+        self.counter = RateCounter()
+        self.selected = {}
+        self.names = ()
+        self.counter_names = ()
+        self.up = 0.0
+        self.down = 0.0
+        self.set_filters(include, exclude)
+
+    def set_filters(self, include=None, exclude=DEFAULT_NIC_EXCLUDE):
+        self.include = include
+        self.exclude = DEFAULT_NIC_EXCLUDE if exclude is None else exclude
+        # Re-evaluated for every interface on the next update
+        self.selected = {}
+
+    def wanted(self, name):
+        choice = self.selected.get(name)
+        if choice is None:
+            choice = self.selected[name] = ((self.include is None or matches(name, self.include))
+                                            and not matches(name, self.exclude))
+        return choice
+
+    def update(self):
+        stats = psutil.net_io_counters(pernic=True)
+        names = tuple(name for name in stats if self.wanted(name))
+        if names != self.names:
+            self.names = names
+            # Interleaved: sent, recv per interface
+            self.counter_names = tuple(f"{n}:{d}" for n in names for d in ("sent", "recv"))
+        values = []
+        for name in names:
+            io = stats[name]
+            values.append(io.bytes_sent)
+            values.append(io.bytes_recv)
+        rates = self.counter.update(self.counter_names, values)
+        self.up = sum(rates[0::2])
+        self.down = sum(rates[1::2])
+        return self.up, self.down
+
+    def per_interface(self):
+        """[(name, up, down)] for the selected interfaces, busiest first"""
+        rates = self.counter.rates
+        rows = [(name, rates[2 * i], rates[2 * i + 1]) for i, name in enumerate(self.names)
+                if 2 * i + 1 < len(rates)]
+        return sorted(rows, key=lambda row: row[1] + row[2], reverse=True)
+
+
+class DiskCollector:
+    """Read/write rates summed over physical disks"""
+
+    def __init__(self, exclude=DEFAULT_DISK_EXCLUDE, sysfs_root="/sys"):
+        self.exclude = exclude
+        self.sysfs_root = sysfs_root
+        self.counter = RateCounter()
+        self.selected = {}
+        self.names = ()
+        self.counter_names = ()
+        self.read = 0.0
+        self.write = 0.0
+
+    def wanted(self, name):
+        choice = self.selected.get(name)
+        if choice is None:
+            choice = not matches(name, self.exclude)
+            # Partitions are counted in their disk too
+            if choice and sys.platform.startswith("linux"):
+                choice = not os.path.exists(os.path.join(self.sysfs_root, "class", "block", name, "partition"))
+            self.selected[name] = choice
+        return choice
+
+    def update(self):
+        try:
+            stats = psutil.disk_io_counters(perdisk=True) or {}
+        except (RuntimeError, OSError):
+            # No disks, or no permission (some containers)
+            stats = {}
+        names = tuple(name for name in stats if self.wanted(name))
+        if names != self.names:
+            self.names = names
+            self.counter_names = tuple(f"{n}:{d}" for n in names for d in ("read", "write"))
+        values = []
+        for name in names:
+            io = stats[name]
+            values.append(io.read_bytes)
+            values.append(io.write_bytes)
+        rates = self.counter.update(self.counter_names, values)
+        self.read = sum(rates[0::2])
+        self.write = sum(rates[1::2])
+        return self.read, self.write
+
+    def per_disk(self):
+        rates = self.counter.rates
+        return [(name, rates[2 * i], rates[2 * i + 1]) for i, name in enumerate(self.names)
+                if 2 * i + 1 < len(rates)]
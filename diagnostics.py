@@ -0,0 +1,126 @@
+import json
+import time
+from array import array
+from collections import Counter
+
+# Histogram bucket i counts durations of [2**(i-1), 2**i) microseconds
+# (bucket 0: under 1 us); the last bucket also takes everything longer
+BUCKETS = 32
+
+
+class Histogram:
+    """Fixed-size log2 histogram of durations
+
+    add() is a handful of integer operations and never allocates, so it
+    can run for every stage of every tick. Percentiles are estimated as
+    the upper bound of the bucket they fall in, i.e. within a factor 2.
+    """
+
+    def __init__(self):
+        self.counts = array("Q", bytes(8 * BUCKETS))
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.last = 0.0
+
+    def add(self, seconds):
+        i = int(seconds * 1e6).bit_length()
+        self.counts[i if i < BUCKETS else BUCKETS - 1] += 1
+        self.count += 1
+        self.total += seconds
+        self.last = seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, q):
+        """Upper bound of the bucket holding the q-th percentile, seconds"""
+        if not self.count:
+            return 0.0
+        rank = q / 100 * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if n and seen >= rank:
+                return min((1 << i) / 1e6, self.max)
+        return self.max
+
+    def as_dict(self):
+        return {
+            "count": self.count,
+            "mean_us": self.mean() * 1e6,
+            "p50_us": self.percentile(50) * 1e6,
+            "p99_us": self.percentile(99) * 1e6,
+            "max_us": self.max * 1e6,
+            "last_us": self.last * 1e6,
+            "buckets": list(self.counts),
+        }
+
+
+class Diagnostics:
+    """Per-stage timings and exception counts of the collector
+
+    Stages are free-form names ("psutil", "sensors", "update Cpu", ...).
+    Timing is opt-in: callers check `enabled` once per tick and skip all
+    perf_counter() calls when it is off, so disabled tracing costs one
+    attribute lookup per tick. Exceptions are always counted, with the
+    last message per stage kept for the diagnostics view.
+
+    Written by the collector thread and read by the GUI; a reader may
+    see a histogram mid-update, which only matters for display.
+    """
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.started = time.time()
+        self.stages = {}
+        self.errors = Counter()
+        self.last_errors = {}
+
+    def record(self, stage, seconds):
+        hist = self.stages.get(stage)
+        if hist is None:
+            hist = self.stages[stage] = Histogram()
+        hist.add(seconds)
+
+    def error(self, stage, exc):
+        self.errors[stage] += 1
+        self.last_errors[stage] = f"{type(exc).__name__}: {exc}"
+
+    def reset(self):
+        self.started = time.time()
+        self.stages = {}
+        self.errors = Counter()
+        self.last_errors = {}
+
+    def rows(self):
+        """(stage, histogram or None, errors) for every stage seen, by name"""
+        names = sorted(set(self.stages) | set(self.errors))
+        return [(name, self.stages.get(name), self.errors.get(name, 0)) for name in names]
+
+    def tooltip(self):
+        """One line summary: the whole tick plus the slowest stage"""
+        tick = self.stages.get("sample")
+        errors = sum(self.errors.values())
+        if tick is None or not tick.count:
+            return f"{errors} errors" if errors else ""
+        slowest = max(((h.mean(), name) for name, h in self.stages.items() if name != "sample"),
+                      default=(0.0, "-"))
+        return (f"tick {tick.mean() * 1e6:.0f}us avg, {tick.percentile(99) * 1e6:.0f}us p99"
+                f" | slowest {slowest[1]} {slowest[0] * 1e6:.0f}us | {errors} errors")
+
+    def as_dict(self):
+        return {
+            "started": self.started,
+            "exported": time.time(),
+            "enabled": self.enabled,
+            "stages": {name: hist.as_dict() for name, hist in self.stages.items()},
+            "errors": dict(self.errors),
+            "last_errors": dict(self.last_errors),
+        }
+
+    def export(self, path):
+        with open(path, "w") as f:
+            json.dump(self.as_dict(), f, indent=2)
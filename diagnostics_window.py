@@ -0,0 +1,134 @@
+from PyQt6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QCheckBox,
+                             QTableWidget, QTableWidgetItem, QHeaderView, QFileDialog)
+from PyQt6.QtCore import Qt, QSettings, QTimer
+
+COLUMNS = ("Stage", "Count", "Mean", "p50", "p99", "Max", "Errors")
+
+
+def format_us(seconds):
+    us = seconds * 1e6
+    if us >= 10000:
+        return f"{us / 1000:.1f} ms"
+    return f"{us:.0f} µs"
+
+
+class DiagnosticsWindow(QDialog):
+    """Live view of the collector's per-stage timings and error counts"""
+
+    def __init__(self, diagnostics, parent=None, scheduler=None):
+        super().__init__(parent)
+        self.setWindowTitle("SysMonBar Diagnostics")
+        self.setMinimumSize(560, 360)
+        self.diagnostics = diagnostics
+        self.scheduler = scheduler
+        self.settings = QSettings("MyCompany", "SysMonBar")
+        self.init_ui()
+        self.refresh()
+
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.refresh)
+        self.timer.start(1000)
+
+    def init_ui(self):
+        layout = QVBoxLayout()
+
+        self.trace_check = QCheckBox("Record stage timings")
+        self.trace_check.setChecked(self.diagnostics.enabled)
+        self.trace_check.toggled.connect(self.set_tracing)
+        layout.addWidget(self.trace_check)
+
+        self.table = QTableWidget(0, len(COLUMNS))
+        self.table.setHorizontalHeaderLabels(COLUMNS)
+        self.table.verticalHeader().setVisible(False)
+        self.table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        self.table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+        layout.addWidget(self.table)
+
+        self.summary_label = QLabel("")
+        layout.addWidget(self.summary_label)
+
+        # Sampling groups: interval, cost, backoff
+        self.groups_label = QLabel("")
+        layout.addWidget(self.groups_label)
+
+        buttons = QHBoxLayout()
+        reset_btn = QPushButton("Reset")
+        reset_btn.clicked.connect(self.reset)
+        buttons.addWidget(reset_btn)
+        export_btn = QPushButton("Export...")
+        export_btn.clicked.connect(self.export)
+        buttons.addWidget(export_btn)
+        buttons.addStretch()
+        close_btn = QPushButton("Close")
+        close_btn.clicked.connect(self.close)
+        buttons.addWidget(close_btn)
+        layout.addLayout(buttons)
+
+        self.setLayout(layout)
+        self.setStyleSheet("""
+            QDialog, QTableWidget {
+                background-color: #2b2b2b;
+                color: #fff;
+            }
+            QHeaderView::section {
+                background-color: #333;
+                color: #ddd;
+                border: none;
+                padding: 4px;
+            }
+            QPushButton {
+                background-color: #3498db;
+                color: white;
+                border: none;
+                padding: 6px 14px;
+                border-radius: 4px;
+            }
+            QLabel, QCheckBox {
+                color: #ddd;
+            }
+        """)
+
+    def set_tracing(self, enabled):
+        self.diagnostics.enabled = enabled
+        self.settings.setValue("trace_enabled", enabled)
+
+    def refresh(self):
+        rows = self.diagnostics.rows()
+        self.table.setRowCount(len(rows))
+        for row, (stage, hist, errors) in enumerate(rows):
+            if hist:
+                cells = (stage, str(hist.count), format_us(hist.mean()), format_us(hist.percentile(50)),
+                         format_us(hist.percentile(99)), format_us(hist.max), str(errors))
+            else:
+                cells = (stage, "", "", "", "", "", str(errors))
+            for col, text in enumerate(cells):
+                item = QTableWidgetItem(text)
+                if col:
+                    item.setTextAlignment(Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter)
+                if col == len(COLUMNS) - 1 and errors:
+                    item.setToolTip(self.diagnostics.last_errors.get(stage, ""))
+                self.table.setItem(row, col, item)
+
+        summary = self.diagnostics.tooltip()
+        if not self.diagnostics.enabled:
+            summary = "Timing is off; only errors are counted. " + summary
+        self.summary_label.setText(summary)
+        if self.scheduler:
+            self.groups_label.setText(self.scheduler.describe())
+
+    def reset(self):
+        self.diagnostics.reset()
+        self.refresh()
+
+    def export(self):
+        path, _ = QFileDialog.getSaveFileName(self, "Export Diagnostics", "sysmonbar-diagnostics.json",
+                                              "JSON (*.json)")
+        if path:
+            try:
+                self.diagnostics.export(path)
+            except OSError as e:
+                self.summary_label.setText(f"Export failed: {e}")
+
+    def done(self, result):
+        self.timer.stop()
+        super().done(result)
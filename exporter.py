@@ -0,0 +1,152 @@
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_ADDRESS = "127.0.0.1:9184"
+CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+
+# Everything but the values is fixed, so a tick only fills in the blanks
+TEMPLATE = """\
+# TYPE sysmonbar_cpu_usage_percent gauge
+# UNIT sysmonbar_cpu_usage_percent percent
+# HELP sysmonbar_cpu_usage_percent CPU load.
+sysmonbar_cpu_usage_percent {cpu!r}
+# TYPE sysmonbar_gpu_usage_percent gauge
+# UNIT sysmonbar_gpu_usage_percent percent
+# HELP sysmonbar_gpu_usage_percent GPU load.
+sysmonbar_gpu_usage_percent {gpu!r}
+# TYPE sysmonbar_memory_used_bytes gauge
+# UNIT sysmonbar_memory_used_bytes bytes
+sysmonbar_memory_used_bytes {ram_used!r}
+# TYPE sysmonbar_memory_total_bytes gauge
+# UNIT sysmonbar_memory_total_bytes bytes
+sysmonbar_memory_total_bytes {ram_total!r}
+# TYPE sysmonbar_network_bytes_per_second gauge
+# HELP sysmonbar_network_bytes_per_second Network throughput over the last sample.
+sysmonbar_network_bytes_per_second{{direction="transmit"}} {net_up!r}
+sysmonbar_network_bytes_per_second{{direction="receive"}} {net_down!r}
+# TYPE sysmonbar_disk_bytes_per_second gauge
+# HELP sysmonbar_disk_bytes_per_second Disk throughput over the last sample, physical disks only.
+sysmonbar_disk_bytes_per_second{{direction="read"}} {disk_read!r}
+sysmonbar_disk_bytes_per_second{{direction="write"}} {disk_write!r}
+# TYPE sysmonbar_cpu_core_usage_percent gauge
+# UNIT sysmonbar_cpu_core_usage_percent percent
+# HELP sysmonbar_cpu_core_usage_percent Load of each logical CPU.
+{cores}# TYPE sysmonbar_power_watts gauge
+# UNIT sysmonbar_power_watts watts
+# HELP sysmonbar_power_watts System power draw (sensor, or estimated from CPU load).
+sysmonbar_power_watts {power!r}
+# TYPE sysmonbar_temperature_celsius gauge
+# UNIT sysmonbar_temperature_celsius celsius
+# HELP sysmonbar_temperature_celsius Temperatures; 0 when the sensor is unavailable.
+sysmonbar_temperature_celsius{{sensor="cpu"}} {cpu_temp!r}
+sysmonbar_temperature_celsius{{sensor="gpu"}} {gpu_temp!r}
+sysmonbar_temperature_celsius{{sensor="combined"}} {temp!r}
+# TYPE sysmonbar_energy_joules counter
+# UNIT sysmonbar_energy_joules joules
+# HELP sysmonbar_energy_joules Energy integrated from the power samples since the collector started.
+sysmonbar_energy_joules_total {energy!r}
+sysmonbar_energy_joules_created {created!r}
+# TYPE sysmonbar_samples counter
+# HELP sysmonbar_samples Samples taken since the collector started.
+sysmonbar_samples_total {seq}
+sysmonbar_samples_created {created!r}
+# TYPE sysmonbar_sample_timestamp_seconds gauge
+# UNIT sysmonbar_sample_timestamp_seconds seconds
+# HELP sysmonbar_sample_timestamp_seconds Wall clock time of the newest sample.
+sysmonbar_sample_timestamp_seconds {time!r}
+# EOF
+"""
+
+
+def parse_address(address):
+    """"host:port" (or just ":port" / "port") -> (host, port)"""
+    host, sep, port = address.strip().rpartition(":")
+    if not sep:
+        host = ""
+    return host.strip("[]") or "127.0.0.1", int(port)
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self.respond(send_body=True)
+
+    def do_HEAD(self):
+        self.respond(send_body=False)
+
+    def respond(self, send_body):
+        if self.path.split("?", 1)[0] not in ("/metrics", "/"):
+            self.send_error(404)
+            return
+        body = self.server.exporter.body
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if send_body:
+            self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class MetricsExporter:
+    """OpenMetrics endpoint serving the collector's newest sample
+
+    The response is rendered to bytes once per tick from the collector's
+    listener call and swapped in as a single reference; scrapes (one
+    server thread each) only ever send the current bytes, so any number
+    of scrapers never trigger a sensor read or wait on the collector.
+    """
+
+    def __init__(self, collector, address=DEFAULT_ADDRESS):
+        self.collector = collector
+        self.address = parse_address(address)
+        self.created = time.time()
+        self.body = b"# EOF\n"
+        self.server = None
+        self.thread = None
+
+    def render(self, stats):
+        self.body = TEMPLATE.format(
+            cpu=stats.cpu, gpu=stats.gpu,
+            ram_used=stats.ram_used_gb * 1024**3, ram_total=stats.ram_total_gb * 1024**3,
+            net_up=stats.net_up, net_down=stats.net_down,
+            disk_read=stats.disk_read, disk_write=stats.disk_write,
+            cores="".join(f'sysmonbar_cpu_core_usage_percent{{core="{i}"}} {load!r}\n'
+                          for i, load in enumerate(stats.cores)),
+            power=stats.power,
+            cpu_temp=stats.cpu_temp, gpu_temp=stats.gpu_temp, temp=stats.temp,
+            energy=self.collector.energy_total_j, seq=stats.seq,
+            created=self.created, time=time.time(),
+        ).encode()
+
+    def start(self):
+        """Bind and serve; raises OSError if the address is unavailable"""
+        self.server = ThreadingHTTPServer(self.address, MetricsHandler)
+        self.server.daemon_threads = True
+        self.server.exporter = self
+        latest = self.collector.snapshots.latest()
+        if latest.seq:
+            self.render(latest)
+        # Scrapers get every metric, whatever the bar shows
+        self.collector.set_demand("exporter")
+        self.collector.add_listener(self.render)
+        self.thread = threading.Thread(target=self.server.serve_forever, name="metrics-exporter", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        if self.server is None:
+            return
+        self.collector.remove_listener(self.render)
+        self.collector.set_demand("exporter", ())
+        self.server.shutdown()
+        self.server.server_close()
+        self.server = None
+        self.thread = None
+
+    def url(self):
+        host, port = self.address
+        return f"http://{host}:{port}/metrics"
@@ -0,0 +1,106 @@
+import time
+from array import array
+from snapshot import FIELDS
+
+# 24 hours of 1 s samples
+DEFAULT_CAPACITY = 24 * 3600
+
+
+class MetricHistory:
+    """Fixed-size columnar ring buffer of every sampled metric
+
+    One column per StatsSnapshot field.
+
+    Each field (plus the sample time, on time.monotonic() so it never
+    goes backwards) is one preallocated array('d'), so
+    appending a sample only overwrites slots and never allocates. Reads
+    return memoryview segments of the underlying arrays (oldest first),
+    which can be handed to min()/max()/sum() or numpy.frombuffer()
+    without copying.
+
+    Written by the monitor thread and read from the GUI thread; a reader
+    may see the newest sample half-written, which is fine for display.
+    """
+
+    def __init__(self, capacity=DEFAULT_CAPACITY, fields=FIELDS):
+        self.capacity = capacity
+        self.fields = fields
+        self.times = array("d", bytes(8 * capacity))
+        self.columns = {name: array("d", bytes(8 * capacity)) for name in fields}
+        self.views = {name: memoryview(col) for name, col in self.columns.items()}
+        self.views["time"] = memoryview(self.times)
+        # Total samples ever appended; the next slot is count % capacity
+        self.count = 0
+
+    def __len__(self):
+        return min(self.count, self.capacity)
+
+    def append(self, stats, timestamp=None):
+        """Store a StatsSnapshot (or anything with the field attributes)
+
+        The sample time is timestamp, else the snapshot's own (monotonic)
+        timestamp, else time.monotonic() now.
+        """
+        if timestamp is None:
+            timestamp = getattr(stats, "timestamp", 0.0) or time.monotonic()
+        i = self.count % self.capacity
+        self.times[i] = timestamp
+        columns = self.columns
+        for name in self.fields:
+            columns[name][i] = getattr(stats, name)
+        self.count += 1
+
+    def segments(self, field, n=None):
+        """Zero-copy views of the newest n samples of field, oldest first"""
+        size = len(self)
+        n = size if n is None else max(0, min(n, size))
+        view = self.views[field]
+        end = self.count % self.capacity
+        start = end - n
+        if start >= 0:
+            return [view[start:end]]
+        return [view[start + self.capacity:], view[:end]]
+
+    def last(self, field, n=None):
+        """Copy of the newest n samples of field, oldest first"""
+        out = array("d")
+        for segment in self.segments(field, n):
+            out.frombytes(segment.cast("B"))
+        return out
+
+    def latest(self, field):
+        if self.count == 0:
+            return 0.0
+        return self.columns[field][(self.count - 1) % self.capacity]
+
+    def samples_since(self, timestamp):
+        """How many of the newest samples are newer than timestamp (monotonic)"""
+        lo, hi = 0, len(self)
+        times = self.times
+        base = self.count - hi
+        # Binary search over logical positions; times are non-decreasing
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if times[(base + mid) % self.capacity] > timestamp:
+                hi = mid
+            else:
+                lo = mid + 1
+        return len(self) - lo
+
+    def window(self, field, seconds):
+        """Views of field for the last `seconds` seconds of samples"""
+        return self.segments(field, self.samples_since(time.monotonic() - seconds))
+
+    def aggregate(self, field, seconds=None):
+        """(min, max, mean, count) of field over the last `seconds`"""
+        if seconds is None:
+            segments = self.segments(field)
+        else:
+            segments = self.window(field, seconds)
+        count = sum(len(s) for s in segments)
+        if count == 0:
+            return 0.0, 0.0, 0.0, 0
+        lo = min(min(s) for s in segments if len(s))
+        hi = max(max(s) for s in segments if len(s))
+        mean = sum(sum(s) for s in segments) / count
+        return lo, hi, mean, count
@@ -0,0 +1,222 @@
+"""Idle policy: how much work the bar does when nobody is watching
+
+IdlePolicy is fed what the GUI and the OS report, whether the bar is
+visible, whether the screen is on and the session unlocked, whether the
+machine is on battery and when the user last did something, and boils
+it down to two flags:
+
+    watched     the bar can be seen: repaint it and keep it on top
+    low_power   sample only as often as analytics logging needs
+
+The bar is unwatched while it is hidden, the display is off or the
+session is locked. It goes low power while the display is off or the
+session is locked, and on battery once the user has been idle for
+ACTIVE_HOLD seconds; any activity brings full rate back at once.
+
+The policy has no Qt or Windows dependency, and its clock, battery and
+input readers can be replaced, so it can be driven with simulated
+events anywhere (python benchmark.py idle). WindowsSessionEvents turns
+the window messages for display, lock and power changes into policy
+events on Windows.
+"""
+import sys
+import time
+import psutil
+
+# Activity keeps full rate on battery for this long, seconds
+ACTIVE_HOLD = 60.0
+# How often the GUI calls poll(), seconds
+POLL_INTERVAL = 2.0
+# The battery is read at most this often by poll(), seconds
+BATTERY_INTERVAL = 30.0
+
+
+def on_battery():
+    """True if running from a battery; False on AC or with no battery"""
+    try:
+        battery = psutil.sensors_battery()
+    except (AttributeError, NotImplementedError, OSError):
+        return False
+    # power_plugged is None when the OS can't tell
+    return battery is not None and battery.power_plugged is False
+
+
+def input_idle_seconds():
+    """Seconds since the last keyboard/mouse input, None if unknown"""
+    if sys.platform != "win32":
+        return None
+    import ctypes
+    from ctypes import wintypes
+
+    class LASTINPUTINFO(ctypes.Structure):
+        _fields_ = [("cbSize", wintypes.UINT), ("dwTime", wintypes.DWORD)]
+
+    info = LASTINPUTINFO(ctypes.sizeof(LASTINPUTINFO))
+    if not ctypes.windll.user32.GetLastInputInfo(ctypes.byref(info)):
+        return None
+    # Both are 32-bit millisecond tick counts, which wrap every 49 days
+    return ((ctypes.windll.kernel32.GetTickCount() - info.dwTime) & 0xFFFFFFFF) / 1000
+
+
+class IdlePolicy:
+    """Decides when the bar paints and how fast the collector samples
+
+    Events (set_visible, set_screen, set_locked, set_battery, activity)
+    take effect immediately; poll() re-reads the battery and the input
+    idle time and expires the activity hold, and should be called every
+    POLL_INTERVAL seconds. Listeners are called with the policy
+    whenever watched or low_power changes, on the calling thread.
+    """
+
+    def __init__(self, clock=time.monotonic, battery=on_battery, input_idle=input_idle_seconds,
+                 hold=ACTIVE_HOLD):
+        self.clock = clock
+        self.battery = battery
+        self.input_idle = input_idle
+        self.hold = hold
+        self.visible = True
+        self.screen_on = True
+        self.locked = False
+        self.on_battery = battery() if battery else False
+        self.battery_read = clock()
+        self.last_activity = clock()
+        self.watched = True
+        self.low_power = False
+        self.listeners = []
+        self.evaluate()
+
+    def add_listener(self, listener):
+        self.listeners = self.listeners + [listener]
+
+    def set_visible(self, visible):
+        self.visible = visible
+        self.evaluate()
+
+    def set_screen(self, on):
+        self.screen_on = on
+        if on:
+            self.last_activity = self.clock()
+        self.evaluate()
+
+    def set_locked(self, locked):
+        self.locked = locked
+        if not locked:
+            self.last_activity = self.clock()
+        self.evaluate()
+
+    def set_battery(self, on_battery):
+        self.on_battery = on_battery
+        self.battery_read = self.clock()
+        self.evaluate()
+
+    def activity(self):
+        """The user did something: full rate for at least hold seconds"""
+        self.last_activity = self.clock()
+        self.evaluate()
+
+    def poll(self):
+        now = self.clock()
+        if self.battery and now - self.battery_read >= BATTERY_INTERVAL:
+            self.on_battery = self.battery()
+            self.battery_read = now
+        idle = self.input_idle() if self.input_idle else None
+        if idle is not None:
+            self.last_activity = max(self.last_activity, now - idle)
+        self.evaluate()
+
+    def evaluate(self):
+        away = not self.screen_on or self.locked
+        watched = self.visible and not away
+        active = self.clock() - self.last_activity < self.hold
+        low_power = away or (self.on_battery and not active)
+        if watched != self.watched or low_power != self.low_power:
+            self.watched = watched
+            self.low_power = low_power
+            for listener in self.listeners:
+                listener(self)
+
+    def describe(self):
+        reasons = []
+        if not self.screen_on:
+            reasons.append("display off")
+        if self.locked:
+            reasons.append("locked")
+        if not self.visible:
+            reasons.append("bar hidden")
+        if self.on_battery:
+            reasons.append("on battery" + (", idle" if self.low_power else ""))
+        text = "low power" if self.low_power else "full rate"
+        if not self.watched:
+            text += ", not painting"
+        return f"{text} ({', '.join(reasons)})" if reasons else text
+
+
+if sys.platform == "win32":
+    import ctypes
+    from ctypes import wintypes
+
+    WM_POWERBROADCAST = 0x0218
+    WM_WTSSESSION_CHANGE = 0x02B1
+    PBT_APMPOWERSTATUSCHANGE = 0x000A
+    PBT_APMRESUMEAUTOMATIC = 0x0012
+    PBT_POWERSETTINGCHANGE = 0x8013
+    WTS_SESSION_LOCK = 0x7
+    WTS_SESSION_UNLOCK = 0x8
+    NOTIFY_FOR_THIS_SESSION = 0
+    DEVICE_NOTIFY_WINDOW_HANDLE = 0
+
+    class GUID(ctypes.Structure):
+        _fields_ = [("Data1", wintypes.DWORD), ("Data2", wintypes.WORD), ("Data3", wintypes.WORD),
+                    ("Data4", ctypes.c_ubyte * 8)]
+
+    class POWERBROADCAST_SETTING(ctypes.Structure):
+        _fields_ = [("PowerSetting", GUID), ("DataLength", wintypes.DWORD), ("Data", wintypes.DWORD)]
+
+    # Data: 0 off, 1 on, 2 dimmed
+    GUID_CONSOLE_DISPLAY_STATE = GUID(0x6FE69556, 0x704A, 0x47A0,
+                                      (ctypes.c_ubyte * 8)(0x8F, 0x24, 0xC2, 0x8D, 0x93, 0x6F, 0xDA, 0x47))
+
+
+class WindowsSessionEvents:
+    """Display, lock and power notifications of a window, fed to a policy
+
+    Registers hwnd for them; the window passes every native message to
+    handle() (from QWidget.nativeEvent).
+    """
+
+    def __init__(self, policy, hwnd):
+        self.policy = policy
+        self.hwnd = hwnd
+        user32 = ctypes.windll.user32
+        user32.RegisterPowerSettingNotification.restype = wintypes.HANDLE
+        user32.RegisterPowerSettingNotification.argtypes = [wintypes.HANDLE, ctypes.POINTER(GUID), wintypes.DWORD]
+        self.power_notify = user32.RegisterPowerSettingNotification(
+            hwnd, ctypes.byref(GUID_CONSOLE_DISPLAY_STATE), DEVICE_NOTIFY_WINDOW_HANDLE)
+        self.session_notify = bool(ctypes.windll.wtsapi32.WTSRegisterSessionNotification(
+            wintypes.HWND(hwnd), NOTIFY_FOR_THIS_SESSION))
+
+    def handle(self, address):
+        msg = wintypes.MSG.from_address(address)
+        policy = self.policy
+        if msg.message == WM_WTSSESSION_CHANGE:
+            if msg.wParam == WTS_SESSION_LOCK:
+                policy.set_locked(True)
+            elif msg.wParam == WTS_SESSION_UNLOCK:
+                policy.set_locked(False)
+        elif msg.message == WM_POWERBROADCAST:
+            if msg.wParam == PBT_POWERSETTINGCHANGE:
+                setting = POWERBROADCAST_SETTING.from_address(msg.lParam)
+                if bytes(setting.PowerSetting) == bytes(GUID_CONSOLE_DISPLAY_STATE):
+                    policy.set_screen(setting.Data != 0)
+            elif msg.wParam == PBT_APMPOWERSTATUSCHANGE:
+                policy.set_battery(policy.battery() if policy.battery else False)
+            elif msg.wParam == PBT_APMRESUMEAUTOMATIC:
+                policy.activity()
+
+    def close(self):
+        if self.power_notify:
+            ctypes.windll.user32.UnregisterPowerSettingNotification(wintypes.HANDLE(self.power_notify))
+            self.power_notify = None
+        if self.session_notify:
+            ctypes.windll.wtsapi32.WTSUnRegisterSessionNotification(wintypes.HWND(self.hwnd))
+            self.session_notify = False
@@ -2,39 +2,126 @@ import sys
 import os
 from PyQt6.QtWidgets import (QApplication, QMainWindow, QWidget, QHBoxLayout, QVBoxLayout,
                              QLabel, QSystemTrayIcon, QMenu, QProgressBar, QSizePolicy)
-from PyQt6.QtCore import Qt, pyqtSignal, QSettings, QTimer
-from PyQt6.QtGui import QAction, QColor, QIcon, QPainter, QPen, QFont
+from PyQt6.QtCore import Qt, pyqtSignal, QSettings, QTimer, QPointF, QRectF, QEvent
+from PyQt6.QtGui import QAction, QColor, QIcon, QPainter, QPen, QFont, QPixmap, QPolygonF
 from monitor import SystemMonitor
-from settings import SettingsDialog
-from analytics_window import AnalyticsWindow
-from collections import deque
+from snapshot import StatsSnapshot
+from counters import parse_patterns
+from modules import MODULES, demand
+from idle import IdlePolicy, POLL_INTERVAL
 
 
-class MetricWidget(QWidget):
-    """Widget that shows EITHER a bar OR a graph"""
+# Samples shown by a widget in graph mode
+GRAPH_POINTS = 30
+BACKGROUND = "#2b2b2b"
+# Widgets showing a value carried over from an earlier sample are dimmed
+STALE_OPACITY = 0.4
+STALE_NOTE = " (no update, last value)"
+# How often the bar re-asserts itself on top, ms
+RAISE_INTERVAL = 500
+
+
+class CachedWidget(QWidget):
+    """Base for the bar widgets: cached background, change-only repaints
+
+    Subclasses keep whatever they draw in pixmaps and only call
+    update() when the quantized picture actually changed, so a bar
+    sitting on screen all day mostly repaints nothing.
+    """
     
-    def __init__(self, name, color, display_type="bar"):
+    def __init__(self, name, color):
         super().__init__()
         self.name = name
         self.color = color
-        self.display_type = display_type
         self.visible_flag = True
+        self.stale = False
+        self.tooltip_text = name
+        self.background = None
+        self.setToolTip(name)
+    
+    def set_tooltip(self, text):
+        if text != self.tooltip_text:
+            self.tooltip_text = text
+            self.setToolTip(text)
+    
+    def set_color(self, color):
+        if color != self.color:
+            self.color = color
+            self.invalidate()
+    
+    def set_stale(self, stale):
+        if stale != self.stale:
+            self.stale = stale
+            self.invalidate()
+    
+    def invalidate(self):
+        """Drop cached pixmaps and repaint"""
+        self.update()
+    
+    def new_pixmap(self, w, h):
+        ratio = self.devicePixelRatioF()
+        pixmap = QPixmap(int(w * ratio), int(h * ratio))
+        pixmap.setDevicePixelRatio(ratio)
+        pixmap.fill(Qt.GlobalColor.transparent)
+        return pixmap
+    
+    def background_pixmap(self):
+        if self.background is None or self.background.deviceIndependentSize().toSize() != self.size():
+            self.background = self.new_pixmap(self.width(), self.height())
+            self.background.fill(QColor(BACKGROUND))
+        return self.background
+    
+    def resizeEvent(self, event):
+        self.background = None
+        self.invalidate()
+        super().resizeEvent(event)
+
+
+class MetricWidget(CachedWidget):
+    """Widget that shows EITHER a bar OR a graph
+
+    The graph is drawn from history_source(n), which returns the newest
+    n values as percentages; the samples themselves live in the
+    monitor's MetricHistory rather than in each widget. It is kept in a
+    pixmap with one pixel column per sample: new samples scroll the
+    pixmap left and only their segments are drawn. history_count()
+    gives the number of samples ever taken, so samples published while
+    the GUI was busy (stats_ready is coalesced) are scrolled in too.
+    """
+    
+    def __init__(self, name, color, display_type="bar", history_source=None):
+        super().__init__(name, color)
+        self.display_type = display_type
         self.current_value = 0
         self.max_value = 100
         self.text = ""
-        self.history = deque(maxlen=30)
+        self.history_source = history_source
+        self.history_count = None
+        self.bar_px = None
+        self.graph = None
+        self.graph_y = None
+        # history_count() when the newest drawn sample was taken
+        self.graph_count = 0
+        # Consecutive samples at the same height; a flat graph is static
+        self.flat_run = 0
         
         self.setFixedWidth(12)
         self.setFixedHeight(30)
-        self.setToolTip(name)
         
     def set_display_type(self, dtype):
-        self.display_type = dtype
+        if dtype != self.display_type:
+            self.display_type = dtype
+            self.invalidate()
+    
+    def invalidate(self):
+        self.bar_px = None
+        self.graph = None
         self.update()
         
-    def update_data(self, value, max_val=100, text=None):
+    def update_data(self, value, max_val=100, text=None, tooltip=None):
         if not self.visible_flag:
             self.hide()
+            self.graph = None  # Missed samples; rebuild when shown again
             return
         self.show()
         
@@ -42,85 +129,241 @@ class MetricWidget(QWidget):
         self.max_value = max_val if max_val > 0 else 100
         self.text = text or ""
         
-        pct = min(100, int((value / self.max_value) * 100)) if self.max_value > 0 else 0
-        self.history.append(pct)
+        if tooltip or text:
+            self.set_tooltip(tooltip or f"{self.name}: {text}")
         
-        if text:
-            self.setToolTip(f"{self.name}: {text}")
+        if self.display_type == "graph":
+            if self.graph is None:
+                self.build_graph()
+                self.update()
+            elif self.append_graph():
+                self.update()
+        else:
+            pct = min(100, int((self.current_value / self.max_value) * 100)) if self.max_value > 0 else 0
+            bar_px = int(self.height() * pct / 100)
+            if bar_px != self.bar_px:
+                self.bar_px = bar_px
+                self.update()
+    
+    def graph_point_y(self, pct):
+        return round(self.height() - (pct / 100.0 * self.height()))
+    
+    def build_graph(self):
+        """Redraw the whole graph pixmap from history"""
+        h = self.height()
+        self.graph = QPixmap(GRAPH_POINTS, h)
+        self.graph.fill(Qt.GlobalColor.transparent)
+        self.flat_run = 0
+        self.graph_y = None
+        self.graph_count = self.history_count() if self.history_count else 0
+        
+        points = self.history_source(GRAPH_POINTS) if self.history_source else []
+        if not points:
+            return
+        ys = [self.graph_point_y(p) for p in points]
+        offset = GRAPH_POINTS - len(ys)
+        if len(ys) >= 2:
+            painter = QPainter(self.graph)
+            painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+            painter.setPen(QPen(QColor(self.color), 1.5))
+            painter.drawPolyline(QPolygonF([QPointF(offset + i + 0.5, y) for i, y in enumerate(ys)]))
+            painter.end()
+        self.graph_y = ys[-1]
+    
+    def append_graph(self):
+        """Scroll in the samples since the last drawn one; False if the picture is unchanged"""
+        if not self.history_source:
+            return False
+        if self.history_count:
+            count = self.history_count()
+            new = count - self.graph_count
+            if new <= 0:
+                return False
+            if new >= GRAPH_POINTS:
+                # Every column changes anyway
+                self.build_graph()
+                return True
+            self.graph_count = count
+        else:
+            new = 1
+        points = self.history_source(new)
+        if not points:
+            return False
+        ys = [self.graph_point_y(p) for p in points]
+        prev_y = self.graph_y
+        self.graph_y = ys[-1]
+        
+        n = len(ys)
+        if all(y == prev_y for y in ys):
+            # Already flat all the way across: scrolling changes nothing
+            unchanged = self.flat_run + 1 >= GRAPH_POINTS
+            self.flat_run += n
+            if unchanged:
+                return False
+        else:
+            self.flat_run = 0
         
-        self.update()
+        self.graph.scroll(-n, 0, self.graph.rect())
+        painter = QPainter(self.graph)
+        painter.setCompositionMode(QPainter.CompositionMode.CompositionMode_Source)
+        painter.fillRect(GRAPH_POINTS - n, 0, n, self.graph.height(), Qt.GlobalColor.transparent)
+        painter.setCompositionMode(QPainter.CompositionMode.CompositionMode_SourceOver)
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        painter.setPen(QPen(QColor(self.color), 1.5))
+        x = GRAPH_POINTS - n - 0.5
+        for y in ys:
+            if prev_y is not None:
+                painter.drawLine(QPointF(x, prev_y), QPointF(x + 1, y))
+            prev_y = y
+            x += 1
+        painter.end()
+        return True
         
     def paintEvent(self, event):
         painter = QPainter(self)
-        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
-        
-        painter.fillRect(self.rect(), QColor("#2b2b2b"))
+        painter.drawPixmap(0, 0, self.background_pixmap())
         
         w = self.width()
         h = self.height()
-        color = QColor(self.color)
+        if self.stale:
+            painter.setOpacity(STALE_OPACITY)
         
         if self.display_type == "graph":
-            if len(self.history) >= 2:
-                pen = QPen(color, 1.5)
-                painter.setPen(pen)
-                
-                points = list(self.history)
-                num = len(points)
-                x_step = w / 29
-                
-                for i in range(num - 1):
-                    x1 = i * x_step
-                    y1 = h - (points[i] / 100.0 * h)
-                    x2 = (i + 1) * x_step
-                    y2 = h - (points[i + 1] / 100.0 * h)
-                    painter.drawLine(int(x1), int(y1), int(x2), int(y2))
+            if self.graph is None:
+                self.build_graph()
+            painter.setRenderHint(QPainter.RenderHint.SmoothPixmapTransform)
+            painter.drawPixmap(QRectF(0, 0, w, h), self.graph, QRectF(0, 0, GRAPH_POINTS, h))
         else:
-            pct = min(100, int((self.current_value / self.max_value) * 100)) if self.max_value > 0 else 0
-            bar_height = int(h * pct / 100)
+            if self.bar_px is None:
+                pct = min(100, int((self.current_value / self.max_value) * 100)) if self.max_value > 0 else 0
+                self.bar_px = int(h * pct / 100)
             bar_width = 8
             bar_x = (w - bar_width) // 2
             
-            painter.fillRect(bar_x, h - bar_height, bar_width, bar_height, color)
+            painter.fillRect(bar_x, h - self.bar_px, bar_width, self.bar_px, QColor(self.color))
 
 
-class TextWidget(QWidget):
-    """Text-only widget for power/temp display"""
+class TextWidget(CachedWidget):
+    """Text-only widget for power/temp display
+
+    The rendered text is cached in a pixmap; update() is only called
+    when the text or color changes.
+    """
+    
+    font = None
     
     def __init__(self, name, color):
-        super().__init__()
-        self.name = name
-        self.color = color
-        self.visible_flag = True
+        super().__init__(name, color)
         self.display_text = "0"
+        self.text_pixmap = None
         
         self.setFixedWidth(35)
         self.setFixedHeight(30)
-        self.setToolTip(name)
         
-    def update_data(self, value, max_val=100, text=None):
+    def update_data(self, value, max_val=100, text=None, tooltip=None):
         if not self.visible_flag:
             self.hide()
             return
         self.show()
         
-        self.display_text = text or f"{int(value)}"
-        self.setToolTip(f"{self.name}: {self.display_text}")
-        self.update()
+        display_text = text or f"{int(value)}"
+        self.set_tooltip(tooltip or f"{self.name}: {display_text}")
+        if display_text != self.display_text:
+            self.display_text = display_text
+            self.invalidate()
         
     def set_display_type(self, dtype):
         pass  # Always text
+    
+    def invalidate(self):
+        self.text_pixmap = None
+        self.update()
+    
+    def render_text(self):
+        if TextWidget.font is None:
+            TextWidget.font = QFont("Segoe UI", 8, QFont.Weight.Bold)
+        pixmap = self.new_pixmap(self.width(), self.height())
+        painter = QPainter(pixmap)
+        painter.drawPixmap(0, 0, self.background_pixmap())
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        if self.stale:
+            painter.setOpacity(STALE_OPACITY)
+        painter.setPen(QColor(self.color))
+        painter.setFont(TextWidget.font)
+        painter.drawText(QRectF(0, 0, self.width(), self.height()), Qt.AlignmentFlag.AlignCenter, self.display_text)
+        painter.end()
+        return pixmap
         
     def paintEvent(self, event):
+        if self.text_pixmap is None:
+            self.text_pixmap = self.render_text()
         painter = QPainter(self)
-        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
-        
-        painter.fillRect(self.rect(), QColor("#2b2b2b"))
+        painter.drawPixmap(0, 0, self.text_pixmap)
+
+
+class CoreStripWidget(CachedWidget):
+    """Heat strip with one column per logical CPU
+
+    A column's color goes from the background to the widget color with
+    its load, in 10% steps; the strip is only re-rendered when a step
+    changes.
+    """
+    
+    def __init__(self, name, color):
+        super().__init__(name, color)
+        self.levels = ()
+        self.strip = None
+        self.setFixedWidth(12)
+        self.setFixedHeight(30)
+    
+    def update_data(self, loads, max_val=100, text=None, tooltip=None):
+        if not self.visible_flag:
+            self.hide()
+            return
+        self.show()
         
-        painter.setPen(QColor(self.color))
-        font = QFont("Segoe UI", 8, QFont.Weight.Bold)
-        painter.setFont(font)
-        painter.drawText(self.rect(), Qt.AlignmentFlag.AlignCenter, self.display_text)
+        if tooltip:
+            self.set_tooltip(tooltip)
+        levels = tuple(min(10, int(load + 5) // 10) for load in loads)
+        if len(levels) != len(self.levels):
+            # 1-4 px per core, at least as wide as the other bars
+            core_px = max(1, min(4, 64 // max(1, len(levels))))
+            self.setFixedWidth(max(12, core_px * len(levels) + 2))
+        if levels != self.levels:
+            self.levels = levels
+            self.invalidate()
+    
+    def set_display_type(self, dtype):
+        pass  # Always a heat strip
+    
+    def invalidate(self):
+        self.strip = None
+        self.update()
+    
+    def render_strip(self):
+        w, h = self.width(), self.height()
+        pixmap = self.new_pixmap(w, h)
+        painter = QPainter(pixmap)
+        painter.drawPixmap(0, 0, self.background_pixmap())
+        n = len(self.levels)
+        if n:
+            col_w = (w - 2) / n
+            color = QColor(self.color)
+            for i, level in enumerate(self.levels):
+                color.setAlpha(40 + level * 21)
+                x = 1 + i * col_w
+                painter.fillRect(QRectF(x, 1, max(1.0, col_w - (1 if col_w >= 3 else 0)), h - 2), color)
+        painter.end()
+        return pixmap
+    
+    def paintEvent(self, event):
+        if self.strip is None:
+            self.strip = self.render_strip()
+        painter = QPainter(self)
+        painter.drawPixmap(0, 0, self.strip)
+
+
+WIDGET_KINDS = {"bar": MetricWidget, "text": TextWidget, "heat": CoreStripWidget}
 
 
 class SysMonBar(QMainWindow):
@@ -132,30 +375,60 @@ class SysMonBar(QMainWindow):
         self.init_ui()
         
         self.monitor_thread = SystemMonitor()
-        self.monitor_thread.stats_updated.connect(self.update_ui)
+        self.monitor_thread.stats_ready.connect(self.update_ui)
+        self.diagnostics = self.monitor_thread.diagnostics
+        self.diagnostics.enabled = self.settings_store.value("trace_enabled", False, type=bool)
+        self.stats = StatsSnapshot()
+        # Paints and raises only while watched, samples slowly in low power
+        self.idle = IdlePolicy()
+        self.idle.add_listener(self.apply_idle)
+        self.painting = True
+        self.idle_timer = QTimer(self)
+        self.idle_timer.timeout.connect(self.idle.poll)
+        self.idle_timer.start(int(POLL_INTERVAL * 1000))
+        self.session_events = None
+        if sys.platform == "win32":
+            from idle import WindowsSessionEvents
+            try:
+                self.session_events = WindowsSessionEvents(self.idle, int(self.winId()))
+            except OSError as e:
+                print(f"⚠ Display/lock notifications not available: {e}")
+        history = self.monitor_thread.history
+        for module, widget in self.module_widgets:
+            if module.history:
+                widget.history_source = self.history_percent(module.history, module.scale)
+                widget.history_count = lambda: history.count
+        self.apply_demand()
+        self.apply_net_filters()
+        self.apply_intervals()
+        self.exporter = None
+        self.apply_exporter()
+        self.shared_ring = None
+        self.apply_shared_ring()
+        self.process_tracker = None
+        self.apply_process_tracker()
         self.monitor_thread.start()
 
     def load_settings(self):
-        self.settings = {
-            "show_cpu": self.settings_store.value("show_cpu", True, type=bool),
-            "show_ram": self.settings_store.value("show_ram", True, type=bool),
-            "show_gpu": self.settings_store.value("show_gpu", True, type=bool),
-            "show_net": self.settings_store.value("show_net", True, type=bool),
-            "show_power": self.settings_store.value("show_power", True, type=bool),
-            "show_temp": self.settings_store.value("show_temp", True, type=bool),
-            "color_cpu": self.settings_store.value("color_cpu", "#3498db", type=str),
-            "color_ram": self.settings_store.value("color_ram", "#9b59b6", type=str),
-            "color_gpu": self.settings_store.value("color_gpu", "#2ecc71", type=str),
-            "color_net": self.settings_store.value("color_net", "#1abc9c", type=str),
-            "color_power": self.settings_store.value("color_power", "#e67e22", type=str),
-            "color_temp": self.settings_store.value("color_temp", "#e74c3c", type=str),
+        self.settings = {}
+        for m in MODULES:
+            self.settings[m.show_key] = self.settings_store.value(m.show_key, m.visible, type=bool)
+            self.settings[m.color_key] = self.settings_store.value(m.color_key, m.color, type=str)
+            if m.kind == "bar":
+                self.settings[m.display_key] = self.settings_store.value(m.display_key, "bar", type=str)
+        self.settings.update({
             "unit": self.settings_store.value("unit", "GB", type=str),
             "net_unit": self.settings_store.value("net_unit", "kbps", type=str),
-            "display_cpu": self.settings_store.value("display_cpu", "bar", type=str),
-            "display_ram": self.settings_store.value("display_ram", "bar", type=str),
-            "display_gpu": self.settings_store.value("display_gpu", "bar", type=str),
-            "display_net": self.settings_store.value("display_net", "bar", type=str),
-        }
+            "log_analytics": self.settings_store.value("log_analytics", True, type=bool),
+            "net_include": self.settings_store.value("net_include", "", type=str),
+            "net_exclude": self.settings_store.value("net_exclude", "", type=str),
+            "interval_system": self.settings_store.value("interval_system", 1.0, type=float),
+            "interval_sensors": self.settings_store.value("interval_sensors", 1.0, type=float),
+            "exporter_enabled": self.settings_store.value("exporter_enabled", False, type=bool),
+            "exporter_address": self.settings_store.value("exporter_address", "127.0.0.1:9184", type=str),
+            "shm_enabled": self.settings_store.value("shm_enabled", False, type=bool),
+            "show_processes": self.settings_store.value("show_processes", False, type=bool),
+        })
 
     def init_ui(self):
         self.setWindowFlags(
@@ -167,9 +440,7 @@ class SysMonBar(QMainWindow):
         
         self.top_timer = QTimer(self)
         self.top_timer.timeout.connect(self.raise_)
-        self.top_timer.start(500)
-        
-        self.update_position()
+        self.top_timer.start(RAISE_INTERVAL)
 
         self.central_widget = QWidget()
         self.central_widget.setStyleSheet("background-color: transparent;")
@@ -182,22 +453,16 @@ class SysMonBar(QMainWindow):
         self.layout.setContentsMargins(2, 2, 2, 2)
         self.layout.setSpacing(2)
         
-        # Metric widgets
-        self.cpu_widget = MetricWidget("CPU", self.settings["color_cpu"], self.settings["display_cpu"])
-        self.ram_widget = MetricWidget("RAM", self.settings["color_ram"], self.settings["display_ram"])
-        self.gpu_widget = MetricWidget("GPU", self.settings["color_gpu"], self.settings["display_gpu"])
-        self.net_widget = MetricWidget("NET", self.settings["color_net"], self.settings["display_net"])
-        
-        # Text widgets for power and temp
-        self.power_widget = TextWidget("Power", self.settings["color_power"])
-        self.temp_widget = TextWidget("Temp", self.settings["color_temp"])
-        
-        self.layout.addWidget(self.cpu_widget)
-        self.layout.addWidget(self.ram_widget)
-        self.layout.addWidget(self.gpu_widget)
-        self.layout.addWidget(self.net_widget)
-        self.layout.addWidget(self.power_widget)
-        self.layout.addWidget(self.temp_widget)
+        # One widget per module, in bar order
+        self.module_widgets = []
+        for m in MODULES:
+            if m.kind == "bar":
+                widget = MetricWidget(m.title, self.settings[m.color_key], self.settings[m.display_key])
+            else:
+                widget = WIDGET_KINDS[m.kind](m.title, self.settings[m.color_key])
+            self.module_widgets.append((m, widget))
+            self.layout.addWidget(widget)
+        self.bar_widgets = [widget for _, widget in self.module_widgets]
         
         self.apply_visibility()
 
@@ -212,90 +477,181 @@ class SysMonBar(QMainWindow):
         tray_menu = QMenu()
         tray_menu.addAction("📊 Analytics", self.open_analytics)
         tray_menu.addAction("Settings", self.open_settings)
+        tray_menu.addAction("Diagnostics", self.open_diagnostics)
         tray_menu.addSeparator()
         tray_menu.addAction("Exit", self.close_app)
         self.tray_icon.setContextMenu(tray_menu)
         self.tray_icon.show()
 
+    def history_percent(self, fields, max_val):
+        """Graph source: sum of fields from the monitor history, as % of max_val"""
+        history = self.monitor_thread.history
+        
+        def source(n):
+            columns = [history.last(f, n) for f in fields]
+            return [min(100, sum(vals) / max_val * 100) for vals in zip(*columns)]
+        return source
+
+    def history_tooltip(self, field, unit, seconds=60):
+        lo, hi, avg, count = self.monitor_thread.history.aggregate(field, seconds)
+        if not count:
+            return ""
+        return f" | 1m avg {avg:.0f}{unit}, max {hi:.0f}{unit}"
+
     def update_position(self):
         screen = QApplication.primaryScreen()
         geo = screen.geometry()
         bar_h = 38
-        bar_w = 130  # Wider for temp widget
+        # Visible widgets plus spacing and margins; the core strip's width follows the core count
+        visible = [w.width() for w in self.bar_widgets if w.visible_flag]
+        bar_w = sum(visible) + 2 * max(0, len(visible) - 1) + 4
         self.setGeometry(geo.width() - bar_w - 300, geo.height() - bar_h - 2, bar_w, bar_h)
 
-    def update_ui(self, stats):
+    def update_ui(self, force=False):
+        self.monitor_thread.take_notification()
+        if not self.painting:
+            # Nobody can see it; apply_idle redraws when that changes
+            return
+        if not self.monitor_thread.snapshots.read_into(self.stats) and not force:
+            return
+        stats = self.stats
+        stale = stats.stale
         try:
-            self.cpu_widget.update_data(stats['cpu'], 100, f"{stats['cpu']:.0f}%")
-            
-            unit = self.settings["unit"]
-            if unit == "GB":
-                ram_text = f"{stats['ram_used_gb']:.1f}/{stats['ram_total_gb']:.1f}GB"
-            else:
-                ram_text = f"{stats['ram_used_gb']*1024:.0f}/{stats['ram_total_gb']*1024:.0f}MB"
-            self.ram_widget.update_data(stats['ram_used_gb'], stats['ram_total_gb'], ram_text)
+            for module, widget in self.module_widgets:
+                if not widget.visible_flag:
+                    continue
+                values = module.format(self, stats)
+                if values is None:
+                    continue
+                value, max_val, text, tooltip = values
+                # Sensors that missed their deadline show the last value, dimmed
+                is_stale = bool(stale) and any(field in stale for field in module.fields)
+                widget.set_stale(is_stale)
+                if is_stale:
+                    tooltip = (tooltip or f"{module.title}: {text}") + STALE_NOTE
+                width = widget.width()
+                widget.update_data(value, max_val, text, tooltip)
+                if widget.width() != width:
+                    # The core strip sizes itself to the core count
+                    self.update_position()
             
-            self.gpu_widget.update_data(stats['gpu'], 100, f"{stats['gpu']:.0f}%")
-            
-            net_unit = self.settings.get("net_unit", "kbps")
-            down = stats['net_down']
-            up = stats['net_up']
-            
-            def fmt(b, u):
-                if u == "kbps": return f"{b*8/1024:.1f}kbps"
-                elif u == "mbps": return f"{b*8/1024/1024:.2f}mbps"
-                elif u == "KBps": return f"{b/1024:.1f}KB/s"
-                elif u == "MBps": return f"{b/1024/1024:.2f}MB/s"
-                return f"{b}B/s"
-            
-            net_text = f"↓{fmt(down, net_unit)} ↑{fmt(up, net_unit)}"
-            self.net_widget.update_data(down + up, 10*1024*1024, net_text)
-            
-            # Power
-            power = stats.get('power', 0) or 0
-            self.power_widget.update_data(power, 150, f"{int(power)}W")
-            
-            # Temperature (combined - shows max of CPU/GPU)
-            temp = stats.get('temp', 0) or 0
-            cpu_temp = stats.get('cpu_temp', 0) or 0
-            gpu_temp = stats.get('gpu_temp', 0) or 0
-            temp_text = f"{int(temp)}°C"
-            tooltip = f"CPU: {int(cpu_temp)}°C | GPU: {int(gpu_temp)}°C"
-            self.temp_widget.update_data(temp, 100, temp_text)
-            self.temp_widget.setToolTip(tooltip)
+            # Collector timings in the tray tooltip, refreshed every 10 s
+            if self.diagnostics.enabled and stats.seq % 10 == 0:
+                self.tray_icon.setToolTip(f"SysMonBar\n{self.diagnostics.tooltip()}")
             
         except Exception as e:
             print(f"Update error: {e}")
+            self.diagnostics.error("update_ui", e)
 
     def apply_visibility(self):
-        self.cpu_widget.visible_flag = self.settings.get("show_cpu", True)
-        self.ram_widget.visible_flag = self.settings.get("show_ram", True)
-        self.gpu_widget.visible_flag = self.settings.get("show_gpu", True)
-        self.net_widget.visible_flag = self.settings.get("show_net", True)
-        self.power_widget.visible_flag = self.settings.get("show_power", True)
-        self.temp_widget.visible_flag = self.settings.get("show_temp", True)
-        
-        for w in [self.cpu_widget, self.ram_widget, self.gpu_widget, self.net_widget, self.power_widget, self.temp_widget]:
-            if not w.visible_flag:
-                w.hide()
+        for module, widget in self.module_widgets:
+            visible = self.settings.get(module.show_key, module.visible)
+            if visible and not widget.visible_flag:
+                # Missed samples while hidden; redraw from history
+                widget.invalidate()
+            widget.visible_flag = visible
+            if not visible:
+                widget.hide()
             else:
-                w.show()
+                widget.show()
+        self.update_position()
+
+    def apply_demand(self):
+        """Sample only what the visible modules show (plus what's logged)"""
+        collector = self.monitor_thread.collector
+        collector.set_logging(self.settings.get("log_analytics", True))
+        collector.set_demand("base", demand(MODULES, self.settings))
 
     def update_display_types(self):
-        self.cpu_widget.set_display_type(self.settings.get("display_cpu", "bar"))
-        self.ram_widget.set_display_type(self.settings.get("display_ram", "bar"))
-        self.gpu_widget.set_display_type(self.settings.get("display_gpu", "bar"))
-        self.net_widget.set_display_type(self.settings.get("display_net", "bar"))
+        for module, widget in self.module_widgets:
+            if module.kind == "bar":
+                widget.set_display_type(self.settings.get(module.display_key, "bar"))
 
     def update_colors(self):
-        self.cpu_widget.color = self.settings.get("color_cpu", "#3498db")
-        self.ram_widget.color = self.settings.get("color_ram", "#9b59b6")
-        self.gpu_widget.color = self.settings.get("color_gpu", "#2ecc71")
-        self.net_widget.color = self.settings.get("color_net", "#1abc9c")
-        self.power_widget.color = self.settings.get("color_power", "#e67e22")
-        self.temp_widget.color = self.settings.get("color_temp", "#e74c3c")
+        for module, widget in self.module_widgets:
+            widget.set_color(self.settings.get(module.color_key, module.color))
+
+    def apply_intervals(self):
+        collector = self.monitor_thread.collector
+        system = self.settings.get("interval_system", 1.0)
+        sensors = self.settings.get("interval_sensors", 1.0)
+        if self.idle.low_power:
+            # Just enough for the logged readings
+            floor = collector.scheduler["analytics"].interval
+            system, sensors = max(system, floor), max(sensors, floor)
+        collector.set_interval("system", system)
+        collector.set_interval("sensors", sensors)
+
+    def apply_idle(self, policy):
+        """Follow the idle policy: painting, raising and sampling rate"""
+        if policy.watched != self.painting:
+            self.painting = policy.watched
+            if self.painting:
+                self.top_timer.start(RAISE_INTERVAL)
+                self.raise_()
+                # Graphs missed samples; rebuild them from history
+                for widget in self.bar_widgets:
+                    if widget.visible_flag:
+                        widget.invalidate()
+                self.update_ui(force=True)
+            else:
+                self.top_timer.stop()
+        self.apply_intervals()
+        self.apply_process_tracker()
+
+    def apply_net_filters(self):
+        self.monitor_thread.collector.net.set_filters(parse_patterns(self.settings.get("net_include", "")),
+                                                      parse_patterns(self.settings.get("net_exclude", "")))
+
+    def apply_exporter(self):
+        """Start, stop or move the metrics endpoint to match the settings"""
+        wanted = self.settings.get("exporter_address", "") if self.settings.get("exporter_enabled") else None
+        if self.exporter:
+            if wanted == self.exporter_spec:
+                return
+            self.exporter.stop()
+            self.exporter = None
+        self.exporter_spec = None
+        if wanted is None:
+            return
+        try:
+            from exporter import MetricsExporter
+            exporter = MetricsExporter(self.monitor_thread.collector, wanted)
+            exporter.start()
+            self.exporter = exporter
+            self.exporter_spec = wanted
+            print(f"✓ Serving metrics on {exporter.url()}")
+        except (OSError, ValueError) as e:
+            print(f"⚠ Metrics endpoint not started: {e}")
+
+    def apply_shared_ring(self):
+        enabled = self.settings.get("shm_enabled", False)
+        if self.shared_ring and not enabled:
+            self.shared_ring.stop()
+            self.shared_ring = None
+        elif enabled and not self.shared_ring:
+            try:
+                from sharedring import SharedRingWriter
+                ring = SharedRingWriter(self.monitor_thread.collector)
+                ring.start()
+                self.shared_ring = ring
+            except OSError as e:
+                print(f"⚠ Shared samples not available: {e}")
+
+    def apply_process_tracker(self):
+        # Only feeds tooltips, so it pauses with the painting
+        enabled = self.settings.get("show_processes", False) and self.painting
+        if self.process_tracker and not enabled:
+            self.process_tracker.stop()
+            self.process_tracker = None
+        elif enabled and not self.process_tracker:
+            from processes import ProcessTracker
+            self.process_tracker = ProcessTracker(diagnostics=self.diagnostics)
+            self.process_tracker.start()
 
     def open_settings(self):
+        # Dialog modules are imported on first use to keep startup fast
+        from settings import SettingsDialog
         dlg = SettingsDialog(self.settings, self.apply_settings)
         dlg.exec()
 
@@ -306,8 +662,14 @@ class SysMonBar(QMainWindow):
                 self.settings_store.setValue(k, v)
             
             self.apply_visibility()
+            self.apply_demand()
             self.update_colors()
             self.update_display_types()
+            self.apply_net_filters()
+            self.apply_intervals()
+            self.apply_exporter()
+            self.apply_shared_ring()
+            self.apply_process_tracker()
             
         except Exception as e:
             print(f"Apply settings error: {e}")
@@ -318,22 +680,68 @@ class SysMonBar(QMainWindow):
         menu = QMenu()
         menu.addAction("📊 Analytics", self.open_analytics)
         menu.addAction("⚙️ Settings", self.open_settings)
+        menu.addAction("🩺 Diagnostics", self.open_diagnostics)
         menu.addSeparator()
         menu.addAction("❌ Exit", self.close_app)
         menu.exec(self.central_widget.mapToGlobal(pos))
 
     def open_analytics(self):
+        from analytics_window import AnalyticsWindow
         dlg = AnalyticsWindow(self)
         dlg.exec()
 
+    def open_diagnostics(self):
+        from diagnostics_window import DiagnosticsWindow
+        dlg = DiagnosticsWindow(self.diagnostics, self, self.monitor_thread.collector.scheduler)
+        dlg.exec()
+        if not self.diagnostics.enabled:
+            self.tray_icon.setToolTip("SysMonBar")
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.idle.set_visible(not self.isMinimized())
+
+    def hideEvent(self, event):
+        super().hideEvent(event)
+        self.idle.set_visible(False)
+
+    def changeEvent(self, event):
+        super().changeEvent(event)
+        if event.type() == QEvent.Type.WindowStateChange:
+            self.idle.set_visible(self.isVisible() and not self.isMinimized())
+
+    def enterEvent(self, event):
+        # Hovering the bar counts as activity (the only kind seen off Windows)
+        self.idle.activity()
+        super().enterEvent(event)
+
+    def nativeEvent(self, event_type, message):
+        # Native messages start arriving before __init__ has finished
+        if getattr(self, "session_events", None) is not None and event_type == b"windows_generic_MSG":
+            self.session_events.handle(int(message))
+        return super().nativeEvent(event_type, message)
+
     def close_app(self):
+        self.idle_timer.stop()
+        if self.session_events:
+            self.session_events.close()
+        if self.exporter:
+            self.exporter.stop()
+        if self.shared_ring:
+            self.shared_ring.stop()
+        if self.process_tracker:
+            self.process_tracker.stop()
         self.monitor_thread.stop()
         self.monitor_thread.wait()
         QApplication.quit()
 
 
-if __name__ == "__main__":
+def main():
     app = QApplication(sys.argv)
     window = SysMonBar()
     window.show()
     sys.exit(app.exec())
+
+
+if __name__ == "__main__":
+    main()
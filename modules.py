@@ -0,0 +1,150 @@
+"""Registry of the bar's metric modules
+
+A MetricModule ties together everything the bar needs for one metric:
+its settings keys, the widget kind that shows it, the collector sources
+it needs and the formatter that turns a snapshot into widget values.
+main.py, the settings dialog and the collector demand are all driven
+from MODULES, so adding a module means adding one entry here.
+
+Collector sources are the names in collector.SOURCES. A source is only
+sampled while some visible module (or logging / exporting) needs it.
+"""
+
+# Full scale of the network and DISK bar/graph, bytes per second
+NET_SCALE = 10*1024*1024
+DISK_SCALE = 200*1024*1024
+
+
+class MetricModule:
+    """One metric shown on the bar
+
+    key names the settings (show_<key>, color_<key>, display_<key>).
+    kind is the widget: "bar" (bar or graph), "text" or "heat".
+    sources are the collector sources it needs, fields the snapshot
+    fields it shows (a stale one dims the widget), history the fields
+    summed for graph mode against scale. format(bar, stats) returns
+    (value, max_val, text, tooltip) for the widget's update_data(), or
+    None to leave the widget as it is.
+    """
+
+    def __init__(self, key, label, title, color, kind, sources, fields, format,
+                 visible=True, history=(), scale=100):
+        self.key = key
+        self.label = label
+        self.title = title
+        self.color = color
+        self.kind = kind
+        self.sources = frozenset(sources)
+        self.fields = tuple(fields)
+        self.format = format
+        self.visible = visible
+        self.history = tuple(history)
+        self.scale = scale
+
+    @property
+    def show_key(self):
+        return f"show_{self.key}"
+
+    @property
+    def color_key(self):
+        return f"color_{self.key}"
+
+    @property
+    def display_key(self):
+        return f"display_{self.key}"
+
+
+def format_rate(b, unit):
+    if unit == "kbps": return f"{b*8/1024:.1f}kbps"
+    elif unit == "mbps": return f"{b*8/1024/1024:.2f}mbps"
+    elif unit == "KBps": return f"{b/1024:.1f}KB/s"
+    elif unit == "MBps": return f"{b/1024/1024:.2f}MB/s"
+    return f"{b}B/s"
+
+
+def format_cpu(bar, stats):
+    tooltip = f"CPU: {stats.cpu:.0f}%" + bar.history_tooltip("cpu", "%")
+    tracker = bar.process_tracker
+    if tracker and tracker.cpu_text:
+        tooltip += "\n" + tracker.cpu_text
+    return stats.cpu, 100, f"{stats.cpu:.0f}%", tooltip
+
+
+def format_cores(bar, stats):
+    cores = stats.cores
+    if not cores:
+        return None
+    busiest = max(range(len(cores)), key=cores.__getitem__)
+    return cores, 100, None, f"{len(cores)} cores, busiest #{busiest}: {cores[busiest]:.0f}%"
+
+
+def format_ram(bar, stats):
+    if bar.settings["unit"] == "GB":
+        text = f"{stats.ram_used_gb:.1f}/{stats.ram_total_gb:.1f}GB"
+    else:
+        text = f"{stats.ram_used_gb*1024:.0f}/{stats.ram_total_gb*1024:.0f}MB"
+    tooltip = None
+    tracker = bar.process_tracker
+    if tracker and tracker.memory_text:
+        # The usual "RAM: used/total" line, then the top processes
+        tooltip = f"RAM: {text}\n{tracker.memory_text}"
+    return stats.ram_used_gb, stats.ram_total_gb, text, tooltip
+
+
+def format_gpu(bar, stats):
+    return stats.gpu, 100, f"{stats.gpu:.0f}%", f"GPU: {stats.gpu:.0f}%" + bar.history_tooltip("gpu", "%")
+
+
+def format_net(bar, stats):
+    unit = bar.settings.get("net_unit", "kbps")
+    text = f"↓{format_rate(stats.net_down, unit)} ↑{format_rate(stats.net_up, unit)}"
+    tooltip = None
+    interfaces = bar.monitor_thread.collector.net.per_interface()
+    if len(interfaces) > 1:
+        tooltip = f"NET: {text}\n" + "\n".join(
+            f"{name}: ↓{format_rate(d, unit)} ↑{format_rate(u, unit)}" for name, u, d in interfaces[:5])
+    return stats.net_down + stats.net_up, NET_SCALE, text, tooltip
+
+
+def format_disk(bar, stats):
+    text = f"R {stats.disk_read/1024/1024:.1f} W {stats.disk_write/1024/1024:.1f}MB/s"
+    tooltip = f"DISK: {text}" + "".join(
+        f"\n{name}: R {r/1024/1024:.1f} W {w/1024/1024:.1f}MB/s"
+        for name, r, w in bar.monitor_thread.collector.disk.per_disk())
+    return stats.disk_read + stats.disk_write, DISK_SCALE, text, tooltip
+
+
+def format_power(bar, stats):
+    power = stats.power
+    return power, 150, f"{int(power)}W", f"Power: {int(power)}W" + bar.history_tooltip("power", "W")
+
+
+def format_temp(bar, stats):
+    # Combined: the hotter of CPU and GPU
+    tooltip = f"CPU: {int(stats.cpu_temp)}°C | GPU: {int(stats.gpu_temp)}°C"
+    return stats.temp, 100, f"{int(stats.temp)}°C", tooltip
+
+
+# In bar order
+MODULES = (
+    MetricModule("cpu", "CPU", "CPU", "#3498db", "bar", ["cpu"], ["cpu"], format_cpu, history=["cpu"]),
+    MetricModule("cores", "Cores", "Cores", "#3498db", "heat", ["cores"], [], format_cores, visible=False),
+    MetricModule("ram", "RAM", "RAM", "#9b59b6", "bar", ["ram"], ["ram_percent"], format_ram,
+                 history=["ram_percent"]),
+    MetricModule("gpu", "GPU", "GPU", "#2ecc71", "bar", ["gpu"], ["gpu"], format_gpu, history=["gpu"]),
+    MetricModule("net", "Network", "NET", "#1abc9c", "bar", ["net"], [], format_net,
+                 history=["net_up", "net_down"], scale=NET_SCALE),
+    MetricModule("disk", "Disk", "DISK", "#f1c40f", "bar", ["disk"], [], format_disk, visible=False,
+                 history=["disk_read", "disk_write"], scale=DISK_SCALE),
+    MetricModule("power", "Power", "Power", "#e67e22", "text", ["power"], ["power"], format_power),
+    MetricModule("temp", "Temp", "Temp", "#e74c3c", "text", ["cpu_temp", "gpu_temp"], ["temp"], format_temp),
+)
+
+
+def demand(modules, settings):
+    """Collector sources needed by the visible modules"""
+    sources = set()
+    for module in modules:
+        if settings.get(module.show_key, module.visible):
+            sources |= module.sources
+    return sources
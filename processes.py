@@ -0,0 +1,117 @@
+import time
+import heapq
+import threading
+from collections import namedtuple
+from operator import attrgetter
+import psutil
+
+# Fetched per process and scan; process_iter() reads them under oneshot()
+ATTRS = ["cpu_times", "memory_info"]
+DEFAULT_INTERVAL = 5.0
+DEFAULT_TOP_N = 5
+
+ProcessUsage = namedtuple("ProcessUsage", "pid name cpu_percent rss")
+
+
+class ProcessTracker:
+    """Top-N processes by CPU and memory, scanned on its own thread
+
+    Every `interval` seconds scan() walks psutil.process_iter(ATTRS).
+    psutil keeps the Process objects between calls; on top of that a
+    pid -> (process, name, cpu seconds) cache means a process's name is
+    only looked up the first time it is seen, and CPU usage is the delta
+    of its cpu_times since the previous scan. Only the top_n of each
+    list are kept (heapq.nlargest), rendered once per scan into
+    cpu_text / memory_text for the widget tooltips.
+
+    The scan never runs on the 1 s sampling thread. Results are swapped
+    in as whole tuples/strings, so the GUI can read them at any time.
+    """
+
+    def __init__(self, top_n=DEFAULT_TOP_N, interval=DEFAULT_INTERVAL, diagnostics=None):
+        self.top_n = top_n
+        self.interval = interval
+        self.diagnostics = diagnostics
+        self.cache = {}
+        self.cpu_count = psutil.cpu_count() or 1
+        self.last_scan = None
+        self.top_cpu = ()
+        self.top_memory = ()
+        self.cpu_text = ""
+        self.memory_text = ""
+        self.process_count = 0
+        self.scan_seconds = 0.0
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    @staticmethod
+    def name_of(proc):
+        try:
+            return proc.name()
+        except psutil.Error:
+            return f"pid {proc.pid}"
+
+    def scan(self):
+        start = time.perf_counter()
+        now = time.monotonic()
+        elapsed = now - self.last_scan if self.last_scan is not None else 0
+        # Percent of the whole machine, like the CPU widget
+        scale = 100 / elapsed / self.cpu_count if elapsed > 0 else 0
+        cache = self.cache
+        seen = {}
+        usage = []
+
+        for proc in psutil.process_iter(ATTRS, ad_value=None):
+            pid = proc.pid
+            info = proc.info
+            times = info["cpu_times"]
+            if times is None or pid == 0:
+                # Access denied, or the idle process
+                continue
+            cpu_seconds = times.user + times.system
+            entry = cache.get(pid)
+            # A different Process object for a known pid means pid reuse
+            if entry is None or entry[0] is not proc:
+                name = self.name_of(proc)
+                percent = 0.0
+            else:
+                name = entry[1]
+                percent = max(0.0, (cpu_seconds - entry[2]) * scale)
+            seen[pid] = (proc, name, cpu_seconds)
+            memory = info["memory_info"]
+            usage.append(ProcessUsage(pid, name, percent, memory.rss if memory else 0))
+
+        self.cache = seen
+        self.last_scan = now
+        self.process_count = len(usage)
+        top_cpu = heapq.nlargest(self.top_n, usage, key=attrgetter("cpu_percent"))
+        top_memory = heapq.nlargest(self.top_n, usage, key=attrgetter("rss"))
+        self.cpu_text = "\n".join(f"{p.name}: {p.cpu_percent:.1f}%" for p in top_cpu if p.cpu_percent > 0)
+        self.memory_text = "\n".join(f"{p.name}: {p.rss / 1024**2:.0f}MB" for p in top_memory)
+        self.top_cpu = tuple(top_cpu)
+        self.top_memory = tuple(top_memory)
+
+        self.scan_seconds = time.perf_counter() - start
+        if self.diagnostics and self.diagnostics.enabled:
+            self.diagnostics.record("processes", self.scan_seconds)
+
+    def run(self):
+        while not self.stop_event.is_set():
+            try:
+                self.scan()
+            except Exception as e:
+                print(f"Process scan error: {e}")
+                if self.diagnostics:
+                    self.diagnostics.error("processes", e)
+            self.stop_event.wait(self.interval)
+
+    def start(self):
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self.run, name="process-tracker", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread:
+            self.thread.join(timeout=5)
+            self.thread = None
@@ -0,0 +1,130 @@
+"""Deadline scheduler for the collector's sampling groups
+
+Each SampleGroup has its own interval and runs when its deadline on
+time.monotonic() comes up, so wall clock changes (NTP, DST, a user
+setting the time) never move a tick. Deadlines advance by whole
+intervals from where they were, not from when the group finished, so
+the cadence doesn't drift by the sampling cost. A group that falls more
+than one interval behind (suspend, a long stall) skips the missed ticks
+and runs once, instead of catching up with a burst of samples.
+
+A group may have a cost budget: the share of its interval its run() is
+allowed to take. When the smoothed cost goes over it, the group's
+interval is doubled (up to MAX_BACKOFF times); once the cost would fit
+comfortably at half the backoff, it is halved again.
+"""
+import time
+
+MAX_BACKOFF = 8
+# Weight of the newest run in the smoothed cost
+COST_SMOOTHING = 0.3
+
+
+class SampleGroup:
+    """A set of metrics sampled together at one interval
+
+    run is called with no arguments; budget is a fraction of the
+    interval (None for no limit).
+    """
+
+    def __init__(self, name, run, interval, budget=None):
+        self.name = name
+        self.run = run
+        self.interval = interval
+        self.budget = budget
+        self.backoff = 1
+        self.cost = 0.0
+        self.next_due = 0.0
+        self.runs = 0
+        self.skipped = 0
+
+    @property
+    def period(self):
+        """Interval after backoff, seconds"""
+        return self.interval * self.backoff
+
+    def set_interval(self, interval):
+        # Bring the next tick forward if the new interval is shorter
+        self.next_due = min(self.next_due, self.next_due - self.period + interval * self.backoff)
+        self.interval = interval
+
+    def account(self, cost):
+        """Fold one run's cost into the estimate and adjust the backoff"""
+        self.cost = cost if self.runs == 0 else self.cost + COST_SMOOTHING * (cost - self.cost)
+        self.runs += 1
+        if self.budget is None:
+            return
+        if self.cost > self.budget * self.period and self.backoff < MAX_BACKOFF:
+            self.backoff *= 2
+        elif self.backoff > 1 and self.cost <= self.budget * self.period / 4:
+            # Would use at most half its budget at half the backoff
+            self.backoff //= 2
+
+
+class Scheduler:
+    """Runs SampleGroups at their deadlines
+
+    run_due() runs every group that is due and returns them; wait()
+    tells the caller how long it may sleep until the next deadline.
+    Both are called from the collector thread only. A group whose run()
+    raises is counted as an error in diagnostics and rescheduled like
+    any other, so it can't hold up the rest.
+    """
+
+    def __init__(self, groups, diagnostics=None, clock=time.monotonic):
+        self.groups = {group.name: group for group in groups}
+        self.diagnostics = diagnostics
+        self.clock = clock
+
+    def __getitem__(self, name):
+        return self.groups[name]
+
+    def start(self):
+        """Make every group due right away"""
+        now = self.clock()
+        for group in self.groups.values():
+            group.next_due = now
+
+    def wait(self):
+        """Seconds until the next deadline (0 if one has passed)"""
+        return max(0.0, min(g.next_due for g in self.groups.values()) - self.clock())
+
+    def run_due(self):
+        now = self.clock()
+        due = [g for g in self.groups.values() if g.next_due <= now]
+        perf = time.perf_counter
+        diag = self.diagnostics
+        for group in due:
+            start = perf()
+            try:
+                group.run()
+            except Exception as e:
+                # One failing group must not hold up the others, nor be
+                # retried before its next deadline
+                print(f"Sampling error ({group.name}): {e}")
+                if diag:
+                    diag.error(group.name, e)
+            cost = perf() - start
+            group.account(cost)
+            if diag and diag.enabled:
+                diag.record(f"group {group.name}", cost)
+
+            period = group.period
+            group.next_due += period
+            behind = now - group.next_due
+            if behind >= 0:
+                # Missed ticks: drop them and continue from now
+                missed = int(behind // period) + 1
+                group.skipped += missed
+                group.next_due += missed * period
+        return due
+
+    def describe(self):
+        """One line per group: interval, backoff and smoothed cost"""
+        lines = []
+        for g in self.groups.values():
+            line = f"{g.name}: every {g.period:g} s, {g.cost * 1000:.1f} ms"
+            if g.backoff > 1:
+                line += f" (backed off x{g.backoff})"
+            lines.append(line)
+        return "\n".join(lines)
@@ -0,0 +1,758 @@
+import os
+import sys
+import glob
+import time
+import ctypes
+import threading
+import psutil
+
+
+def is_admin():
+    try:
+        return ctypes.windll.shell32.IsUserAnAdmin()
+    except:
+        return False
+
+
+CPU_POWER = "cpu_power"
+CPU_TEMP = "cpu_temp"
+GPU_LOAD = "gpu_load"
+GPU_TEMP = "gpu_temp"
+
+# Snapshot field each role fills in
+ROLE_FIELDS = {CPU_POWER: "power", CPU_TEMP: "cpu_temp", GPU_LOAD: "gpu", GPU_TEMP: "gpu_temp"}
+
+# How long a tick waits for the hardware updates, seconds
+UPDATE_DEADLINE = 0.25
+
+
+def com_initialize():
+    """CoInitialize the calling thread; True if it must CoUninitialize later
+
+    COM is per thread: every thread that calls into LHM initializes it
+    for itself, and uninitializes it on the same thread when done.
+    """
+    if sys.platform != "win32":
+        return False
+    try:
+        import pythoncom
+        pythoncom.CoInitialize()
+        return True
+    except Exception as e:
+        print(f"⚠ COM init error: {e}")
+        return False
+
+
+def com_uninitialize():
+    import pythoncom
+    pythoncom.CoUninitialize()
+
+
+class HardwareWorker:
+    """Runs one LHM hardware's Update() on its own thread
+
+    submit() starts an update unless the previous one is still running,
+    so a device that hangs in its driver ties up only its own thread
+    and never gets a backlog of updates queued behind it.
+    """
+
+    def __init__(self, hardware, stage, diagnostics=None):
+        self.hardware = hardware
+        self.stage = stage
+        self.diagnostics = diagnostics
+        self.request = threading.Event()
+        self.done = threading.Event()
+        self.done.set()
+        self.closed = False
+        self.thread = threading.Thread(target=self.run, name=stage, daemon=True)
+        self.thread.start()
+
+    def submit(self):
+        """Start an update; False if the last one hasn't finished"""
+        if not self.done.is_set():
+            return False
+        self.done.clear()
+        self.request.set()
+        return True
+
+    def run(self):
+        clock = time.perf_counter
+        com = com_initialize()
+        try:
+            while True:
+                self.request.wait()
+                self.request.clear()
+                if self.closed:
+                    return
+                diag = self.diagnostics
+                start = clock()
+                try:
+                    self.hardware.Update()
+                except Exception as e:
+                    if diag:
+                        diag.error(self.stage, e)
+                if diag and diag.enabled:
+                    diag.record(self.stage, clock() - start)
+                self.done.set()
+        finally:
+            if com:
+                com_uninitialize()
+
+    def close(self):
+        self.closed = True
+        self.request.set()
+
+
+class SensorPlan:
+    """Sensor handles resolved once from LHM, read every tick.
+
+    Walking every sensor and converting HardwareType/SensorType/Name to
+    strings costs hundreds of .NET calls per tick, so the matching is done
+    here once and the hot loop only touches .Value on the chosen handles.
+    The plan marks itself dirty when hardware or sensors are added/removed.
+
+    Every hardware is updated by its own HardwareWorker, all at once, and
+    read() waits for them until `deadline`. A role whose hardware missed
+    it keeps its previous value and is listed in `stale`. Workers and
+    last values are taken over from the previous plan (workers keyed by
+    hardware Identifier), so a rebuild never starts a second Update() on
+    a device that is stuck in the first one.
+    """
+
+    def __init__(self, computer, diagnostics=None, previous=None, deadline=UPDATE_DEADLINE):
+        self.computer = computer
+        self.diagnostics = diagnostics
+        self.deadline = deadline
+        self.dirty = False
+        # Identifier -> HardwareWorker, e.g. "/amdcpu/0"
+        self.workers = {}
+        self.subscriptions = []
+        # role -> list of candidate sensors, in priority order
+        self.roles = {CPU_POWER: [], CPU_TEMP: [], GPU_LOAD: [], GPU_TEMP: []}
+        # role -> Identifiers of the hardware its sensors belong to
+        self.role_hardware = {role: set() for role in self.roles}
+        self.last_values = dict(previous.last_values) if previous else dict.fromkeys(self.roles, 0)
+        self.stale = ()
+        self.discover(dict(previous.workers) if previous else {})
+
+    def discover(self, old_workers):
+        cpu_package = []
+        cpu_power = []
+        cpu_tctl = []
+        cpu_temps = []
+        gpu_d3d = []
+        gpu_core = []
+        gpu_temps = []
+        sensor_hardware = {}
+
+        self.watch(self.computer, "HardwareAdded", "HardwareRemoved")
+
+        found = []
+        for hardware in self.computer.Hardware:
+            # Memory etc. still needs Update() even without a role
+            key = str(hardware.Identifier)
+            worker = old_workers.pop(key, None) or HardwareWorker(hardware, f"update {hardware.Name}",
+                                                                  self.diagnostics)
+            self.workers[key] = worker
+            found.append((key, hardware))
+        for worker in old_workers.values():
+            worker.close()
+
+        # Some sensors only exist after the first update
+        self.update_all()
+
+        for key, hardware in found:
+            hw_type_str = str(hardware.HardwareType)
+            is_cpu = "Cpu" in hw_type_str
+            is_gpu = "Gpu" in hw_type_str
+            if not (is_cpu or is_gpu):
+                continue
+
+            self.watch(hardware, "SensorAdded", "SensorRemoved")
+
+            try:
+                sensors = list(hardware.Sensors)
+            except Exception as e:
+                self.error("discover", e)
+                sensors = []
+
+            for sensor in sensors:
+                try:
+                    s_type = str(sensor.SensorType)
+                    name = str(sensor.Name)
+                except Exception as e:
+                    self.error("discover", e)
+                    continue
+                sensor_hardware[id(sensor)] = key
+
+                if is_cpu:
+                    if "Power" in s_type:
+                        (cpu_package if "Package" in name else cpu_power).append(sensor)
+                    if "Temperature" in s_type:
+                        (cpu_tctl if "Tctl" in name else cpu_temps).append(sensor)
+
+                if is_gpu:
+                    if "Load" in s_type:
+                        if "D3D 3D" in name:
+                            gpu_d3d.append(sensor)
+                        elif "GPU Core" in name:
+                            gpu_core.append(sensor)
+                    if "Temperature" in s_type:
+                        gpu_temps.append(sensor)
+
+        # A package sensor wins over the max of the per-core ones
+        self.roles[CPU_POWER] = cpu_package or cpu_power
+        self.roles[CPU_TEMP] = cpu_tctl + cpu_temps
+        self.roles[GPU_LOAD] = gpu_d3d + gpu_core
+        self.roles[GPU_TEMP] = gpu_temps
+        for role, sensors in self.roles.items():
+            self.role_hardware[role] = {sensor_hardware[id(sensor)] for sensor in sensors}
+
+    def watch(self, source, *events):
+        for event in events:
+            try:
+                handler = getattr(source, event)
+                handler += self.on_changed
+                self.subscriptions.append((source, event))
+            except:
+                pass
+
+    def close(self, keep_workers=False):
+        """Unsubscribe; stop the workers unless the next plan takes them"""
+        for source, event in self.subscriptions:
+            try:
+                handler = getattr(source, event)
+                handler -= self.on_changed
+            except:
+                pass
+        self.subscriptions = []
+        if not keep_workers:
+            for worker in self.workers.values():
+                worker.close()
+            self.workers = {}
+
+    def on_changed(self, *args):
+        self.dirty = True
+
+    def error(self, stage, exc):
+        if self.diagnostics:
+            self.diagnostics.error(stage, exc)
+
+    def update_all(self):
+        """Update every hardware in parallel; Identifiers that missed the deadline"""
+        end = time.monotonic() + self.deadline
+        late = set()
+        started = []
+        for key, worker in self.workers.items():
+            if worker.submit():
+                started.append((key, worker))
+            else:
+                # Still stuck in an earlier Update(): don't wait on it again
+                late.add(key)
+                self.error(worker.stage, TimeoutError("Update() still running from an earlier tick"))
+        for key, worker in started:
+            if not worker.done.wait(max(0.0, end - time.monotonic())):
+                late.add(key)
+                self.error(worker.stage, TimeoutError(f"Update() missed the {self.deadline * 1000:.0f} ms deadline"))
+        return late
+
+    def read(self):
+        """Update hardware and return (power, cpu_temp, gpu_load, gpu_temp)"""
+        late = self.update_all()
+        values = self.last_values
+        stale = []
+        for role, sensors in self.roles.items():
+            if late and not late.isdisjoint(self.role_hardware[role]):
+                # Carry the last value forward; its device is still updating
+                stale.append(ROLE_FIELDS[role])
+                continue
+            values[role] = ROLE_READERS[role](sensors)
+        self.stale = tuple(stale)
+        return values[CPU_POWER], values[CPU_TEMP], values[GPU_LOAD], values[GPU_TEMP]
+
+
+def _max_power(sensors):
+    power_watts = 0
+    for sensor in sensors:
+        val = sensor.Value
+        if val and val > power_watts:
+            power_watts = float(val)
+    return power_watts
+
+
+def _first_temp(sensors):
+    for sensor in sensors:
+        val = sensor.Value
+        if val and val > 0:
+            return float(val)
+    return 0
+
+
+def _gpu_load(sensors):
+    gpu_usage = 0
+    for sensor in sensors:
+        val = sensor.Value
+        if val is not None:
+            gpu_usage = float(val)
+            if gpu_usage > 0:
+                break
+    return gpu_usage
+
+
+def _last_temp(sensors):
+    gpu_temp = 0
+    for sensor in sensors:
+        val = sensor.Value
+        if val and val > 0:
+            gpu_temp = float(val)
+    return gpu_temp
+
+
+ROLE_READERS = {CPU_POWER: _max_power, CPU_TEMP: _first_temp, GPU_LOAD: _gpu_load, GPU_TEMP: _last_temp}
+
+
+class SensorBackend:
+    """Base sensor backend: psutil CPU usage, no hardware sensors.
+
+    The Collector calls start() and close() on its own thread, then
+    cpu_percent() and read() once per tick. read() returns
+    (power_watts, cpu_temp, gpu_usage, gpu_temp); 0 means unknown.
+    The Collector also sets diagnostics, where backends count the
+    errors they recover from. After read(), stale names the snapshot
+    fields whose sensors didn't answer in time and were carried forward.
+
+    configure() gets the sensor sources ("power", "gpu", "cpu_temp",
+    "gpu_temp") anyone currently wants, possibly from another thread;
+    backends skip the hardware nobody needs, and report 0 for it.
+    """
+
+    name = "psutil"
+    diagnostics = None
+    stale = ()
+    sources = frozenset(("power", "gpu", "cpu_temp", "gpu_temp"))
+
+    def error(self, stage, exc):
+        if self.diagnostics:
+            self.diagnostics.error(stage, exc)
+
+    def configure(self, sources):
+        self.sources = frozenset(sources)
+
+    def start(self):
+        pass
+
+    def cpu_percent(self):
+        return psutil.cpu_percent(interval=None)
+
+    def read(self):
+        return 0, 0, 0, 0
+
+    def close(self):
+        pass
+
+
+class LHMBackend(SensorBackend):
+    """LibreHardwareMonitor sensors via pythonnet (Windows)"""
+
+    name = "lhm"
+
+    def __init__(self):
+        self.computer = None
+        self.sensor_plan = None
+        # The thread that reads (the collector's), and whether COM was
+        # initialized on it
+        self.com_thread = None
+        self.com_owned = False
+        # (IsCpuEnabled, IsGpuEnabled) the Computer was opened/last set with
+        self.enabled = None
+
+        import clr
+        dll_path = os.path.join(os.path.dirname(__file__), "LibreHardwareMonitorLib.dll")
+        if not os.path.exists(dll_path):
+            raise RuntimeError(f"DLL not found at: {dll_path}")
+        clr.AddReference(dll_path)
+        from LibreHardwareMonitor.Hardware import Computer
+        self.Computer = Computer
+        print("✓ LibreHardwareMonitor DLL loaded!")
+        if is_admin():
+            print("✓ Running as Administrator - full sensor access!")
+        else:
+            print("⚠ Not running as admin - some sensors may show 0")
+
+    def start(self):
+        # May run on LazyBackend's short-lived loader thread, so no COM
+        # here: the reading thread and each HardwareWorker initialize it
+        try:
+            self.computer = self.Computer()
+            # No sensor role reads the memory hardware; RAM comes from psutil
+            self.computer.IsCpuEnabled, self.computer.IsGpuEnabled = self.enabled = self.wanted_hardware()
+            self.computer.Open()
+            print("✓ LibreHardwareMonitor Computer opened!")
+        except Exception as e:
+            print(f"⚠ LHM init error: {e}")
+            self.computer = None
+
+    def wanted_hardware(self):
+        sources = self.sources
+        return (not sources.isdisjoint(("power", "cpu_temp")),
+                not sources.isdisjoint(("gpu", "gpu_temp")))
+
+    def read(self):
+        if not self.computer:
+            return 0, 0, 0, 0
+        if self.com_thread is None:
+            self.com_thread = threading.get_ident()
+            self.com_owned = com_initialize()
+        try:
+            wanted = self.wanted_hardware()
+            if wanted != self.enabled:
+                # Toggled here, on the collector thread, never mid-Update();
+                # the Computer adds/removes the hardware and the plan follows
+                self.computer.IsCpuEnabled, self.computer.IsGpuEnabled = self.enabled = wanted
+                if self.sensor_plan:
+                    self.sensor_plan.dirty = True
+            if self.sensor_plan is None or self.sensor_plan.dirty:
+                if self.sensor_plan:
+                    self.sensor_plan.close(keep_workers=True)
+                self.sensor_plan = SensorPlan(self.computer, self.diagnostics, self.sensor_plan)
+            values = self.sensor_plan.read()
+            self.stale = self.sensor_plan.stale
+            return values
+        except Exception as e:
+            self.error("sensors", e)
+            self.stale = ()
+            # Rediscover on next tick
+            if self.sensor_plan:
+                self.sensor_plan.dirty = True
+            return 0, 0, 0, 0
+
+    def close(self):
+        if self.sensor_plan:
+            self.sensor_plan.close()
+            self.sensor_plan = None
+        if self.computer:
+            try:
+                self.computer.Close()
+            except:
+                pass
+            self.computer = None
+        # Balanced on the thread that read; the Collector closes the
+        # backend on its own thread, after the last read()
+        if self.com_owned and self.com_thread == threading.get_ident():
+            com_uninitialize()
+        self.com_thread = None
+        self.com_owned = False
+
+
+# hwmon chip name -> preferred temp labels, best first
+HWMON_CPU_CHIPS = {
+    "coretemp": ["Package id 0"],
+    "k10temp": ["Tctl", "Tdie"],
+    "zenpower": ["Tdie", "Tctl"],
+    "cpu_thermal": [],
+}
+HWMON_GPU_CHIPS = {
+    "amdgpu": ["edge", "junction"],
+    "nouveau": [],
+    "i915": [],
+}
+
+
+class SysfsFile:
+    """A sysfs/procfs file opened once and re-read with pread"""
+
+    def __init__(self, path, size=64):
+        self.path = path
+        self.size = size
+        self.fd = os.open(path, os.O_RDONLY)
+
+    def read(self):
+        return os.pread(self.fd, self.size, 0)
+
+    def read_int(self):
+        return int(self.read())
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+
+def _read_text(path):
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def _open_optional(path, size=64):
+    """Open path for pread, or None if missing/unreadable"""
+    try:
+        f = SysfsFile(path, size)
+        f.read()
+        return f
+    except (OSError, ValueError):
+        return None
+
+
+class LinuxBackend(SensorBackend):
+    """Native Linux sensors: /proc/stat, hwmon temps and RAPL energy.
+
+    Every file is opened once during start() and re-read with pread, so a
+    sample costs a handful of syscalls and no Python-level file objects.
+    CPU power comes from the RAPL package energy counters; the counter
+    delta between two samples divided by the elapsed time gives watts.
+    """
+
+    name = "linux"
+
+    def __init__(self, sysfs_root="/sys", procfs_root="/proc"):
+        self.sysfs_root = sysfs_root
+        self.procfs_root = procfs_root
+        self.files = []
+        self.stat = None
+        self.cpu_temp = None
+        self.gpu_temp = None
+        self.gpu_busy = None
+        # [(energy file, max_energy_range_uj)]
+        self.rapl = []
+        self.last_cpu_times = None
+        self.last_energy = None
+        self.last_energy_time = 0
+
+    def open(self, path, size=64):
+        f = _open_optional(path, size)
+        if f:
+            self.files.append(f)
+        return f
+
+    def start(self):
+        self.stat = self.open(os.path.join(self.procfs_root, "stat"), 256)
+        self.cpu_temp = self.find_hwmon_temp(HWMON_CPU_CHIPS)
+        self.gpu_temp = self.find_hwmon_temp(HWMON_GPU_CHIPS)
+        self.find_gpu_busy()
+        self.find_rapl()
+
+        found = []
+        if self.cpu_temp:
+            found.append("CPU temp")
+        if self.gpu_temp:
+            found.append("GPU temp")
+        if self.gpu_busy:
+            found.append("GPU load")
+        if self.rapl:
+            found.append("RAPL power")
+        if found:
+            print(f"✓ Linux sensors: {', '.join(found)}")
+        else:
+            print("⚠ No Linux hwmon/RAPL sensors found")
+
+    def find_hwmon_temp(self, chips):
+        """Return the best temp*_input file for the first matching chip"""
+        pattern = os.path.join(self.sysfs_root, "class", "hwmon", "hwmon*")
+        for hwmon in sorted(glob.glob(pattern)):
+            chip = _read_text(os.path.join(hwmon, "name"))
+            if chip not in chips:
+                continue
+
+            inputs = sorted(glob.glob(os.path.join(hwmon, "temp*_input")))
+            labels = {}
+            for path in inputs:
+                label = _read_text(path[:-len("_input")] + "_label")
+                if label:
+                    labels[label] = path
+
+            for label in chips[chip]:
+                if label in labels:
+                    f = self.open(labels[label])
+                    if f:
+                        return f
+            for path in inputs:
+                f = self.open(path)
+                if f:
+                    return f
+        return None
+
+    def find_gpu_busy(self):
+        pattern = os.path.join(self.sysfs_root, "class", "drm", "card*", "device", "gpu_busy_percent")
+        for path in sorted(glob.glob(pattern)):
+            self.gpu_busy = self.open(path)
+            if self.gpu_busy:
+                return
+
+    def find_rapl(self):
+        # Top-level zones only (intel-rapl:0, intel-rapl:1 ...), one per package
+        pattern = os.path.join(self.sysfs_root, "class", "powercap", "intel-rapl:*")
+        for zone in sorted(glob.glob(pattern)):
+            if os.path.basename(zone).count(":") != 1:
+                continue
+            energy = self.open(os.path.join(zone, "energy_uj"))
+            if not energy:
+                continue  # Usually root-only since kernel 5.10
+            max_range = _read_text(os.path.join(zone, "max_energy_range_uj"))
+            try:
+                max_range = int(max_range)
+            except (TypeError, ValueError):
+                max_range = 0
+            self.rapl.append((energy, max_range))
+
+    def cpu_percent(self):
+        if not self.stat:
+            return super().cpu_percent()
+        try:
+            fields = self.stat.read().split(b"\n", 1)[0].split()[1:]
+            times = [int(x) for x in fields[:8]]
+        except (OSError, ValueError):
+            return super().cpu_percent()
+
+        # idle + iowait count as idle time
+        idle = times[3] + times[4]
+        total = sum(times)
+        last = self.last_cpu_times
+        self.last_cpu_times = (idle, total)
+        if last is None:
+            return 0.0
+        d_total = total - last[1]
+        if d_total <= 0:
+            return 0.0
+        return max(0.0, min(100.0, 100.0 * (1 - (idle - last[0]) / d_total)))
+
+    def read_power(self):
+        if not self.rapl:
+            return 0
+        now = time.monotonic()
+        try:
+            energy = [f.read_int() for f, _ in self.rapl]
+        except (OSError, ValueError) as e:
+            self.error("sensors", e)
+            return 0
+
+        last = self.last_energy
+        elapsed = now - self.last_energy_time
+        self.last_energy = energy
+        self.last_energy_time = now
+        if last is None or elapsed <= 0:
+            return 0
+
+        joules = 0
+        for (_, max_range), prev, cur in zip(self.rapl, last, energy):
+            delta = cur - prev
+            if delta < 0:
+                delta += max_range  # Counter wrapped
+            if delta > 0:
+                joules += delta / 1e6
+        return joules / elapsed
+
+    def read(self):
+        sources = self.sources
+        power_watts = self.read_power() if "power" in sources else 0
+
+        cpu_temp = 0
+        gpu_temp = 0
+        gpu_usage = 0
+        try:
+            if self.cpu_temp and "cpu_temp" in sources:
+                cpu_temp = self.cpu_temp.read_int() / 1000
+            if self.gpu_temp and "gpu_temp" in sources:
+                gpu_temp = self.gpu_temp.read_int() / 1000
+            if self.gpu_busy and "gpu" in sources:
+                gpu_usage = float(self.gpu_busy.read_int())
+        except (OSError, ValueError) as e:
+            self.error("sensors", e)
+
+        return power_watts, cpu_temp, gpu_usage, gpu_temp
+
+    def close(self):
+        for f in self.files:
+            f.close()
+        self.files = []
+
+
+class LazyBackend(SensorBackend):
+    """Opens a slow backend in the background and swaps it in when ready
+
+    Loading pythonnet and the LHM DLL and opening the Computer takes
+    seconds, which would otherwise all happen before the first sample.
+    Until the loader thread has built and started the real backend, this
+    serves psutil CPU usage and no sensors; after that every call goes
+    to the real backend. ready is set either way once loading is over.
+    """
+
+    def __init__(self, factory):
+        self.factory = factory
+        self.backend = None
+        self.ready = threading.Event()
+        self.lock = threading.Lock()
+        self.closed = False
+        self.loader = None
+
+    @property
+    def name(self):
+        return self.backend.name if self.backend else "psutil"
+
+    def start(self):
+        self.loader = threading.Thread(target=self.load, name="sensor-loader", daemon=True)
+        self.loader.start()
+
+    def load(self):
+        try:
+            backend = self.factory()
+            backend.diagnostics = self.diagnostics
+            backend.configure(self.sources)
+            backend.start()
+        except Exception as e:
+            print(f"⚠ Sensor backend not available: {e}")
+            self.error("sensors", e)
+            backend = None
+        with self.lock:
+            if self.closed:
+                if backend:
+                    backend.close()
+            else:
+                self.backend = backend
+        self.ready.set()
+
+    def cpu_percent(self):
+        backend = self.backend
+        return backend.cpu_percent() if backend else super().cpu_percent()
+
+    def read(self):
+        backend = self.backend
+        return backend.read() if backend else (0, 0, 0, 0)
+
+    @property
+    def stale(self):
+        backend = self.backend
+        return backend.stale if backend else ()
+
+    def configure(self, sources):
+        self.sources = frozenset(sources)
+        backend = self.backend
+        if backend:
+            backend.configure(sources)
+
+    def close(self):
+        with self.lock:
+            self.closed = True
+            backend, self.backend = self.backend, None
+        if backend:
+            backend.close()
+
+
+def create_backend(lazy=True):
+    """Pick the best sensor backend for this platform
+
+    With lazy, LibreHardwareMonitor is loaded on a background thread
+    (see LazyBackend) so the first samples don't wait for it.
+    """
+    if sys.platform == "win32":
+        if lazy:
+            return LazyBackend(LHMBackend)
+        try:
+            return LHMBackend()
+        except Exception as e:
+            print(f"⚠ LibreHardwareMonitor not available: {e}")
+    elif sys.platform.startswith("linux"):
+        return LinuxBackend()
+    return SensorBackend()
@@ -1,8 +1,13 @@
 import sys
 import winreg
-from PyQt6.QtWidgets import (QDialog, QVBoxLayout, QCheckBox, QLabel, 
+from PyQt6.QtWidgets import (QDialog, QVBoxLayout, QCheckBox, QLabel, QLineEdit,
                              QColorDialog, QPushButton, QHBoxLayout, QComboBox, QGroupBox, QGridLayout, QMessageBox)
 from PyQt6.QtCore import Qt
+from modules import MODULES
+
+# Choices for the sampling intervals, seconds
+SYSTEM_INTERVALS = (0.25, 0.5, 1.0, 2.0)
+SENSOR_INTERVALS = (1.0, 2.0, 5.0)
 
 class SettingsDialog(QDialog):
     def __init__(self, current_settings, on_save_callback=None):
@@ -27,39 +32,28 @@ class SettingsDialog(QDialog):
         grid.addWidget(QLabel("Color"), 0, 1)
         grid.addWidget(QLabel("Type"), 0, 2)
         
-        modules = [
-            ("CPU", "show_cpu", "color_cpu", "#3498db", "display_cpu"),
-            ("RAM", "show_ram", "color_ram", "#9b59b6", "display_ram"),
-            ("GPU", "show_gpu", "color_gpu", "#2ecc71", "display_gpu"),
-            ("Network", "show_net", "color_net", "#1abc9c", "display_net"),
-            ("Power", "show_power", "color_power", "#e67e22", "display_power"),
-            ("Temp", "show_temp", "color_temp", "#e74c3c", "display_temp"),
-        ]
-
-        for i, (name, show_key, color_key, default_col, display_key) in enumerate(modules):
-            row = i + 1
-            
-            cb = QCheckBox(name)
-            cb.setChecked(bool(self.settings.get(show_key, True)))
-            self.toggles[show_key] = cb
+        for row, module in enumerate(MODULES, start=1):
+            cb = QCheckBox(module.label)
+            cb.setChecked(bool(self.settings.get(module.show_key, module.visible)))
+            self.toggles[module.show_key] = cb
             grid.addWidget(cb, row, 0)
             
             col_btn = QPushButton()
-            current_col = str(self.settings.get(color_key, default_col))
+            color_key = module.color_key
+            current_col = str(self.settings.get(color_key, module.color))
             col_btn.setStyleSheet(f"background-color: {current_col}; border: 1px solid gray; min-width: 40px;")
             col_btn.clicked.connect(lambda checked, b=col_btn, k=color_key: self.pick_color(b, k))
             self.color_buttons[color_key] = {"btn": col_btn, "value": current_col}
             grid.addWidget(col_btn, row, 1)
             
-            if name in ["Power", "Temp"]:
-                lbl = QLabel("text")
-                grid.addWidget(lbl, row, 2)
-            else:
+            if module.kind == "bar":
                 display_combo = QComboBox()
                 display_combo.addItems(["bar", "graph"])
-                display_combo.setCurrentText(str(self.settings.get(display_key, "bar")))
-                self.display_combos[display_key] = display_combo
+                display_combo.setCurrentText(str(self.settings.get(module.display_key, "bar")))
+                self.display_combos[module.display_key] = display_combo
                 grid.addWidget(display_combo, row, 2)
+            else:
+                grid.addWidget(QLabel(module.kind), row, 2)
 
         modules_group.setLayout(grid)
         layout.addWidget(modules_group)
@@ -85,10 +79,63 @@ class SettingsDialog(QDialog):
         net_layout.addStretch()
         gen_layout.addLayout(net_layout)
         
+        nic_layout = QHBoxLayout()
+        nic_layout.addWidget(QLabel("Interfaces:"))
+        self.net_include_edit = QLineEdit(str(self.settings.get("net_include", "")))
+        self.net_include_edit.setPlaceholderText("all")
+        self.net_include_edit.setToolTip("Count only these interfaces, e.g. \"eth*, Wi-Fi\"")
+        nic_layout.addWidget(self.net_include_edit)
+        nic_layout.addWidget(QLabel("except"))
+        self.net_exclude_edit = QLineEdit(str(self.settings.get("net_exclude", "")))
+        self.net_exclude_edit.setPlaceholderText("loopback, virtual")
+        self.net_exclude_edit.setToolTip("Skip these interfaces; empty skips loopback and virtual adapters")
+        nic_layout.addWidget(self.net_exclude_edit)
+        gen_layout.addLayout(nic_layout)
+        
+        interval_layout = QHBoxLayout()
+        interval_layout.addWidget(QLabel("Update every:"))
+        self.interval_system_combo = QComboBox()
+        for seconds in SYSTEM_INTERVALS:
+            self.interval_system_combo.addItem(f"{seconds:g} s", seconds)
+        self.select_interval(self.interval_system_combo, self.settings.get("interval_system", 1.0))
+        self.interval_system_combo.setToolTip("CPU, RAM, network and disk")
+        interval_layout.addWidget(self.interval_system_combo)
+        interval_layout.addWidget(QLabel("Sensors:"))
+        self.interval_sensors_combo = QComboBox()
+        for seconds in SENSOR_INTERVALS:
+            self.interval_sensors_combo.addItem(f"{seconds:g} s", seconds)
+        self.select_interval(self.interval_sensors_combo, self.settings.get("interval_sensors", 1.0))
+        self.interval_sensors_combo.setToolTip("Power, GPU and temperatures")
+        interval_layout.addWidget(self.interval_sensors_combo)
+        interval_layout.addStretch()
+        gen_layout.addLayout(interval_layout)
+        
         self.startup_cb = QCheckBox("Run on Startup")
         self.startup_cb.setChecked(self.check_startup_status())
         gen_layout.addWidget(self.startup_cb)
         
+        metrics_layout = QHBoxLayout()
+        self.exporter_cb = QCheckBox("Metrics endpoint:")
+        self.exporter_cb.setChecked(bool(self.settings.get("exporter_enabled", False)))
+        metrics_layout.addWidget(self.exporter_cb)
+        self.exporter_edit = QLineEdit(str(self.settings.get("exporter_address", "127.0.0.1:9184")))
+        self.exporter_edit.setToolTip("host:port for the OpenMetrics (Prometheus) endpoint at /metrics")
+        metrics_layout.addWidget(self.exporter_edit)
+        gen_layout.addLayout(metrics_layout)
+        
+        self.log_cb = QCheckBox("Record power history (Analytics)")
+        self.log_cb.setChecked(bool(self.settings.get("log_analytics", True)))
+        self.log_cb.setToolTip("Also samples power and temperatures when those modules are hidden")
+        gen_layout.addWidget(self.log_cb)
+        
+        self.processes_cb = QCheckBox("Top processes in CPU/RAM tooltips")
+        self.processes_cb.setChecked(bool(self.settings.get("show_processes", False)))
+        gen_layout.addWidget(self.processes_cb)
+        
+        self.shm_cb = QCheckBox("Share samples with local tools (shared memory)")
+        self.shm_cb.setChecked(bool(self.settings.get("shm_enabled", False)))
+        gen_layout.addWidget(self.shm_cb)
+        
         general_group.setLayout(gen_layout)
         layout.addWidget(general_group)
 
@@ -104,6 +151,11 @@ class SettingsDialog(QDialog):
         self.setLayout(layout)
         self.setMinimumWidth(350)
 
+    @staticmethod
+    def select_interval(combo, seconds):
+        index = combo.findData(float(seconds))
+        combo.setCurrentIndex(index if index >= 0 else combo.findData(1.0))
+
     def pick_color(self, btn, key):
         try:
             color = QColorDialog.getColor()
@@ -158,6 +210,15 @@ class SettingsDialog(QDialog):
             
             new_settings["unit"] = self.unit_combo.currentText()
             new_settings["net_unit"] = self.net_unit_combo.currentText()
+            new_settings["interval_system"] = self.interval_system_combo.currentData()
+            new_settings["interval_sensors"] = self.interval_sensors_combo.currentData()
+            new_settings["net_include"] = self.net_include_edit.text().strip()
+            new_settings["net_exclude"] = self.net_exclude_edit.text().strip()
+            new_settings["exporter_enabled"] = self.exporter_cb.isChecked()
+            new_settings["exporter_address"] = self.exporter_edit.text().strip()
+            new_settings["shm_enabled"] = self.shm_cb.isChecked()
+            new_settings["show_processes"] = self.processes_cb.isChecked()
+            new_settings["log_analytics"] = self.log_cb.isChecked()
             
             self.toggle_startup(self.startup_cb.isChecked())
             
@@ -0,0 +1,209 @@
+"""Live samples in shared memory for other local processes
+
+The collector writes every sample into a fixed-layout ring buffer in a
+named memory mapping; any number of local readers map the same memory
+and read samples straight out of it, with no sockets, no serialization
+and no sensor polling of their own:
+
+    from sharedring import SharedRingReader
+    with SharedRingReader() as ring:
+        sample = ring.latest()          # Sample(index, time, energy_j, cpu, ...)
+        print(sample.power, sample.cpu_temp)
+        for s in ring.last(60):         # up to the newest 60, oldest first
+            ...
+
+Layout (little endian; all offsets are fixed once the header is read):
+
+    header   8s magic, u16 version, u16 field count, u32 header size,
+             u32 slot size, u32 capacity, u64 samples written, u64 writer
+             pid, f64 start time; then one 16-byte ASCII name per field
+    slots    capacity x (u64 lock, f64 x field count)
+
+Every slot is a seqlock: the writer sets its lock to 2*i+1 before
+writing sample i and to 2*i+2 after, then bumps the header count. A
+reader copies a slot's values and accepts them only if the lock was the
+same even value before and after the copy.
+"""
+import os
+import sys
+import time
+import mmap
+import struct
+import tempfile
+from collections import namedtuple
+from snapshot import FIELDS
+
+DEFAULT_NAME = "sysmonbar"
+DEFAULT_CAPACITY = 3600
+MAGIC = b"SYSMONB1"
+VERSION = 1
+
+HEADER = struct.Struct("<8sHHIIIQQd")
+COUNT_OFFSET = 24  # u64 samples written
+NAME = struct.Struct("<16s")
+LOCK = struct.Struct("<Q")
+
+RECORD_FIELDS = ("time", "energy_j") + FIELDS
+
+
+def _mapping_path(name):
+    shm_dir = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+    return os.path.join(shm_dir, f"{name}.ring")
+
+
+def _open_mapping(name, size, create):
+    """Named shared memory: a Windows named mapping, or a tmpfs file"""
+    if sys.platform == "win32":
+        return mmap.mmap(-1, size, tagname=name, access=mmap.ACCESS_WRITE if create else mmap.ACCESS_READ)
+    path = _mapping_path(name)
+    if create:
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            os.ftruncate(fd, size)
+            return mmap.mmap(fd, size)
+        finally:
+            os.close(fd)
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        return mmap.mmap(fd, size or os.fstat(fd).st_size, access=mmap.ACCESS_READ)
+    finally:
+        os.close(fd)
+
+
+class SharedRingWriter:
+    """Publishes every collector sample into the shared ring
+
+    Like MetricsExporter it hangs off the collector as a listener, so
+    it adds one struct.pack_into per tick and nothing else.
+    """
+
+    def __init__(self, collector, name=DEFAULT_NAME, capacity=DEFAULT_CAPACITY):
+        self.collector = collector
+        self.name = name
+        self.capacity = capacity
+        self.record = struct.Struct(f"<{len(RECORD_FIELDS)}d")
+        self.header_size = HEADER.size + NAME.size * len(RECORD_FIELDS)
+        self.slot_size = LOCK.size + self.record.size
+        self.buf = None
+        self.count = 0
+
+    def start(self):
+        size = self.header_size + self.slot_size * self.capacity
+        self.buf = _open_mapping(self.name, size, create=True)
+        self.buf[:size] = bytes(size)
+        HEADER.pack_into(self.buf, 0, MAGIC, VERSION, len(RECORD_FIELDS), self.header_size,
+                         self.slot_size, self.capacity, 0, os.getpid(), time.time())
+        for i, field in enumerate(RECORD_FIELDS):
+            NAME.pack_into(self.buf, HEADER.size + i * NAME.size, field.encode())
+        self.count = 0
+        # Readers get every metric, whatever the bar shows
+        self.collector.set_demand("shared ring")
+        self.collector.add_listener(self.publish)
+
+    def publish(self, stats):
+        buf = self.buf
+        if buf is None:
+            return
+        i = self.count
+        offset = self.header_size + (i % self.capacity) * self.slot_size
+        LOCK.pack_into(buf, offset, 2 * i + 1)
+        self.record.pack_into(buf, offset + LOCK.size, time.time(), self.collector.energy_total_j,
+                              *[getattr(stats, name) for name in FIELDS])
+        LOCK.pack_into(buf, offset, 2 * i + 2)
+        self.count = i + 1
+        LOCK.pack_into(buf, COUNT_OFFSET, self.count)
+
+    def stop(self):
+        if self.buf is None:
+            return
+        self.collector.remove_listener(self.publish)
+        self.collector.set_demand("shared ring", ())
+        self.buf.close()
+        self.buf = None
+        if sys.platform != "win32":
+            # Readers keep their mapping; new ones see that we're gone
+            try:
+                os.unlink(_mapping_path(self.name))
+            except OSError:
+                pass
+
+
+class SharedRingReader:
+    """Read-only view of a SharedRingWriter's ring
+
+    Raises FileNotFoundError if no collector is publishing under name,
+    ValueError if the memory doesn't hold a ring (on Windows, where
+    opening a missing mapping creates an empty one).
+    """
+
+    def __init__(self, name=DEFAULT_NAME):
+        self.buf = _open_mapping(name, 0 if sys.platform != "win32" else HEADER.size, create=False)
+        (magic, version, field_count, self.header_size, self.slot_size, self.capacity,
+         _, self.writer_pid, self.started) = HEADER.unpack_from(self.buf, 0)
+        if magic != MAGIC or version != VERSION:
+            self.buf.close()
+            raise ValueError(f"not a SysMonBar ring (magic {magic!r}, version {version})")
+        if sys.platform == "win32":
+            self.buf.close()
+            self.buf = _open_mapping(name, self.header_size + self.slot_size * self.capacity, create=False)
+        self.fields = tuple(
+            NAME.unpack_from(self.buf, HEADER.size + i * NAME.size)[0].rstrip(b"\0").decode()
+            for i in range(field_count))
+        self.record = struct.Struct(f"<{field_count}d")
+        self.Sample = namedtuple("Sample", ("index",) + self.fields)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self.buf is not None:
+            self.buf.close()
+            self.buf = None
+
+    def count(self):
+        """Samples written so far; the newest is index count() - 1"""
+        return LOCK.unpack_from(self.buf, COUNT_OFFSET)[0]
+
+    def read(self, index):
+        """Sample index, or None if it was overwritten (or never written)"""
+        offset = self.header_size + (index % self.capacity) * self.slot_size
+        expected = 2 * index + 2
+        if LOCK.unpack_from(self.buf, offset)[0] != expected:
+            return None
+        values = self.record.unpack_from(self.buf, offset + LOCK.size)
+        if LOCK.unpack_from(self.buf, offset)[0] != expected:
+            return None
+        return self.Sample(index, *values)
+
+    def latest(self):
+        """The newest complete sample, or None before the first one"""
+        count = self.count()
+        # The newest slot can be mid-rewrite (or the writer died in it)
+        for index in range(count - 1, max(-1, count - 3), -1):
+            sample = self.read(index)
+            if sample is not None:
+                return sample
+        return None
+
+    def last(self, n):
+        """Up to n of the newest samples, oldest first"""
+        count = self.count()
+        start = max(0, count - min(n, self.capacity - 1))
+        samples = []
+        for index in range(start, count):
+            sample = self.read(index)
+            if sample is not None:
+                samples.append(sample)
+        return samples
+
+    def wait(self, after, timeout=None, poll=0.05):
+        """Block until a sample newer than index after exists; the newest"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.count() <= after + 1:
+            if deadline is not None and time.monotonic() >= deadline:
+                return None
+            time.sleep(poll)
+        return self.latest()
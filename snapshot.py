@@ -0,0 +1,84 @@
+import time
+
+# Metric fields of a snapshot, in display order
+FIELDS = (
+    "cpu", "ram_percent", "ram_used_gb", "ram_total_gb",
+    "net_up", "net_down", "gpu", "power",
+    "cpu_temp", "gpu_temp", "temp",
+    "disk_read", "disk_write",
+)
+
+
+class StatsSnapshot:
+    """One sample of every metric, plus a sequence number and time.
+
+    timestamp is time.monotonic() at publish; seq increases by one per
+    published sample, so a reader can tell whether it missed any.
+    cores is a tuple with the load of every logical CPU. stale names
+    the fields carried forward from an earlier sample because their
+    sensor didn't answer in time.
+    """
+
+    __slots__ = ("seq", "timestamp", "cores", "stale") + FIELDS
+
+    def __init__(self):
+        self.seq = 0
+        self.timestamp = 0.0
+        self.cores = ()
+        self.stale = ()
+        for name in FIELDS:
+            setattr(self, name, 0.0)
+
+    def copy_to(self, other):
+        other.seq = self.seq
+        other.timestamp = self.timestamp
+        other.cores = self.cores
+        other.stale = self.stale
+        for name in FIELDS:
+            setattr(other, name, getattr(self, name))
+
+    def as_dict(self):
+        values = {name: getattr(self, name) for name in FIELDS}
+        values["cores"] = list(self.cores)
+        values["stale"] = list(self.stale)
+        return values
+
+
+class SnapshotBuffer:
+    """Double buffer of StatsSnapshot between the monitor and its readers
+
+    The monitor fills back() and calls publish(), which swaps it to the
+    front. Nothing is allocated per sample and nothing queues up: a
+    reader always gets the newest sample, however late it asks.
+    """
+
+    def __init__(self):
+        self.buffers = (StatsSnapshot(), StatsSnapshot())
+        self.front = 0
+        self.seq = 0
+
+    def back(self):
+        return self.buffers[1 - self.front]
+
+    def publish(self):
+        snap = self.back()
+        self.seq += 1
+        snap.seq = self.seq
+        snap.timestamp = time.monotonic()
+        self.front = 1 - self.front
+        return snap
+
+    def latest(self):
+        return self.buffers[self.front]
+
+    def read_into(self, target):
+        """Copy the newest snapshot into target; False if nothing is new"""
+        while True:
+            snap = self.buffers[self.front]
+            seq = snap.seq
+            if seq == target.seq:
+                return False
+            snap.copy_to(target)
+            # Retry if the monitor rewrote this buffer while we copied
+            if snap.seq == seq and self.buffers[self.front] is snap:
+                return True
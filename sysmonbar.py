@@ -0,0 +1,176 @@
+"""SysMonBar command line
+
+    python -m sysmonbar            start the taskbar GUI
+    python -m sysmonbar collect    sample and log to analytics headless
+    python -m sysmonbar read       print samples from a running collector's
+                                   shared ring (collect --shm / GUI setting)
+
+collect never imports Qt, so it runs on servers, in containers and from
+a service manager; the GUI is just another consumer of the same
+Collector.
+"""
+import argparse
+import json
+import signal
+import sys
+import time
+
+
+def format_line(stats):
+    return (f"CPU {stats.cpu:5.1f}%  RAM {stats.ram_percent:5.1f}%  "
+            f"GPU {stats.gpu:5.1f}%  {stats.power:6.1f} W  "
+            f"{stats.temp:4.0f}°C  "
+            f"up {stats.net_up / 1024:8.1f} KB/s  down {stats.net_down / 1024:8.1f} KB/s  "
+            f"disk r {stats.disk_read / 1024:8.1f} KB/s  w {stats.disk_write / 1024:8.1f} KB/s")
+
+
+def parse_interval(text):
+    """"system=0.25" -> ("system", 0.25)"""
+    group, sep, seconds = text.partition("=")
+    try:
+        value = float(seconds)
+    except ValueError:
+        value = 0
+    if not sep or value <= 0:
+        raise argparse.ArgumentTypeError(f"expected GROUP=SECONDS, got {text!r}")
+    return group.strip(), value
+
+
+def run_collect(args):
+    from collector import Collector
+    from counters import parse_patterns
+    
+    collector = Collector(log_analytics=not args.no_log, trace=bool(args.trace),
+                          net_include=parse_patterns(args.nic_include), net_exclude=parse_patterns(args.nic_exclude),
+                          intervals=dict(args.interval))
+    
+    def handle_signal(signum, frame):
+        collector.stop()
+    
+    signal.signal(signal.SIGINT, handle_signal)
+    signal.signal(signal.SIGTERM, handle_signal)
+    
+    if not args.quiet:
+        def print_sample(stats):
+            if stats.seq % args.every:
+                return
+            if args.json:
+                record = stats.as_dict()
+                record["time"] = time.time()
+                print(json.dumps(record), flush=True)
+            else:
+                print(format_line(stats), flush=True)
+        collector.add_listener(print_sample)
+    
+    ring = None
+    if args.shm:
+        from sharedring import SharedRingWriter
+        ring = SharedRingWriter(collector, args.shm)
+        ring.start()
+    
+    exporter = None
+    if args.metrics:
+        from exporter import MetricsExporter
+        exporter = MetricsExporter(collector, args.metrics)
+        exporter.start()
+        print(f"Serving metrics on {exporter.url()}", file=sys.stderr)
+    
+    print(f"Collecting with the {collector.backend.name} backend "
+          f"({'not ' if args.no_log else ''}logging to analytics), Ctrl+C to stop",
+          file=sys.stderr)
+    # Returns once stopped, after the pending energy has been flushed
+    collector.run()
+    if exporter:
+        exporter.stop()
+    if ring:
+        ring.stop()
+    if args.trace:
+        collector.diagnostics.export(args.trace)
+        print(f"Stage timings written to {args.trace}", file=sys.stderr)
+
+
+def run_read(args):
+    from sharedring import SharedRingReader
+    
+    try:
+        ring = SharedRingReader(args.name)
+    except (OSError, ValueError) as e:
+        sys.exit(f"No shared samples under '{args.name}' (is a collector running with --shm?): {e}")
+    
+    def show(sample):
+        if args.json:
+            print(json.dumps(sample._asdict()), flush=True)
+        else:
+            print(f"#{sample.index}  {format_line(sample)}", flush=True)
+    
+    with ring:
+        samples = ring.last(args.last)
+        for sample in samples:
+            show(sample)
+        last = samples[-1].index if samples else -1
+        try:
+            while args.follow:
+                sample = ring.wait(last, timeout=5)
+                if sample is None:
+                    continue
+                # Anything we slept through that is still in the ring
+                for missed in ring.last(sample.index - last):
+                    if missed.index > last:
+                        show(missed)
+                        last = missed.index
+        except KeyboardInterrupt:
+            pass
+
+
+def run_gui(args):
+    import main
+    main.main()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="sysmonbar", description="SysMonBar system monitor")
+    sub = parser.add_subparsers(dest="command")
+    
+    collect = sub.add_parser("collect", help="sample and log without the GUI")
+    collect.add_argument("--json", action="store_true", help="print one JSON object per sample")
+    collect.add_argument("--every", type=int, default=1, metavar="N", help="print every Nth sample")
+    collect.add_argument("--quiet", action="store_true", help="print nothing, only log")
+    collect.add_argument("--no-log", action="store_true", help="don't write to the analytics database")
+    collect.add_argument("--metrics", metavar="HOST:PORT", nargs="?", const="127.0.0.1:9184",
+                         help="serve OpenMetrics on HOST:PORT (default 127.0.0.1:9184)")
+    collect.add_argument("--shm", metavar="NAME", nargs="?", const="sysmonbar",
+                         help="publish samples to shared memory for local readers (default name sysmonbar)")
+    collect.add_argument("--nic-include", metavar="PATTERNS",
+                         help="comma-separated interface patterns to count (default: all)")
+    collect.add_argument("--nic-exclude", metavar="PATTERNS",
+                         help="comma-separated interface patterns to skip (default: loopback and virtual)")
+    collect.add_argument("--interval", metavar="GROUP=SECONDS", type=parse_interval, action="append", default=[],
+                         help="sampling interval of a group: system (CPU, RAM, network, disk; default 1), "
+                              "sensors (power, GPU, temperatures; default 1) or analytics (default 60)")
+    collect.add_argument("--trace", metavar="FILE", help="time each collector stage, write them as JSON on exit")
+    collect.set_defaults(func=run_collect)
+    
+    read = sub.add_parser("read", help="print samples shared by a running collector")
+    read.add_argument("--name", default="sysmonbar", help="shared ring name")
+    read.add_argument("--last", type=int, default=1, metavar="N", help="print the newest N samples")
+    read.add_argument("--follow", "-f", action="store_true", help="keep printing new samples")
+    read.add_argument("--json", action="store_true", help="print one JSON object per sample")
+    read.set_defaults(func=run_read)
+    
+    gui = sub.add_parser("gui", help="start the taskbar GUI (default)")
+    gui.set_defaults(func=run_gui)
+    
+    args = parser.parse_args(argv)
+    if args.command is None:
+        args.func = run_gui
+    args.every = max(1, getattr(args, "every", 1))
+    if args.command == "collect":
+        from collector import DEFAULT_INTERVALS
+        unknown = [group for group, _ in args.interval if group not in DEFAULT_INTERVALS]
+        if unknown:
+            parser.error(f"unknown sampling group {unknown[0]!r} (choose from {', '.join(DEFAULT_INTERVALS)})")
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()